@@ -0,0 +1,197 @@
+import os
+import json
+import string
+import logging
+import threading
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Bulk document generation.
+# A batch renders one template with many contexts. Rendering is CPU bound
+# (python-docx + lxml), so records are rendered in a process pool; each worker
+# process keeps its own compiled-template cache. Progress is tracked in the
+# `document_batches` collection and the generated records are written to
+# `generated_documents` with insert_many. Batches run as "generate_batch" jobs
+# of the job queue (see document_jobs.py), so they are resumed after a restart.
+
+BATCHES_COLLECTION = "document_batches"
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", os.cpu_count() or 2))
+BATCH_MAX_RECORDS = int(os.getenv("BATCH_MAX_RECORDS", 500))
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", 50))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Returns the shared rendering process pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 'spawn' avoids forking a process that holds Mongo client threads and sockets
+            _executor = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Started batch rendering pool with {BATCH_WORKERS} workers.")
+        return _executor
+
+
+def shutdown_executor():
+    """Stops the rendering process pool, if it was started."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+class _KeepMissing(dict):
+    """format_map helper that leaves unknown fields untouched."""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+def validate_document_name(base_name: str):
+    """Raises ValueError unless every field of `base_name` is a plain context field
+    name: attribute access and indexing ('{a.x}', '{a[0]}') are not supported."""
+    for _, field, _, _ in string.Formatter().parse(base_name):
+        if field is not None and not field.isidentifier():
+            raise ValueError(f"Unsupported field '{{{field}}}' in the document name: use plain field names.")
+
+
+def document_name_for(base_name: str, context: Dict[str, Any], index: int) -> str:
+    """Builds the name of one document of a batch. `base_name` may reference context
+    fields, e.g. 'Demanda {nombre_demandado}'. The index keeps names unique."""
+    try:
+        name = base_name.format_map(_KeepMissing(context))
+    except (ValueError, IndexError, KeyError, AttributeError, TypeError):
+        name = base_name
+    return f"{name}_{index + 1:03d}"
+
+
+def render_document(template_name: str, document_name: str, context: Dict[str, Any]) -> str:
+    """Renders one document. Runs inside a worker process and returns the file path."""
+    import tools  # Imported here so the pool workers only load what they need
+
+    result = json.loads(tools.fill_template_and_save_document(template_name, document_name, context))
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result["file_path"]
+
+
+def create_batch(db: Database, template_name: str, project_id: ObjectId, owner_email: str, total: int) -> ObjectId:
+    """Creates the batch record that tracks the progress of a bulk generation."""
+    batch_doc = {
+        "template_name": template_name,
+        "project_id": project_id,
+        "owner_email": owner_email,
+        "status": "queued",
+        "total": total,
+        "completed": 0,
+        "failed": 0,
+        "errors": [],
+        "zip_path": None,
+        "created_at": datetime.utcnow(),
+        "finished_at": None,
+    }
+    return db[BATCHES_COLLECTION].insert_one(batch_doc).inserted_id
+
+
+def _write_zip(batch_id: ObjectId, file_paths: List[str]) -> str:
+    import tools
+
+    zip_path = os.path.join(tools.GENERATED_DOCS_PATH, f"batch_{batch_id}.zip")
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for file_path in file_paths:
+            archive.write(file_path, arcname=os.path.basename(file_path))
+    return zip_path
+
+
+def _discard_partial_results(db: Database, batch_id: ObjectId):
+    """Removes what a previous, interrupted run of the batch produced, so a retried
+    job starts from a clean state instead of duplicating records."""
+    stale = list(db.generated_documents.find({"batch_id": batch_id}, {"file_path": 1}))
+    for record in stale:
+        if os.path.exists(record["file_path"]):
+            os.remove(record["file_path"])
+    if stale:
+        db.generated_documents.delete_many({"batch_id": batch_id})
+        logger.info(f"Discarded {len(stale)} records from an interrupted run of batch {batch_id}.")
+
+
+def run_batch(db: Database, batch_id: ObjectId, document_name: str, contexts: List[Dict[str, Any]]):
+    """Renders every context of a batch in the process pool, updating the progress as
+    documents complete and inserting the generated records in bulk."""
+    batches = db[BATCHES_COLLECTION]
+    _discard_partial_results(db, batch_id)
+    batch = batches.find_one_and_update(
+        {"_id": batch_id},
+        {"$set": {"status": "running", "started_at": datetime.utcnow(), "completed": 0, "failed": 0, "errors": []}},
+    )
+    logger.info(f"Running batch {batch_id} with {len(contexts)} documents.")
+
+    futures = {}
+    pending_records = []
+    file_paths = []
+
+    def flush_records():
+        if pending_records:
+            db.generated_documents.insert_many(pending_records, ordered=False)
+            pending_records.clear()
+
+    try:
+        names = [document_name_for(document_name, context, index) for index, context in enumerate(contexts)]
+        executor = get_executor()
+        for index, context in enumerate(contexts):
+            futures[executor.submit(render_document, batch["template_name"], names[index], context)] = index
+
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                file_path = future.result()
+            except Exception as e:
+                logger.warning(f"Batch {batch_id}: document {index} failed: {e}")
+                batches.update_one(
+                    {"_id": batch_id},
+                    {"$inc": {"failed": 1}, "$push": {"errors": {"index": index, "error": str(e)}}},
+                )
+                continue
+
+            file_paths.append(file_path)
+            pending_records.append({
+                "file_name": names[index],
+                "project_id": batch["project_id"],
+                "owner_email": batch["owner_email"],
+                "file_path": file_path,
+                "is_archived": False,
+                "created_at": datetime.utcnow(),
+                "batch_id": batch_id,
+            })
+            if len(pending_records) >= BATCH_INSERT_SIZE:
+                flush_records()
+            batches.update_one({"_id": batch_id}, {"$inc": {"completed": 1}})
+
+        flush_records()
+        zip_path = _write_zip(batch_id, file_paths) if file_paths else None
+        status = "completed" if file_paths else "failed"
+        batches.update_one(
+            {"_id": batch_id},
+            {"$set": {"status": status, "zip_path": zip_path, "finished_at": datetime.utcnow()}},
+        )
+        logger.info(f"Batch {batch_id} finished: {len(file_paths)} generated, {len(contexts) - len(file_paths)} failed.")
+    except Exception as e:
+        logger.error(f"Batch {batch_id} aborted: {e}", exc_info=True)
+        # Renders that have not started yet would produce files nobody records
+        for future in futures:
+            future.cancel()
+        batches.update_one(
+            {"_id": batch_id},
+            {"$set": {"status": "failed", "finished_at": datetime.utcnow()}, "$push": {"errors": {"index": None, "error": str(e)}}},
+        )
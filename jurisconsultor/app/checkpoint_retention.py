@@ -0,0 +1,193 @@
+import os
+import uuid
+import argparse
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Retention and compaction of the agent's checkpoints.
+# The checkpointer stores a checkpoint (plus its pending writes) for every step of
+# every conversation and never deletes them. This job keeps only the newest
+# CHECKPOINT_KEEP_PER_THREAD checkpoints of each thread and deletes threads that
+# have been idle for CHECKPOINT_THREAD_TTL_DAYS (the user starts over with an empty
+# memory). Checkpoint IDs are UUIDv6, which sort by creation time, so "newest" and
+# "idle since" are computed from the IDs themselves. The scheduler runs the job
+# every CHECKPOINT_COMPACTION_HOURS; `python checkpoint_retention.py` runs it once.
+# Reclaimed bytes are the BSON size of the deleted documents; WiredTiger reuses
+# that space, and --compact also returns it to the operating system.
+
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", 20))
+CHECKPOINT_THREAD_TTL_DAYS = float(os.getenv("CHECKPOINT_THREAD_TTL_DAYS", 90))
+CHECKPOINT_COMPACTION_HOURS = int(os.getenv("CHECKPOINT_COMPACTION_HOURS", 6))
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+CHECKPOINT_INDEXES = [
+    IndexModel([("thread_id", ASCENDING), ("checkpoint_ns", ASCENDING), ("checkpoint_id", DESCENDING)], name="thread_ns_checkpoint"),
+]
+
+
+def checkpoint_collections(memory_db: Database):
+    """Returns the (checkpoints, writes) collections used by the checkpointer.
+    MongoDBSaver is given the memory database as its client, so it stores its
+    collections under the "checkpointing_db." prefix of that database."""
+    saver_db = memory_db["checkpointing_db"]
+    return saver_db["checkpoints"], saver_db["checkpoint_writes"]
+
+
+def checkpoint_id_at(moment: datetime) -> str:
+    """The smallest UUIDv6 checkpoint ID created at `moment`; older IDs compare lower as strings."""
+    timestamp = int(moment.timestamp() * 10_000_000) + _UUID_EPOCH_OFFSET
+    value = (timestamp >> 12) << 80 | (0x6000 | (timestamp & 0x0FFF)) << 64
+    return str(uuid.UUID(int=value))
+
+
+def checkpoint_time(checkpoint_id: str) -> datetime:
+    """The creation time encoded in a UUIDv6 checkpoint ID."""
+    value = uuid.UUID(checkpoint_id).int
+    timestamp = (value >> 80) << 12 | (value >> 64) & 0x0FFF
+    return datetime.fromtimestamp((timestamp - _UUID_EPOCH_OFFSET) / 10_000_000, tz=timezone.utc)
+
+
+def ensure_checkpoint_indexes(memory_db: Database):
+    """Creates the index used both by the checkpointer's lookups and by this job."""
+    for collection in checkpoint_collections(memory_db):
+        try:
+            collection.create_indexes(CHECKPOINT_INDEXES)
+        except OperationFailure as e:
+            logger.error(f"Could not create index on {collection.name}: {e}")
+
+
+def _bson_size(collection: Collection, query: dict) -> int:
+    result = list(collection.aggregate([
+        {"$match": query},
+        {"$group": {"_id": None, "bytes": {"$sum": {"$bsonSize": "$$ROOT"}}}},
+    ]))
+    return result[0]["bytes"] if result else 0
+
+
+def _delete(collection: Collection, query: dict, dry_run: bool) -> dict:
+    """Deletes the documents matching `query` and returns how many and how large they were."""
+    size = _bson_size(collection, query)
+    if dry_run:
+        count = collection.count_documents(query)
+    else:
+        count = collection.delete_many(query).deleted_count
+    return {"documents": count, "bytes": size}
+
+
+def _add(totals: dict, key: str, deleted: dict):
+    totals[key]["documents"] += deleted["documents"]
+    totals[key]["bytes"] += deleted["bytes"]
+
+
+def compact_checkpoints(
+    memory_db: Database,
+    keep: int = CHECKPOINT_KEEP_PER_THREAD,
+    ttl_days: float = CHECKPOINT_THREAD_TTL_DAYS,
+    now: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> dict:
+    """Deletes expired threads and the checkpoints beyond the newest `keep` of each thread.
+    Returns the number of threads affected and the documents and bytes reclaimed."""
+    if keep < 1:
+        raise ValueError("At least one checkpoint per thread must be kept.")
+    checkpoints, writes = checkpoint_collections(memory_db)
+    totals = {
+        "expired_threads": 0,
+        "trimmed_threads": 0,
+        "checkpoints": {"documents": 0, "bytes": 0},
+        "writes": {"documents": 0, "bytes": 0},
+    }
+
+    # Idle threads: the newest checkpoint is older than the TTL
+    if ttl_days > 0:
+        cutoff = checkpoint_id_at((now or datetime.now(timezone.utc)) - timedelta(days=ttl_days))
+        expired = list(checkpoints.aggregate([
+            {"$group": {"_id": "$thread_id", "latest": {"$max": "$checkpoint_id"}}},
+            {"$match": {"latest": {"$lt": cutoff}}},
+        ], allowDiskUse=True))
+        for thread in expired:
+            query = {"thread_id": thread["_id"]}
+            _add(totals, "checkpoints", _delete(checkpoints, query, dry_run))
+            _add(totals, "writes", _delete(writes, query, dry_run))
+            totals["expired_threads"] += 1
+
+    # Long threads: keep the newest `keep` checkpoints of each namespace
+    over_limit = list(checkpoints.aggregate([
+        {"$group": {"_id": {"thread_id": "$thread_id", "checkpoint_ns": "$checkpoint_ns"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": keep}}},
+    ], allowDiskUse=True))
+    for thread in over_limit:
+        thread_query = {"thread_id": thread["_id"]["thread_id"], "checkpoint_ns": thread["_id"]["checkpoint_ns"]}
+        oldest_kept = next(
+            checkpoints.find(thread_query, {"checkpoint_id": 1}).sort("checkpoint_id", DESCENDING).skip(keep - 1).limit(1),
+            None,
+        )
+        if oldest_kept is None:
+            continue
+        query = {**thread_query, "checkpoint_id": {"$lt": oldest_kept["checkpoint_id"]}}
+        _add(totals, "checkpoints", _delete(checkpoints, query, dry_run))
+        _add(totals, "writes", _delete(writes, query, dry_run))
+        totals["trimmed_threads"] += 1
+
+    totals["reclaimed_bytes"] = totals["checkpoints"]["bytes"] + totals["writes"]["bytes"]
+    return totals
+
+
+def release_storage(memory_db: Database) -> int:
+    """Runs `compact` on the checkpoint collections and returns the bytes freed on disk.
+    compact blocks operations on the collection on older servers; run it off-peak."""
+    freed = 0
+    for collection in checkpoint_collections(memory_db):
+        try:
+            result = memory_db.command("compact", collection.name)
+            freed += int(result.get("bytesFreed", 0))
+        except OperationFailure as e:
+            logger.error(f"Could not compact {collection.name}: {e}")
+    return freed
+
+
+def run_compaction(dry_run: bool = False) -> dict:
+    """Entry point of the scheduled job."""
+    from db_manager import get_memory_db
+
+    memory_db = get_memory_db()
+    ensure_checkpoint_indexes(memory_db)
+    totals = compact_checkpoints(memory_db, dry_run=dry_run)
+    logger.info(
+        f"Checkpoint compaction: {totals['expired_threads']} expired threads, {totals['trimmed_threads']} trimmed threads, "
+        f"{totals['checkpoints']['documents']} checkpoints and {totals['writes']['documents']} writes deleted, "
+        f"{totals['reclaimed_bytes']} bytes reclaimed."
+    )
+    return totals
+
+
+def main():
+    from db_manager import get_memory_db
+
+    parser = argparse.ArgumentParser(description="Delete old agent checkpoints.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+    parser.add_argument("--compact", action="store_true", help="Also run compact to return the freed space to the OS.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    totals = run_compaction(dry_run=args.dry_run)
+    verb = "Would reclaim" if args.dry_run else "Reclaimed"
+    print(f"{verb} {totals['reclaimed_bytes']} bytes "
+          f"({totals['checkpoints']['documents']} checkpoints, {totals['writes']['documents']} writes; "
+          f"{totals['expired_threads']} expired threads, {totals['trimmed_threads']} trimmed threads).")
+    if args.compact and not args.dry_run:
+        print(f"compact freed {release_storage(get_memory_db())} bytes on disk.")
+
+
+if __name__ == "__main__":
+    main()
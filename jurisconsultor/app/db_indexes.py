@@ -0,0 +1,198 @@
+import sys
+import argparse
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Required MongoDB indexes of the application database.
+# Every hot query of the routers, the scraper and the job queue is backed by one
+# of the indexes below. At startup the missing ones are created in a background
+# thread, so the API starts serving immediately; `python db_indexes.py` reports
+# which required indexes are missing and which existing ones are never used
+# (from $indexStats), and creates the missing ones with --create.
+# Indexes are matched by key and by the options that change what they enforce or
+# cover (unique, sparse, partialFilterExpression). An existing index with the same
+# key but other options is reported as a conflict and left alone: it must be
+# dropped by hand (e.g. after removing duplicates, for a unique index).
+
+REQUIRED_INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("company_id", ASCENDING)], name="company_id"),
+    ],
+    "companies": [
+        IndexModel([("name", ASCENDING)], name="name"),
+    ],
+    "projects": [
+        IndexModel([("company_id", ASCENDING), ("is_archived", ASCENDING)], name="company_id_is_archived"),
+        IndexModel([("members", ASCENDING), ("is_archived", ASCENDING)], name="members_is_archived"),
+    ],
+    "tasks": [
+        IndexModel([("project_id", ASCENDING)], name="project_id"),
+    ],
+    "generated_documents": [
+        IndexModel([("project_id", ASCENDING), ("is_archived", ASCENDING), ("_id", DESCENDING)], name="project_id_is_archived_id"),
+        IndexModel([("owner_email", ASCENDING), ("is_archived", ASCENDING), ("_id", DESCENDING)], name="owner_email_is_archived_id"),
+        IndexModel([("batch_id", ASCENDING)], name="batch_id", sparse=True),
+    ],
+    "documents": [
+        IndexModel([("source", ASCENDING), ("company_id", ASCENDING)], name="source_company_id"),
+    ],
+    "scraping_sources": [
+        IndexModel([("url", ASCENDING)], name="url"),
+        IndexModel([("next_check_at", ASCENDING)], name="next_check_at"),
+    ],
+    "jobs": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+    ],
+    "document_batches": [
+        IndexModel([("owner_email", ASCENDING), ("created_at", DESCENDING)], name="owner_email_created_at"),
+    ],
+}
+
+
+def _key_of(index_spec) -> Tuple[Tuple[str, int], ...]:
+    """Normalizes an index key (from an IndexModel or index_information()) for comparison."""
+    # Directions may come back as floats (1.0); special indexes use strings ('text', '2dsphere')
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in index_spec)
+
+
+def _options_of(index: dict) -> Dict[str, Any]:
+    """The options compared between a required and an existing index (absent = default)."""
+    partial = index.get("partialFilterExpression")
+    return {
+        "unique": bool(index.get("unique")),
+        "sparse": bool(index.get("sparse")),
+        "partialFilterExpression": dict(partial) if partial else None,
+    }
+
+
+def existing_indexes(db: Database, collection_name: str) -> Dict[Tuple[Tuple[str, int], ...], List[Tuple[str, dict]]]:
+    """Returns {normalized key: [(index name, options)]} for the indexes of a collection.
+    Several indexes may share a key (e.g. with different partial filters)."""
+    existing = {}
+    for name, index in db[collection_name].index_information().items():
+        existing.setdefault(_key_of(index["key"]), []).append((name, _options_of(index)))
+    return existing
+
+
+def compare_indexes(db: Database) -> Tuple[List[Tuple[str, IndexModel]], List[Tuple[str, IndexModel, str]]]:
+    """Matches the required indexes against the existing ones, by key and options rather
+    than by name. Returns (missing, conflicts): conflicts are (collection, required index,
+    name of the existing index with the same key but different options)."""
+    missing, conflicts = [], []
+    for collection_name, models in REQUIRED_INDEXES.items():
+        existing = existing_indexes(db, collection_name)
+        for model in models:
+            same_key = existing.get(_key_of(model.document["key"].items()), [])
+            if any(options == _options_of(model.document) for _, options in same_key):
+                continue
+            if same_key:
+                conflicts.append((collection_name, model, same_key[0][0]))
+            else:
+                missing.append((collection_name, model))
+    return missing, conflicts
+
+
+def missing_indexes(db: Database) -> List[Tuple[str, IndexModel]]:
+    """Lists the required indexes that do not exist yet (with their options)."""
+    return compare_indexes(db)[0]
+
+
+def _describe_conflict(collection_name: str, model: IndexModel, existing_name: str) -> str:
+    return (f"{collection_name}.{model.document['name']} requires {_options_of(model.document)}, "
+            f"but the index {existing_name} has the same key with other options")
+
+
+def ensure_indexes(db: Database) -> List[str]:
+    """Creates the missing required indexes, one at a time, and returns the names created.
+    A failing index (e.g. a unique index over duplicated data) is logged and skipped, and
+    so is a required index conflicting with an existing one."""
+    created = []
+    missing, conflicts = compare_indexes(db)
+    for conflict in conflicts:
+        logger.error(f"Index conflict: {_describe_conflict(*conflict)}; drop it to create the required index.")
+    for collection_name, model in missing:
+        name = model.document["name"]
+        try:
+            db[collection_name].create_indexes([model])
+            created.append(f"{collection_name}.{name}")
+            logger.info(f"Created index {collection_name}.{name}.")
+        except OperationFailure as e:
+            logger.error(f"Could not create index {collection_name}.{name}: {e}")
+    return created
+
+
+def ensure_indexes_in_background(get_db: Callable[[], Database]) -> threading.Thread:
+    """Runs ensure_indexes in a daemon thread so startup is not delayed by index builds."""
+    def build():
+        try:
+            created = ensure_indexes(get_db())
+            logger.info(f"Index bootstrap finished; {len(created)} indexes created.")
+        except PyMongoError as e:
+            logger.error(f"Index bootstrap failed: {e}")
+
+    thread = threading.Thread(target=build, name="index-bootstrap", daemon=True)
+    thread.start()
+    return thread
+
+
+def index_usage(db: Database, collection_name: str) -> Dict[str, dict]:
+    """Returns {index name: {"ops": ..., "since": ...}} from $indexStats for a collection."""
+    usage = {}
+    for stats in db[collection_name].aggregate([{"$indexStats": {}}]):
+        usage[stats["name"]] = {"ops": stats["accesses"]["ops"], "since": stats["accesses"]["since"]}
+    return usage
+
+
+def index_report(db: Database) -> dict:
+    """Reports the missing required indexes, the existing indexes conflicting with them and
+    the existing indexes with no recorded use since the server started. Usage counters are
+    per node and reset on restart."""
+    missing, conflicts = compare_indexes(db)
+    missing = [f"{collection_name}.{model.document['name']}" for collection_name, model in missing]
+    conflicts = [_describe_conflict(*conflict) for conflict in conflicts]
+    unused = []
+    existing_collections = set(db.list_collection_names())
+    for collection_name in sorted(existing_collections):
+        if collection_name.startswith("system."):
+            continue
+        for name, usage in index_usage(db, collection_name).items():
+            if name != "_id_" and usage["ops"] == 0:
+                unused.append({"index": f"{collection_name}.{name}", "since": usage["since"]})
+    return {"missing": missing, "conflicts": conflicts, "unused": unused}
+
+
+def main():
+    from db_manager import get_db
+
+    parser = argparse.ArgumentParser(description="Report or create the required MongoDB indexes.")
+    parser.add_argument("--create", action="store_true", help="Create the missing required indexes.")
+    args = parser.parse_args()
+
+    db = get_db()
+    if args.create:
+        created = ensure_indexes(db)
+        print(f"Created {len(created)} indexes: {', '.join(created) or '-'}")
+
+    report = index_report(db)
+    print(f"Missing required indexes: {len(report['missing'])}")
+    for name in report["missing"]:
+        print(f"  {name}")
+    print(f"Conflicting indexes (same key, other options): {len(report['conflicts'])}")
+    for conflict in report["conflicts"]:
+        print(f"  {conflict}")
+    print(f"Unused indexes (no operations recorded): {len(report['unused'])}")
+    for entry in report["unused"]:
+        print(f"  {entry['index']} (since {entry['since']})")
+    sys.exit(1 if report["missing"] or report["conflicts"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ from jose import JWTError
 from models import TokenData, UserInDB
 from security import verify_token
 from users import get_user
+from user_cache import user_cache
 from db_manager import get_db as get_db_from_manager # Import the new DB getter
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -30,9 +31,15 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Database = Depends
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
+    # Serve repeated requests made with the same token from the in-process cache
+    iat = payload.get("iat")
+    user = user_cache.get(token_data.email, iat)
+    if user is not None:
+        return user
     user = get_user(db, email=token_data.email)
     if user is None:
         raise credentials_exception
+    user_cache.put(token_data.email, iat, user)
     return user
 
 # --- Role-based Dependencies ---
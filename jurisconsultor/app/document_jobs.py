@@ -0,0 +1,102 @@
+import json
+import signal
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict
+
+from bson import ObjectId
+from pymongo.database import Database
+
+import tools as legacy_tools
+import batch_generation
+from job_queue import register_handler, JobWorkerPool, JOB_WORKERS
+from utils import answer_with_rag
+
+logger = logging.getLogger(__name__)
+
+# Document generation logic shared by the HTTP endpoints and the background job
+# workers, plus the job handlers themselves.
+
+
+class DocumentGenerationError(Exception):
+    """Raised when a document could not be rendered or recorded."""
+
+
+def generate_document(db: Database, template_name: str, project_id: ObjectId, document_name: str, context: Dict[str, Any], owner_email: str) -> dict:
+    """Runs the RAG step (when facts are provided), fills the template and records the
+    generated document. Returns the stored `generated_documents` record."""
+    logger.info(f"Context received for document generation: {context}")
+
+    # 1. If 'lista_de_hechos' (facts) are present, use RAG to find legal articles
+    if context.get('lista_de_hechos'):
+        rag_query = f"Based on the following facts: {context['lista_de_hechos']}, what legal articles and laws are applicable? Provide a concise list of articles and laws."
+        logger.info(f"RAG Query: {rag_query}")
+        legal_articles = answer_with_rag(rag_query)
+        logger.info(f"RAG Result (legal_articles): {legal_articles}")
+        # Assign the RAG findings to the most relevant placeholder
+        context["articulos_aplicables"] = legal_articles
+
+    # 2. Fill the template and save the document file
+    result = json.loads(legacy_tools.fill_template_and_save_document(
+        template_name=template_name,
+        document_name=document_name,
+        context=context
+    ))
+    if "error" in result:
+        raise DocumentGenerationError(result["error"])
+    file_path = result.get("file_path")
+    if not file_path:
+        raise DocumentGenerationError("Tool failed to return a file path.")
+
+    # 3. Create the document record in the database
+    doc_data = {
+        "file_name": document_name,
+        "project_id": project_id,
+        "owner_email": owner_email,
+        "file_path": file_path,
+        "is_archived": False,
+        "created_at": datetime.utcnow(),
+    }
+    insert_result = db.generated_documents.insert_one(doc_data)
+    doc_data["_id"] = insert_result.inserted_id
+    return doc_data
+
+
+@register_handler("generate_document")
+def generate_document_job(db: Database, payload: dict) -> dict:
+    document = generate_document(
+        db,
+        template_name=payload["template_name"],
+        project_id=ObjectId(payload["project_id"]),
+        document_name=payload["document_name"],
+        context=payload["context"],
+        owner_email=payload["owner_email"],
+    )
+    return {"document_id": str(document["_id"]), "file_name": document["file_name"]}
+
+
+@register_handler("generate_batch")
+def generate_batch_job(db: Database, payload: dict) -> dict:
+    batch_id = ObjectId(payload["batch_id"])
+    batch_generation.run_batch(db, batch_id, payload["document_name"], payload["contexts"])
+    return {"batch_id": payload["batch_id"]}
+
+
+if __name__ == "__main__":
+    # Standalone worker process: `python document_jobs.py`
+    from logging.config import dictConfig
+    from logging_config import LOGGING_CONFIG
+    from db_manager import get_db
+
+    dictConfig(LOGGING_CONFIG)
+    pool = JobWorkerPool(get_db, max(JOB_WORKERS, 1))
+    pool.start()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    pool.stop()
+    batch_generation.shutdown_executor()
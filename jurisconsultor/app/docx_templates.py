@@ -0,0 +1,256 @@
+import io
+import os
+import re
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import docx
+
+logger = logging.getLogger(__name__)
+
+# In-process cache of parsed .docx template metadata.
+# Parsing a template with python-docx is expensive, and the agent inspects the
+# template on every document it generates. Entries are keyed by path and
+# validated against the file's mtime/size on every lookup, so editing, replacing
+# or deleting a file in the templates directory invalidates its entry automatically.
+#
+# The same entries hold the compiled form of a template used for rendering: the
+# raw file bytes plus a placeholder -> run-location map, so filling a template is
+# a single pass over the paragraphs that actually contain placeholders.
+
+TEMPLATE_DIR = os.getenv("TEMPLATE_DIR", "../formatos/")
+PLACEHOLDER_REGEX = re.compile(r'{{(.*?)}}')
+
+
+class TemplateMetadata:
+    """Parsed information about a template: its placeholders and where they appear."""
+
+    def __init__(self, name: str, path: str, signature: Tuple[int, int], placeholders: List[str], locations: Dict[str, List[str]]):
+        self.name = name
+        self.path = path
+        self.signature = signature
+        self.placeholders = placeholders
+        self.locations = locations
+        # (source bytes, render plan), built on first render by compile_template()
+        self.compiled: Optional[Tuple[bytes, list]] = None
+
+
+class PlaceholderSpan:
+    """Position of one placeholder inside a paragraph, as run indexes and offsets within those runs."""
+
+    __slots__ = ("key", "start_run", "start_offset", "end_run", "end_offset")
+
+    def __init__(self, key: str, start_run: int, start_offset: int, end_run: int, end_offset: int):
+        self.key = key
+        self.start_run = start_run
+        self.start_offset = start_offset
+        self.end_run = end_run
+        self.end_offset = end_offset
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    """Returns the (mtime_ns, size) pair used to detect changes to a file."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _iter_blocks(doc):
+    """Yields (location, block) for every paragraph and table cell of a document."""
+    for p_index, para in enumerate(doc.paragraphs):
+        yield f"paragraph:{p_index}", para
+    for t_index, table in enumerate(doc.tables):
+        for r_index, row in enumerate(table.rows):
+            for c_index, cell in enumerate(row.cells):
+                cell_location = f"table:{t_index}:row:{r_index}:cell:{c_index}"
+                yield cell_location, cell
+                for p_index, para_in_cell in enumerate(cell.paragraphs):
+                    yield f"{cell_location}:paragraph:{p_index}", para_in_cell
+
+
+def parse_template(name: str, path: str, signature: Tuple[int, int]) -> TemplateMetadata:
+    """Opens a .docx template and extracts its placeholders in a robust manner."""
+    doc = docx.Document(path)
+    locations: Dict[str, List[str]] = {}
+
+    for location, block in _iter_blocks(doc):
+        # Reassemble text from runs to handle placeholders split across runs
+        full_run_text = "".join(run.text for run in getattr(block, "runs", []))
+        for match in PLACEHOLDER_REGEX.finditer(full_run_text):
+            placeholder_locations = locations.setdefault(match.group(1).strip(), [])
+            if location not in placeholder_locations:
+                placeholder_locations.append(location)
+
+    if not locations:
+        # If the above fails, fall back to a simpler full-text search
+        full_text = "\n".join([p.text for p in doc.paragraphs])
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    full_text += "\n" + cell.text
+        for match in PLACEHOLDER_REGEX.finditer(full_text):
+            locations.setdefault(match.group(1).strip(), [])
+
+    return TemplateMetadata(name, path, signature, list(locations), locations)
+
+
+def _iter_paragraphs(doc):
+    """Yields every paragraph of the document body and its tables (including nested
+    tables) exactly once, in a deterministic order. Merged cells are visited once."""
+    seen_cells = set()
+
+    def walk_tables(tables):
+        for table in tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    if cell._tc in seen_cells:
+                        continue
+                    seen_cells.add(cell._tc)
+                    yield from cell.paragraphs
+                    yield from walk_tables(cell.tables)
+
+    yield from doc.paragraphs
+    yield from walk_tables(doc.tables)
+
+
+def _compile_paragraph(runs) -> List[PlaceholderSpan]:
+    """Maps every placeholder in a paragraph to the runs it spans."""
+    run_texts = [run.text for run in runs]
+    full_text = "".join(run_texts)
+    if "{{" not in full_text:
+        return []
+
+    # Offset in full_text where each run starts
+    run_starts = []
+    position = 0
+    for text in run_texts:
+        run_starts.append(position)
+        position += len(text)
+
+    def locate(offset: int, is_end: bool) -> Tuple[int, int]:
+        for index in range(len(run_texts) - 1, -1, -1):
+            start = run_starts[index]
+            if start < offset or (start == offset and not is_end):
+                return index, offset - start
+        return 0, 0
+
+    spans = []
+    for match in PLACEHOLDER_REGEX.finditer(full_text):
+        start_run, start_offset = locate(match.start(), is_end=False)
+        end_run, end_offset = locate(match.end(), is_end=True)
+        spans.append(PlaceholderSpan(match.group(1).strip(), start_run, start_offset, end_run, end_offset))
+    return spans
+
+
+def compile_template(source: bytes) -> list:
+    """Builds the render plan of a template: a list of (paragraph index, spans)
+    for the paragraphs that contain placeholders."""
+    doc = docx.Document(io.BytesIO(source))
+    plan = []
+    for index, paragraph in enumerate(_iter_paragraphs(doc)):
+        spans = _compile_paragraph(paragraph.runs)
+        if spans:
+            plan.append((index, spans))
+    return plan
+
+
+def _replace_span(runs, span: PlaceholderSpan, value: str):
+    """Replaces a placeholder with its value. The value takes the formatting of the
+    run where the placeholder starts; every other run keeps its own formatting."""
+    first = runs[span.start_run]
+    if span.start_run == span.end_run:
+        text = first.text
+        first.text = text[:span.start_offset] + value + text[span.end_offset:]
+        return
+    first.text = first.text[:span.start_offset] + value
+    for run in runs[span.start_run + 1:span.end_run]:
+        run.text = ""
+    last = runs[span.end_run]
+    last.text = last.text[span.end_offset:]
+
+
+def render_compiled(source: bytes, plan: list, context: Dict[str, Any]):
+    """Renders a compiled template with the given context in a single pass and returns
+    the python-docx Document. Placeholders without a value in the context are left as is."""
+    doc = docx.Document(io.BytesIO(source))
+    values = {str(key).strip(): str(value) for key, value in context.items()}
+    paragraphs = list(_iter_paragraphs(doc))
+    for index, spans in plan:
+        runs = paragraphs[index].runs
+        # Right to left, so the offsets of the earlier spans stay valid
+        for span in reversed(spans):
+            if span.key in values:
+                _replace_span(runs, span, values[span.key])
+    return doc
+
+
+class TemplateCache:
+    """Thread-safe cache of template metadata for a templates directory."""
+
+    def __init__(self, template_dir: str):
+        self.template_dir = template_dir
+        self._entries: Dict[str, TemplateMetadata] = {}
+        self._listing: Optional[Tuple[int, List[str]]] = None
+        self._lock = threading.Lock()
+
+    def get(self, template_name: str) -> TemplateMetadata:
+        """Returns the metadata of a template, parsing it only if it changed since the last call.
+        Raises FileNotFoundError if the template does not exist."""
+        path = os.path.join(self.template_dir, template_name)
+        if not os.path.exists(path):
+            with self._lock:
+                self._entries.pop(path, None)
+            raise FileNotFoundError(f"Template '{template_name}' not found.")
+
+        signature = _file_signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry
+
+        logger.info(f"Parsing template '{template_name}' (cache {'stale' if entry else 'miss'}).")
+        entry = parse_template(template_name, path, signature)
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def list_templates(self) -> List[str]:
+        """Lists the .docx templates in the directory, re-reading it only when its mtime changes."""
+        try:
+            dir_mtime = os.stat(self.template_dir).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        with self._lock:
+            if self._listing is not None and self._listing[0] == dir_mtime:
+                return list(self._listing[1])
+
+        names = sorted(f for f in os.listdir(self.template_dir) if f.endswith('.docx'))
+        current_paths = {os.path.join(self.template_dir, n) for n in names}
+        with self._lock:
+            self._listing = (dir_mtime, names)
+            # Drop entries for templates that were removed from the directory
+            for path in [p for p in self._entries if p not in current_paths]:
+                del self._entries[path]
+        return list(names)
+
+    def render(self, template_name: str, context: Dict[str, Any]):
+        """Fills a template with the context and returns the resulting python-docx Document.
+        The template is compiled once and reused until the file changes."""
+        entry = self.get(template_name)
+        compiled = entry.compiled
+        if compiled is None:
+            with open(entry.path, "rb") as f:
+                source = f.read()
+            compiled = (source, compile_template(source))
+            entry.compiled = compiled
+        return render_compiled(compiled[0], compiled[1], context)
+
+    def clear(self):
+        """Drops every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self._listing = None
+
+
+template_cache = TemplateCache(TEMPLATE_DIR)
@@ -0,0 +1,55 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Inference backends for the embedding model.
+# EMBEDDING_BACKEND selects how the SentenceTransformer runs on CPU:
+#   torch      full-precision PyTorch (the default)
+#   onnx       ONNX Runtime, same weights (float32)
+#   onnx-int8  ONNX Runtime with dynamically quantized int8 weights
+# The int8 model is exported once to EMBEDDING_ONNX_DIR and reused afterwards.
+# EMBEDDING_QUANTIZATION must match the CPUs that run it (avx2, avx512,
+# avx512_vnni or arm64). The ONNX backends need `sentence-transformers[onnx]`.
+# benchmarks/bench_embedding_backends.py compares their throughput, their vectors
+# and their retrieval recall with the torch backend.
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join(os.path.dirname(__file__), "..", "models", "onnx"))
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "avx2")
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def quantized_model_dir(model_name: str) -> str:
+    return os.path.join(EMBEDDING_ONNX_DIR, model_name.replace("/", "__"))
+
+
+def _load_quantized(model_name: str):
+    from sentence_transformers import SentenceTransformer
+
+    export_dir = quantized_model_dir(model_name)
+    file_name = f"onnx/model_qint8_{EMBEDDING_QUANTIZATION}.onnx"
+    if not os.path.exists(os.path.join(export_dir, file_name)):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info(f"Exporting an int8 ONNX version of {model_name} to {export_dir}...")
+        model = SentenceTransformer(model_name, backend="onnx")
+        # The tokenizer and pooling configuration are loaded from the same directory
+        model.save(export_dir)
+        export_dynamic_quantized_onnx_model(model, EMBEDDING_QUANTIZATION, export_dir)
+    return SentenceTransformer(export_dir, backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def load_model(model_name: str, backend: str = EMBEDDING_BACKEND):
+    """Loads `model_name` as a SentenceTransformer running on `backend`."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Expected one of: {', '.join(BACKENDS)}.")
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Loading embedding model {model_name} with the {backend} backend.")
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    return _load_quantized(model_name)
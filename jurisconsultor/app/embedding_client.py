@@ -0,0 +1,65 @@
+import os
+import logging
+import threading
+from typing import List, Optional
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Client of the shared embedding service (embedding_server.py).
+# When EMBEDDING_SERVICE_URL is set, generate_embedding() calls the service instead
+# of loading the model in this process. Calls go through one pooled session, and
+# long inputs are sent in chunks of EMBEDDING_SERVICE_CHUNK texts.
+
+EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL", "")
+EMBEDDING_SERVICE_TIMEOUT = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT", 30))
+EMBEDDING_SERVICE_CHUNK = int(os.getenv("EMBEDDING_SERVICE_CHUNK", 128))
+
+
+class EmbeddingServiceClient:
+    """Calls the /embed endpoint of the embedding service."""
+
+    def __init__(self, base_url: str = EMBEDDING_SERVICE_URL, timeout: float = EMBEDDING_SERVICE_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def embed(self, texts: List[str], model_name: Optional[str] = None) -> np.ndarray:
+        """Returns one vector per text, as a float32 matrix. `model_name` defaults to the service's model."""
+        vectors = []
+        for start in range(0, len(texts), EMBEDDING_SERVICE_CHUNK):
+            response = self.session.post(
+                f"{self.base_url}/embed",
+                json={"texts": texts[start:start + EMBEDDING_SERVICE_CHUNK], "model": model_name},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            vectors.extend(response.json()["embeddings"])
+        return np.asarray(vectors, dtype=np.float32)
+
+    def health(self) -> dict:
+        response = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+_client: Optional[EmbeddingServiceClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> Optional[EmbeddingServiceClient]:
+    """Returns the service client, or None if no EMBEDDING_SERVICE_URL is configured."""
+    global _client
+    if not EMBEDDING_SERVICE_URL:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = EmbeddingServiceClient()
+            logger.info(f"Embeddings are computed by the service at {EMBEDDING_SERVICE_URL}.")
+        return _client
@@ -0,0 +1,475 @@
+import os
+import re
+import sys
+import time
+import argparse
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+# Embedding models of the documents table.
+# Several embedding models can coexist. The registry (`embedding_models`) lists
+# them; the original `documents.embedding` column is the "legacy" model, and
+# every model added later gets its own table (document_id, embedding) sized to
+# its dimension. Exactly one model is active: retrieval embeds the question with
+# it and searches its vectors.
+# Switching models is non-destructive:
+#   1. register the new model (status "building");
+#   2. the re-embedding job fills its table in batches from documents.content,
+#      without re-parsing the PDFs (the scheduler runs it, or use the CLI);
+#      new documents are embedded with every active or building model;
+#   3. once every document has a vector, the model is activated in a single
+#      transaction (optionally automatically). The previous model is retired but
+#      its vectors are kept, so switching back only needs the new documents.
+#
+# Each model also has a storage format for its vectors (db_migration.py
+# --storage for documents.embedding, `register --storage` for the others):
+#   vector    float32, exact search (the default)
+#   halfvec   float16: half the size, the ranking barely changes
+#   binary    float32 vectors plus an HNSW index over their binary quantization:
+#             a coarse Hamming pass picks EMBEDDING_BINARY_CANDIDATES candidates
+#             per result, then they are re-scored with the float vectors
+#   truncate  the first `dimension` components, renormalized (Matryoshka). Only
+#             for models trained for it; others lose much of their recall.
+# halfvec and binary need pgvector 0.7 or later.
+# benchmarks/bench_vector_storage.py compares their recall, latency and size.
+#
+#   python embedding_models.py init      (once, for databases created before the registry)
+#   python embedding_models.py status
+#   python embedding_models.py register wilfredomartel/multilingual-e5-large-es-legal-v2 --activate-when-complete
+#   python embedding_models.py reembed wilfredomartel/multilingual-e5-large-es-legal-v2
+#   python embedding_models.py activate wilfredomartel/multilingual-e5-large-es-legal-v2
+
+EMBEDDING_REEMBED_BATCH_SIZE = int(os.getenv("EMBEDDING_REEMBED_BATCH_SIZE", 256))
+EMBEDDING_REEMBED_MAX_BATCHES = int(os.getenv("EMBEDDING_REEMBED_MAX_BATCHES", 40))
+EMBEDDING_REEMBED_MINUTES = int(os.getenv("EMBEDDING_REEMBED_MINUTES", 10))
+ACTIVE_MODEL_CACHE_SECONDS = float(os.getenv("EMBEDDING_ACTIVE_MODEL_CACHE_SECONDS", 30))
+EMBEDDING_BINARY_CANDIDATES = int(os.getenv("EMBEDDING_BINARY_CANDIDATES", 10))
+
+ACTIVE, BUILDING, RETIRED = "active", "building", "retired"
+VECTOR, HALFVEC, BINARY, TRUNCATE = "vector", "halfvec", "binary", "truncate"
+STORAGES = (VECTOR, HALFVEC, BINARY, TRUNCATE)
+
+REGISTRY_DDL = """
+    CREATE TABLE IF NOT EXISTS embedding_models (
+        id SERIAL PRIMARY KEY,
+        model_name VARCHAR(255) NOT NULL UNIQUE,
+        dimension INTEGER NOT NULL,
+        table_name VARCHAR(63),
+        status VARCHAR(16) NOT NULL,
+        activate_when_complete BOOLEAN NOT NULL DEFAULT FALSE,
+        created_at TIMESTAMP NOT NULL DEFAULT now(),
+        activated_at TIMESTAMP,
+        storage VARCHAR(16) NOT NULL DEFAULT 'vector'
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS embedding_models_one_active ON embedding_models (status) WHERE status = 'active';
+"""
+
+MODEL_COLUMNS = "id, model_name, dimension, table_name, status, activate_when_complete, storage"
+
+
+def column_type(storage: str, dimension: int) -> str:
+    """Column type of vectors stored in `storage` format; `dimension` is the stored one."""
+    if storage not in STORAGES:
+        raise ValueError(f"Unknown vector storage '{storage}'. Expected one of: {', '.join(STORAGES)}.")
+    return f"HALFVEC({dimension})" if storage == HALFVEC else f"VECTOR({dimension})"
+
+
+def binary_index_sql(table_name: str, dimension: int) -> str:
+    """The index the coarse pass of binary storage searches."""
+    return (
+        f"CREATE INDEX IF NOT EXISTS {table_name}_embedding_bq_idx ON {table_name} "
+        f"USING hnsw ((binary_quantize(embedding)::bit({dimension})) bit_hamming_ops);"
+    )
+
+
+@dataclass(frozen=True)
+class EmbeddingModel:
+    id: int
+    model_name: str
+    dimension: int
+    # None for the legacy model, whose vectors are in documents.embedding
+    table_name: Optional[str]
+    status: str
+    activate_when_complete: bool = False
+    storage: str = VECTOR
+
+    @property
+    def is_legacy(self) -> bool:
+        return self.table_name is None
+
+    @property
+    def vector_type(self) -> str:
+        return "halfvec" if self.storage == HALFVEC else "vector"
+
+    def prepare(self, vectors) -> np.ndarray:
+        """The vectors as stored: Matryoshka storage keeps the first `dimension` components, renormalized."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.storage != TRUNCATE:
+            return vectors
+        truncated = vectors[..., :self.dimension]
+        return truncated / np.linalg.norm(truncated, axis=-1, keepdims=True)
+
+    def search_query(self, embedding: str, top_k: int) -> Tuple[str, tuple]:
+        """Nearest-neighbour query over this model's vectors, with its parameters."""
+        if self.is_legacy:
+            source, column = "documents d", "d.embedding"
+        else:
+            source, column = f"documents d JOIN {self.table_name} e ON e.document_id = d.id", "e.embedding"
+        query = f"%s::{self.vector_type}"
+        if self.storage != BINARY:
+            return (
+                f"SELECT d.content, d.source FROM {source} ORDER BY {column} <-> {query} LIMIT %s;",
+                (embedding, top_k),
+            )
+        bits = f"bit({self.dimension})"
+        return (
+            f"SELECT content, source FROM ("
+            f"SELECT d.content, d.source, {column} AS embedding FROM {source} "
+            f"ORDER BY binary_quantize({column})::{bits} <~> binary_quantize({query})::{bits} LIMIT %s"
+            f") candidates ORDER BY embedding <-> {query} LIMIT %s;",
+            (embedding, top_k * EMBEDDING_BINARY_CANDIDATES, embedding, top_k),
+        )
+
+    def missing_sql(self) -> str:
+        """Documents without a vector for this model, after a given id; parameters: (last_id, limit)."""
+        if self.is_legacy:
+            return "SELECT id, content FROM documents WHERE embedding IS NULL AND id > %s ORDER BY id LIMIT %s;"
+        return (
+            f"SELECT d.id, d.content FROM documents d WHERE d.id > %s "
+            f"AND NOT EXISTS (SELECT 1 FROM {self.table_name} e WHERE e.document_id = d.id) ORDER BY d.id LIMIT %s;"
+        )
+
+
+def table_name_for(model_name: str, dimension: int) -> str:
+    """A valid, unique PostgreSQL table name for a model's vectors."""
+    slug = re.sub(r"[^a-z0-9]+", "_", model_name.lower()).strip("_")[:24]
+    digest = hashlib.sha1(model_name.encode()).hexdigest()[:8]
+    return f"document_embeddings_{slug}_{dimension}_{digest}"
+
+
+def _row_to_model(row) -> EmbeddingModel:
+    return EmbeddingModel(*row)
+
+
+def registry_exists(cur) -> bool:
+    cur.execute("SELECT to_regclass('embedding_models') IS NOT NULL;")
+    return cur.fetchone()[0]
+
+
+def implicit_legacy_model() -> EmbeddingModel:
+    """documents.embedding as described by the environment, for databases without a registry."""
+    return EmbeddingModel(
+        0, os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"), int(os.getenv("EMBEDDING_DIMENSION", 384)), None, ACTIVE
+    )
+
+
+def _upgrade_registry(cur):
+    """Adds the storage column to registries created before it. ALTER TABLE locks the
+    registry exclusively, so it only runs when the column is missing."""
+    cur.execute(
+        "SELECT 1 FROM pg_attribute WHERE attrelid = 'embedding_models'::regclass "
+        "AND attname = 'storage' AND NOT attisdropped;"
+    )
+    if cur.fetchone() is None:
+        cur.execute("ALTER TABLE embedding_models ADD COLUMN storage VARCHAR(16) NOT NULL DEFAULT 'vector';")
+        logger.info("Added the storage column to the embedding model registry.")
+
+
+def create_registry(cur):
+    """Creates the registry and registers documents.embedding as the active legacy model,
+    or upgrades an existing registry. Schema setup only: db_migration.py,
+    `embedding_models.py init` and register_model run it; the lookups below only read
+    the registry."""
+    if registry_exists(cur):
+        _upgrade_registry(cur)
+        return
+    cur.execute(REGISTRY_DDL)
+    cur.execute("SELECT count(*) FROM embedding_models;")
+    if cur.fetchone()[0]:
+        return
+    # Databases created before the registry: read the dimension from the column type, e.g. vector(384)
+    cur.execute(
+        "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = 'documents'::regclass AND attname = 'embedding';"
+    )
+    row = cur.fetchone()
+    match = re.fullmatch(r"(\w+)\((\d+)\)", row[0]) if row else None
+    dimension = int(match.group(2)) if match else int(os.getenv("EMBEDDING_DIMENSION", 384))
+    storage = HALFVEC if match and match.group(1) == "halfvec" else VECTOR
+    register_legacy_model(cur, os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"), dimension, storage)
+
+
+def register_legacy_model(cur, model_name: str, dimension: int, storage: str = VECTOR):
+    """Registers documents.embedding as the active model (db_migration.py does it for new databases)."""
+    cur.execute(
+        "INSERT INTO embedding_models (model_name, dimension, table_name, status, storage, activated_at) "
+        "VALUES (%s, %s, NULL, %s, %s, now()) ON CONFLICT DO NOTHING;",
+        (model_name, dimension, ACTIVE, storage),
+    )
+
+
+def list_models(cur) -> List[EmbeddingModel]:
+    if not registry_exists(cur):
+        return [implicit_legacy_model()]
+    cur.execute(f"SELECT {MODEL_COLUMNS} FROM embedding_models ORDER BY id;")
+    return [_row_to_model(row) for row in cur.fetchall()] or [implicit_legacy_model()]
+
+
+def get_model(cur, model_name: str) -> EmbeddingModel:
+    if not registry_exists(cur):
+        raise LookupError("There is no embedding model registry; run `python embedding_models.py init`.")
+    cur.execute(f"SELECT {MODEL_COLUMNS} FROM embedding_models WHERE model_name = %s;", (model_name,))
+    row = cur.fetchone()
+    if row is None:
+        raise LookupError(f"Embedding model '{model_name}' is not registered.")
+    return _row_to_model(row)
+
+
+def maintained_models(cur) -> List[EmbeddingModel]:
+    """The models new documents must be embedded with: the active one and those being built."""
+    return [model for model in list_models(cur) if model.status in (ACTIVE, BUILDING)]
+
+
+_active_cache: Tuple[Optional[EmbeddingModel], float] = (None, 0.0)
+_active_lock = threading.Lock()
+
+
+def active_model(cur=None) -> EmbeddingModel:
+    """The active model of the public database, cached for ACTIVE_MODEL_CACHE_SECONDS."""
+    global _active_cache
+    with _active_lock:
+        model, expires_at = _active_cache
+        if model is not None and time.monotonic() < expires_at:
+            return model
+    if cur is None:
+        from utils import get_public_db_conn
+        conn = get_public_db_conn()
+        try:
+            with conn.cursor() as own_cur:
+                model = _query_active(own_cur)
+            conn.commit()
+        finally:
+            conn.close()
+    else:
+        model = _query_active(cur)
+    with _active_lock:
+        _active_cache = (model, time.monotonic() + ACTIVE_MODEL_CACHE_SECONDS)
+    return model
+
+
+def _query_active(cur) -> EmbeddingModel:
+    if not registry_exists(cur):
+        return implicit_legacy_model()
+    cur.execute(f"SELECT {MODEL_COLUMNS} FROM embedding_models WHERE status = %s;", (ACTIVE,))
+    row = cur.fetchone()
+    return _row_to_model(row) if row else implicit_legacy_model()
+
+
+def invalidate_active_model():
+    global _active_cache
+    with _active_lock:
+        _active_cache = (None, 0.0)
+
+
+def register_model(conn, model_name: str, dimension: int, activate_when_complete: bool = False,
+                   storage: str = VECTOR) -> EmbeddingModel:
+    """Adds a model in the "building" state, with an empty vector table.
+    `dimension` is the stored one (the truncated size for Matryoshka storage)."""
+    table_name = table_name_for(model_name, dimension)
+    with conn.cursor() as cur:
+        create_registry(cur)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                document_id INTEGER PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+                embedding {column_type(storage, dimension)} NOT NULL
+            );
+        """)
+        if storage == BINARY:
+            cur.execute(binary_index_sql(table_name, dimension))
+        cur.execute(
+            f"INSERT INTO embedding_models (model_name, dimension, table_name, status, activate_when_complete, storage) "
+            f"VALUES (%s, %s, %s, %s, %s, %s) RETURNING {MODEL_COLUMNS};",
+            (model_name, dimension, table_name, BUILDING, activate_when_complete, storage),
+        )
+        model = _row_to_model(cur.fetchone())
+    conn.commit()
+    logger.info(f"Registered embedding model {model_name} ({dimension} dimensions, {storage}) in {table_name}.")
+    return model
+
+
+def embed(model: EmbeddingModel, texts: List[str]) -> np.ndarray:
+    """Embeds `texts` with `model`, as its vectors are stored."""
+    from utils import generate_embeddings
+    return model.prepare(generate_embeddings(texts, model.model_name))
+
+
+def store_embedding(cur, model: EmbeddingModel, document_id: int, vector):
+    """Stores the vector of a new document for a model with its own table."""
+    cur.execute(
+        f"INSERT INTO {model.table_name} (document_id, embedding) VALUES (%s, %s) "
+        f"ON CONFLICT (document_id) DO UPDATE SET embedding = EXCLUDED.embedding;",
+        (document_id, list(map(float, vector))),
+    )
+
+
+def coverage(cur, model: EmbeddingModel) -> Tuple[int, int]:
+    """(documents with a vector for the model, total documents)."""
+    cur.execute("SELECT count(*) FROM documents;")
+    total = cur.fetchone()[0]
+    if model.is_legacy:
+        cur.execute("SELECT count(*) FROM documents WHERE embedding IS NOT NULL;")
+    else:
+        cur.execute(f"SELECT count(*) FROM {model.table_name};")
+    return cur.fetchone()[0], total
+
+
+def reembed(conn, model: EmbeddingModel, batch_size: int = EMBEDDING_REEMBED_BATCH_SIZE,
+            max_batches: Optional[int] = None) -> int:
+    """Embeds, in batches, the documents that have no vector for `model`, from their
+    stored content. Each batch is committed, so the job can stop and resume at any time.
+    Returns the number of documents embedded."""
+    embedded, batches, last_id = 0, 0, 0
+    while max_batches is None or batches < max_batches:
+        with conn.cursor() as cur:
+            cur.execute(model.missing_sql(), (last_id, batch_size))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            vectors = embed(model, [content for _, content in rows])
+            values = [(document_id, list(map(float, vector))) for (document_id, _), vector in zip(rows, vectors)]
+            if model.is_legacy:
+                execute_values(
+                    cur,
+                    f"UPDATE documents SET embedding = v.embedding::{model.vector_type} FROM (VALUES %s) AS v (id, embedding) WHERE documents.id = v.id",
+                    values,
+                )
+            else:
+                execute_values(
+                    cur,
+                    f"INSERT INTO {model.table_name} (document_id, embedding) VALUES %s ON CONFLICT (document_id) DO NOTHING",
+                    values,
+                )
+        conn.commit()
+        embedded += len(rows)
+        batches += 1
+        last_id = rows[-1][0]
+        logger.info(f"Re-embedding {model.model_name}: {embedded} documents embedded so far.")
+    return embedded
+
+
+class IncompleteCoverageError(RuntimeError):
+    """Raised when activating a model that has no vector for some documents."""
+
+
+def activate(conn, model: EmbeddingModel) -> EmbeddingModel:
+    """Makes `model` the active one, atomically, if every document has a vector for it."""
+    with conn.cursor() as cur:
+        # Blocks new documents until the switch commits, so coverage cannot change meanwhile
+        cur.execute("LOCK TABLE documents IN SHARE MODE;")
+        embedded, total = coverage(cur, model)
+        if embedded < total:
+            conn.rollback()
+            raise IncompleteCoverageError(f"{model.model_name} has vectors for {embedded} of {total} documents.")
+        cur.execute("UPDATE embedding_models SET status = %s WHERE status = %s;", (RETIRED, ACTIVE))
+        cur.execute(
+            f"UPDATE embedding_models SET status = %s, activated_at = now() WHERE id = %s RETURNING {MODEL_COLUMNS};",
+            (ACTIVE, model.id),
+        )
+        activated = _row_to_model(cur.fetchone())
+    conn.commit()
+    invalidate_active_model()
+    logger.info(f"Embedding model {model.model_name} is now active.")
+    return activated
+
+
+def run_pending_reembedding(max_batches: int = EMBEDDING_REEMBED_MAX_BATCHES):
+    """Scheduled job: advances every model being built and activates the ones that asked for it."""
+    from utils import get_public_db_conn
+
+    conn = get_public_db_conn()
+    try:
+        with conn.cursor() as cur:
+            building = [model for model in list_models(cur) if model.status == BUILDING]
+        conn.commit()
+        for model in building:
+            reembed(conn, model, max_batches=max_batches)
+            with conn.cursor() as cur:
+                embedded, total = coverage(cur, model)
+            conn.commit()
+            logger.info(f"Embedding model {model.model_name}: {embedded}/{total} documents embedded.")
+            if model.activate_when_complete and embedded == total:
+                activate(conn, model)
+    finally:
+        conn.close()
+
+
+def main():
+    from utils import get_public_db_conn, get_private_db_conn, get_embedding_model
+
+    parser = argparse.ArgumentParser(description="Manage the embedding models of the documents table.")
+    parser.add_argument("--db", choices=["public", "private"], default="public")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="List the models and their coverage.")
+    commands.add_parser("init", help="Create the registry in a database created before it.")
+    register = commands.add_parser("register", help="Add a model and create its vector table.")
+    register.add_argument("model_name")
+    register.add_argument("--dimension", type=int, help="Vector size (read from the model if omitted).")
+    register.add_argument("--activate-when-complete", action="store_true")
+    register.add_argument("--storage", choices=STORAGES, default=VECTOR, help="Storage format of the vectors.")
+    register.add_argument("--truncate-dim", type=int, help="Dimensions kept with --storage truncate.")
+    reembed_parser = commands.add_parser("reembed", help="Embed the documents missing a vector for a model.")
+    reembed_parser.add_argument("model_name")
+    reembed_parser.add_argument("--batch-size", type=int, default=EMBEDDING_REEMBED_BATCH_SIZE)
+    reembed_parser.add_argument("--max-batches", type=int)
+    activate_parser = commands.add_parser("activate", help="Switch retrieval to a fully embedded model.")
+    activate_parser.add_argument("model_name")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    conn = get_public_db_conn() if args.db == "public" else get_private_db_conn()
+    try:
+        if args.command == "init":
+            with conn.cursor() as cur:
+                create_registry(cur)
+            conn.commit()
+        elif args.command == "register":
+            if args.storage == TRUNCATE:
+                if not args.truncate_dim:
+                    parser.error("--storage truncate needs --truncate-dim.")
+                dimension = args.truncate_dim
+            else:
+                dimension = args.dimension or get_embedding_model(args.model_name).get_sentence_embedding_dimension()
+            register_model(conn, args.model_name, dimension, args.activate_when_complete, args.storage)
+        elif args.command == "reembed":
+            with conn.cursor() as cur:
+                model = get_model(cur, args.model_name)
+            print(f"Embedded {reembed(conn, model, args.batch_size, args.max_batches)} documents.")
+        elif args.command == "activate":
+            with conn.cursor() as cur:
+                model = get_model(cur, args.model_name)
+            try:
+                activate(conn, model)
+            except IncompleteCoverageError as e:
+                print(f"Not activated: {e}")
+                sys.exit(1)
+
+        with conn.cursor() as cur:
+            for model in list_models(cur):
+                embedded, total = coverage(cur, model)
+                location = "documents.embedding" if model.is_legacy else model.table_name
+                print(f"{model.status:<9} {model.model_name} ({model.dimension}d {model.storage}, {location}): {embedded}/{total}")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
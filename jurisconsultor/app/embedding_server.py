@@ -0,0 +1,262 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+import embedding_models
+from embedding_backends import load_model
+
+logger = logging.getLogger(__name__)
+
+# Shared embedding service.
+# Loads the embedding model once and serves it over localhost HTTP, so the API
+# workers, the scheduler and the ingestion CLI do not each keep their own copy of
+# the weights in memory (they call it when EMBEDDING_SERVICE_URL is set, see
+# embedding_client.py). Concurrent requests are micro-batched: the texts that
+# arrive within EMBEDDING_BATCH_WAIT_MS (up to EMBEDDING_MAX_BATCH_SIZE texts) are
+# encoded in one forward pass.
+#
+#   uvicorn embedding_server:app --host 0.0.0.0 --port 8002 --workers 1
+#
+# Run it with a single worker: every worker process loads its own model.
+# It serves the models of the registry (embedding_models.py): the active one,
+# loaded at startup, and those being re-embedded, loaded on first request. Each
+# model has its own batcher holding its own copy of the weights; requests for
+# unregistered models are rejected. A model that leaves the registry (retired by
+# an activation) is still served for EMBEDDING_RETIRED_GRACE_SECONDS, since the
+# API processes keep using their cached active model for up to
+# ACTIVE_MODEL_CACHE_SECONDS; it is unloaded afterwards.
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", 64))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5))
+EMBEDDING_MAX_TEXTS_PER_REQUEST = int(os.getenv("EMBEDDING_MAX_TEXTS_PER_REQUEST", 256))
+EMBEDDING_RETIRED_GRACE_SECONDS = float(
+    os.getenv("EMBEDDING_RETIRED_GRACE_SECONDS", 2 * embedding_models.ACTIVE_MODEL_CACHE_SECONDS)
+)
+
+
+class MicroBatcher:
+    """Merges concurrent encode requests into batches processed by one worker thread."""
+
+    def __init__(self, encode: Callable[[List[str]], Any], max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+                 max_wait_seconds: float = EMBEDDING_BATCH_WAIT_MS / 1000):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._submit_lock = threading.Lock()
+        self._stopped = False
+        self.batches = 0
+        self.texts = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._submit_lock:
+            self._stopped = True
+            self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queues `texts`; the future resolves to their vectors, in order."""
+        future = Future()
+        with self._submit_lock:
+            if self._stopped:
+                raise RuntimeError("The batcher is stopped.")
+            self._queue.put((texts, future))
+        return future
+
+    def _collect(self, first: tuple):
+        """Takes queued requests until the batch is full or the wait time is over."""
+        pending = [first]
+        count = len(first[0])
+        deadline = time.monotonic() + self.max_wait_seconds
+        stop = False
+        while count < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            pending.append(item)
+            count += len(item[0])
+        return pending, stop
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            pending, stop = self._collect(item)
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                vectors = self.encode(texts)
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} texts failed: {e}", exc_info=True)
+                for _, future in pending:
+                    future.set_exception(e)
+            else:
+                offset = 0
+                for request_texts, future in pending:
+                    future.set_result(vectors[offset:offset + len(request_texts)])
+                    offset += len(request_texts)
+                self.batches += 1
+                self.texts += len(texts)
+            if stop:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+    model: Optional[str] = None
+
+
+app = FastAPI(title="Jurisconsultor embedding service")
+batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+# The registry's active model, served when a request names none
+default_model = EMBEDDING_MODEL_NAME
+
+_registered: Tuple[Set[str], float] = (set(), 0.0)
+_registered_lock = threading.Lock()
+# Models that left the registry: name -> time until which they are still served
+_retiring: Dict[str, float] = {}
+
+
+def _read_registry() -> Tuple[str, Set[str]]:
+    """(active model, active and building models) from the registry, or the configured model
+    alone if the registry cannot be read."""
+    try:
+        from utils import get_public_db_conn
+        conn = get_public_db_conn()
+        try:
+            with conn.cursor() as cur:
+                models = embedding_models.maintained_models(cur)
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Could not read the embedding model registry ({e}); serving {EMBEDDING_MODEL_NAME} only.")
+        return EMBEDDING_MODEL_NAME, {EMBEDDING_MODEL_NAME}
+    active = next((model.model_name for model in models if model.status == embedding_models.ACTIVE), EMBEDDING_MODEL_NAME)
+    return active, {model.model_name for model in models}
+
+
+def registered_models() -> Set[str]:
+    """The models the service may load, refreshed every ACTIVE_MODEL_CACHE_SECONDS. Models
+    that left the registry (retired) stay available for EMBEDDING_RETIRED_GRACE_SECONDS,
+    then are unloaded on the next refresh."""
+    global _registered, default_model
+    with _registered_lock:
+        served, expires_at = _registered
+        now = time.monotonic()
+        if now < expires_at:
+            return served
+        default_model, names = _read_registry()
+        for name in served - names:
+            _retiring.setdefault(name, now + EMBEDDING_RETIRED_GRACE_SECONDS)
+        for name in list(_retiring):
+            if name in names or _retiring[name] <= now:
+                del _retiring[name]
+        served = names | set(_retiring)
+        _registered = (served, now + embedding_models.ACTIVE_MODEL_CACHE_SECONDS)
+    with _batchers_lock:
+        retired = [name for name in batchers if name not in served]
+        for name in retired:
+            batchers.pop(name).stop()
+            logger.info(f"Unloaded embedding model {name}: it is no longer in the registry.")
+    return served
+
+
+def _encoder(model) -> Callable[[List[str]], Any]:
+    def encode(texts: List[str]):
+        return model.encode(texts, batch_size=EMBEDDING_MAX_BATCH_SIZE, convert_to_numpy=True)
+    return encode
+
+
+def batcher_for(model_name: str) -> MicroBatcher:
+    """The batcher of `model_name`, started (and the model loaded) on first use. Each batcher
+    owns its model, so serving several models never evicts and reloads one from disk."""
+    with _batchers_lock:
+        batcher = batchers.get(model_name)
+        if batcher is None:
+            start = time.perf_counter()
+            model = load_model(model_name)
+            logger.info(f"Embedding model {model_name} loaded in {time.perf_counter() - start:.1f} s.")
+            batcher = batchers[model_name] = MicroBatcher(_encoder(model))
+            batcher.start()
+        return batcher
+
+
+@app.on_event("startup")
+def load_active_model():
+    registered_models()
+    batcher_for(default_model)
+
+
+@app.on_event("shutdown")
+def stop_batchers():
+    global _registered
+    with _batchers_lock:
+        for batcher in batchers.values():
+            batcher.stop()
+        batchers.clear()
+    with _registered_lock:
+        _registered = (set(), 0.0)
+        _retiring.clear()
+
+
+@app.post("/embed")
+async def embed(request: EmbedRequest):
+    names = await asyncio.to_thread(registered_models)
+    model_name = request.model or default_model
+    if model_name not in names:
+        raise HTTPException(status_code=404, detail=f"Embedding model '{model_name}' is not registered.")
+    if not request.texts:
+        return {"model": model_name, "embeddings": []}
+    if len(request.texts) > EMBEDDING_MAX_TEXTS_PER_REQUEST:
+        raise HTTPException(status_code=413, detail=f"At most {EMBEDDING_MAX_TEXTS_PER_REQUEST} texts per request.")
+    batcher = batchers.get(model_name) or await asyncio.to_thread(batcher_for, model_name)
+    try:
+        future = batcher.submit(request.texts)
+    except RuntimeError:
+        # Unloaded meanwhile (retired, or shutting down)
+        raise HTTPException(status_code=503, detail=f"Embedding model '{model_name}' is being unloaded.")
+    vectors = await asyncio.wrap_future(future)
+    return {"model": model_name, "embeddings": vectors.tolist()}
+
+
+@app.get("/health")
+def health():
+    batcher = batchers.get(default_model)
+    return {
+        "status": "ok",
+        "model": default_model,
+        **(batcher.stats() if batcher else {}),
+        "models": {name: batcher.stats() for name, batcher in batchers.items()},
+    }
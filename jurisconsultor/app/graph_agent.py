@@ -3,10 +3,11 @@ import json
 import re
 from typing import Annotated, List, TypedDict
 from dotenv import load_dotenv
-from langchain_core.messages import SystemMessage, AIMessage, HumanMessage, ToolMessage, ToolMessage
+from langchain_core.messages import SystemMessage, AIMessage, HumanMessage, ToolMessage, ToolMessage, RemoveMessage
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
 from langgraph.checkpoint.mongodb import MongoDBSaver
 import logging
@@ -15,6 +16,10 @@ logger = logging.getLogger(__name__)
 
 import tools as legacy_tools
 import utils
+import intent_router
+import memory_policy
+import parallel_tools
+import terminal_tools
 from db_manager import get_memory_db
 
 # Load environment variables from the root .env file
@@ -26,7 +31,10 @@ else:
 
 # --- 1. Define the State ---
 class AgentState(TypedDict):
-    messages: Annotated[list, lambda x, y: x + y]
+    # add_messages supports RemoveMessage, used by the memory node to drop folded turns
+    messages: Annotated[list, add_messages]
+    # Rolling summary of the turns removed from `messages` (see memory_policy.py)
+    summary: str
     access_token: str
     company_id: str
 
@@ -61,6 +69,11 @@ def list_tasks_for_project(project_id: str) -> str:
     """Lista todas las tareas para un proyecto dado. Úsese cuando el usuario pida ver las tareas o el estado de un proyecto."""
     return legacy_tools.list_tasks_for_project(project_id)
 
+# Tools whose output is already the answer (see terminal_tools.py)
+answer_legal_question_with_rag.metadata = {"terminal": "answer"}
+list_projects.metadata = {"terminal": "projects"}
+list_tasks_for_project.metadata = {"terminal": "tasks"}
+
 # --- 3. Define the Graph Nodes ---
 agent_tools = [
     get_template_placeholders,
@@ -75,37 +88,27 @@ logger.debug(f"Agent tools initialized: {[t.name for t in agent_tools]}")
 # Create a dictionary of tools by name for easy lookup
 tools_by_name = {t.name: t for t in agent_tools}
 
-def parse_and_execute_function_from_text(content: str, state: AgentState) -> str:
-    """
-    Parses function calls from text format like <function>list_projects({"dummy_input": "..."})</function>
-    and executes them, returning the result.
-    """
-    # Extract function name and arguments using regex
-    match = re.search(r'<function>(\w+)\((.*?)\)</function>', content, re.DOTALL)
-    if not match:
-        return None
-    
-    func_name = match.group(1)
-    args_str = match.group(2)
-    
+# Built once and shared by every graph run: ToolNode parses the tool schemas when it
+# is created and keeps no per-run state, so it is safe to invoke from any thread
+tool_executor = ToolNode(agent_tools)
+
+FUNCTION_CALL_PATTERN = re.compile(r'<function>(\w+)\((.*?)\)</function>', re.DOTALL)
+
+def _run_text_function_call(call: tuple) -> str:
+    func_name, args_str = call
     logger.debug(f"Parsed function call: {func_name} with args: {args_str}")
-    
+
     # Get the tool
     if func_name not in tools_by_name:
         logger.error(f"Function {func_name} not found in tools")
         return json.dumps({"error": f"Function {func_name} not found"})
-    
+
     tool = tools_by_name[func_name]
-    
-    # Set authentication context for legacy tools
-    import tools as legacy_tools
-    legacy_tools.set_auth_token(state.get("access_token"))
-    legacy_tools.set_tenant_id(state.get("company_id"))
-    
+
     try:
         # Parse arguments
         args_dict = json.loads(args_str) if args_str.strip() else {}
-        
+
         # Execute the tool
         result = tool.invoke(args_dict)
         logger.debug(f"Tool {func_name} returned: {result}")
@@ -114,6 +117,29 @@ def parse_and_execute_function_from_text(content: str, state: AgentState) -> str
         logger.error(f"Error executing tool {func_name}: {e}", exc_info=True)
         return json.dumps({"error": f"Error executing {func_name}: {str(e)}"})
 
+# Tools that create something: never reported as timed out while they may still succeed
+SIDE_EFFECT_TOOLS = {"create_new_project", "fill_template_and_save_document"}
+
+def _tool_timeout_message(func_name: str) -> str:
+    return json.dumps({"error": f"La herramienta {func_name} no respondió a tiempo ({parallel_tools.TOOL_STEP_TIMEOUT_SECONDS:.0f} s)."})
+
+def parse_and_execute_function_from_text(content: str, state: AgentState) -> List[tuple]:
+    """
+    Parses every function call in text format like <function>list_projects({"dummy_input": "..."})</function>
+    and executes them concurrently, returning (function name, result) pairs in the order of the calls.
+    """
+    calls = FUNCTION_CALL_PATTERN.findall(content)
+    if not calls:
+        return []
+
+    # Set authentication context for legacy tools; every call runs in a copy of it
+    with legacy_tools.auth_context(state.get("access_token"), state.get("company_id")):
+        results = parallel_tools.run_calls(
+            calls, _run_text_function_call, lambda call: _tool_timeout_message(call[0]),
+            untimed=lambda call: call[0] in SIDE_EFFECT_TOOLS,
+        )
+    return [(func_name, result) for (func_name, _), result in zip(calls, results)]
+
 # LLM with tools
 llm = ChatOpenAI(
     model=os.getenv("LLM_MODEL_NAME"),
@@ -122,6 +148,8 @@ llm = ChatOpenAI(
     openai_api_base=os.getenv("LLM_URL")
 )
 llm_with_tools = llm.bind_tools(agent_tools)
+# `llm` (no tools bound) is used where the model must answer instead of calling a tool.
+# Both share one HTTP client pool; the clients are thread-safe and reused across runs.
 
 # System Prompt
 manager_system_prompt = """Eres un asistente legal experto y tu objetivo es ayudar al usuario. Te comunicarás y pensarás exclusivamente en ESPAÑOL.
@@ -137,13 +165,31 @@ manager_system_prompt = """Eres un asistente legal experto y tu objetivo es ayud
 5.  **FINALIZACIÓN EXPLÍCITA:** Cuando tengas la respuesta final a la pregunta original del usuario y no necesites usar más herramientas, tu respuesta DEBE comenzar con el prefijo "FINAL_ANSWER: ". Por ejemplo: "FINAL_ANSWER: La respuesta es...". NO uses este prefijo si aún necesitas usar una herramienta o si la conversación continúa.
 """
 
+def _last_tool_messages(messages: list) -> List[ToolMessage]:
+    """The ToolMessages produced by the last step (several tools may have run in parallel)."""
+    tool_messages = []
+    for msg in reversed(messages):
+        if not isinstance(msg, ToolMessage):
+            break
+        tool_messages.insert(0, msg)
+    return tool_messages
+
+def _terminal_answer(state: AgentState):
+    """The final answer built from the last step's results if all its tools are terminal, else None."""
+    results = [
+        (terminal_tools.formatter_for(tools_by_name.get(msg.name)), msg.content)
+        for msg in _last_tool_messages(state["messages"])
+    ]
+    return terminal_tools.final_answer(results)
+
 def manager_node(state: AgentState):
     """Invokes the LLM to determine the next action, with special handling for tool outputs."""
-    messages = [SystemMessage(content=manager_system_prompt)] + state["messages"]
+    messages = [SystemMessage(content=manager_system_prompt)] + memory_policy.summary_message(state.get("summary")) + state["messages"]
 
     # Check if the last message is a ToolMessage (meaning a tool was just executed)
     if isinstance(state["messages"][-1], ToolMessage):
-        last_tool_message = state["messages"][-1]
+        # All the results of the last step (several tools may have run in parallel)
+        tool_output = "\n\n".join(str(msg.content) for msg in _last_tool_messages(state["messages"]))
         
         # Find the original HumanMessage that triggered the tool execution
         original_human_message_content = ""
@@ -155,7 +201,7 @@ def manager_node(state: AgentState):
         # Construct a prompt that forces the LLM to summarize the tool output and finalize
         forced_final_prompt_message = HumanMessage(content=(
             f"La herramienta ejecutada ha devuelto el siguiente resultado: "
-            f"{last_tool_message.content}\n\n"
+            f"{tool_output}\n\n"
             f"Basándote en este resultado y en la pregunta original del usuario ('{original_human_message_content}'), "
             f"formula una respuesta final clara y concisa. Tu respuesta DEBE comenzar con 'FINAL_ANSWER: '."
         ))
@@ -163,15 +209,8 @@ def manager_node(state: AgentState):
         # Append this forced prompt to the messages for the LLM
         messages.append(forced_final_prompt_message)
         
-        # Create a temporary LLM instance without tools bound for this specific step
-        llm_without_tools = ChatOpenAI(
-            model=os.getenv("LLM_MODEL_NAME"),
-            temperature=0,
-            openai_api_key=os.getenv("GROQ_API_KEY"),
-            openai_api_base=os.getenv("LLM_URL")
-        )
-
-        response = llm_without_tools.invoke(messages)
+        # Invoke the LLM without tools bound for this specific step
+        response = llm.invoke(messages)
         
         # Ensure the response is indeed a FINAL_ANSWER, if not, prepend it
         if not response.content.startswith("FINAL_ANSWER:"):
@@ -199,12 +238,15 @@ def manager_node(state: AgentState):
     # WORKAROUND: If Groq returned a function call as text instead of tool_calls, parse and execute it
     if '<function>' in response.content and (not hasattr(response, 'tool_calls') or not response.tool_calls):
         logger.info("Detected <function> tag in content without proper tool_calls, parsing and executing manually")
-        result = parse_and_execute_function_from_text(response.content, state)
-        if result:
-            # Create a ToolMessage with the result
-            tool_message = ToolMessage(content=result, tool_call_id="manual_parse")
-            # Return both the AI message and the tool message
-            return {"messages": [response, tool_message]}
+        results = parse_and_execute_function_from_text(response.content, state)
+        if results:
+            # Create a ToolMessage per result, in the order of the calls
+            tool_messages = [
+                ToolMessage(content=result, name=func_name, tool_call_id=f"manual_parse_{i}")
+                for i, (func_name, result) in enumerate(results)
+            ]
+            # Return both the AI message and the tool messages
+            return {"messages": [response] + tool_messages}
     
     return {"messages": [response]}
 
@@ -214,21 +256,28 @@ def tool_node(state: AgentState):
     before executing any tool.
     """
     logger.debug(f"Entering tool_node with state: {state}")
-    # Set authentication context for legacy tools
-    legacy_tools.set_auth_token(state.get("access_token"))
-    legacy_tools.set_tenant_id(state.get("company_id"))
 
-    # The `ToolNode` will correctly route the tool calls from the last AIMessage
-    tool_node_executor = ToolNode(agent_tools)
-    
     # Log the tool calls that are about to be executed
     last_ai_message = state["messages"][-1]
-    if hasattr(last_ai_message, 'tool_calls') and last_ai_message.tool_calls:
-        logger.debug(f"Tool calls to execute: {last_ai_message.tool_calls}")
+    tool_calls = getattr(last_ai_message, 'tool_calls', None) or []
+    if tool_calls:
+        logger.debug(f"Tool calls to execute: {tool_calls}")
     else:
         logger.warning("tool_node entered but no tool_calls found in last AI message.")
 
-    output = tool_node_executor.invoke(state)
+    # Each call goes through the shared `ToolNode` (validation and error handling);
+    # independent calls run concurrently and the results keep the order of the calls
+    def run_one(call: dict) -> ToolMessage:
+        return tool_executor.invoke({"messages": [AIMessage(content="", tool_calls=[call])]})["messages"][0]
+
+    def on_timeout(call: dict) -> ToolMessage:
+        return ToolMessage(content=_tool_timeout_message(call["name"]), name=call["name"], tool_call_id=call["id"])
+
+    # Authentication context for legacy tools; every call runs in a copy of it
+    with legacy_tools.auth_context(state.get("access_token"), state.get("company_id")):
+        output = {"messages": parallel_tools.run_calls(
+            tool_calls, run_one, on_timeout, untimed=lambda call: call["name"] in SIDE_EFFECT_TOOLS,
+        )}
     logger.debug(f"Exiting tool_node. Type of output: {type(output)}, Output: {output}")
     
     # If the output is a ToolMessage, log its content specifically
@@ -237,7 +286,56 @@ def tool_node(state: AgentState):
 
     return output
 
+def finalize_node(state: AgentState):
+    """Answers with the formatted results of terminal tools, without another LLM call."""
+    answer = _terminal_answer(state)
+    logger.info("Terminal tools answered the turn; skipping the final LLM pass.")
+    return {"messages": [AIMessage(content=answer)]}
+
+def memory_node(state: AgentState):
+    """Folds the oldest turns of the thread into the rolling summary, keeping the
+    prompt and the checkpoint bounded."""
+    to_fold = memory_policy.messages_to_fold(state["messages"])
+    if not to_fold:
+        return {}
+    try:
+        summary = memory_policy.summarize(llm, state.get("summary"), to_fold)
+    except Exception as e:
+        # Keep the messages; folding is retried on the next turn
+        logger.warning(f"Could not summarize the conversation history: {e}")
+        return {}
+    logger.info(f"Folded {len(to_fold)} messages into the conversation summary.")
+    return {"summary": summary, "messages": [RemoveMessage(id=m.id) for m in to_fold]}
+
+def intent_node(state: AgentState):
+    """Answers recognized commands (e.g. listing projects or tasks) without the LLM."""
+    last_message = state["messages"][-1]
+    if not isinstance(last_message, HumanMessage):
+        return {"messages": []}
+
+    def run_tool(name: str, *args) -> str:
+        with legacy_tools.auth_context(state.get("access_token"), state.get("company_id")):
+            return getattr(legacy_tools, name)(*args)
+
+    answer = intent_router.dispatch(last_message.content, run_tool)
+    if answer is None:
+        return {"messages": []}
+    return {"messages": [AIMessage(content=answer)]}
+
 # --- 4. Define the Graph Logic ---
+def route_after_intent(state: AgentState) -> str:
+    """Ends the turn if the fast path answered it, otherwise hands it to the LLM."""
+    if isinstance(state["messages"][-1], AIMessage):
+        return END
+    return "manager"
+
+def route_after_tools(state: AgentState) -> str:
+    """Finishes with the tools' own output if they are all terminal, otherwise lets the manager process it."""
+    if _terminal_answer(state) is not None:
+        return "finalize"
+    logger.debug("Last message is ToolMessage, routing back to manager")
+    return "manager"
+
 def router(state: AgentState) -> str:
     """Determines the next step in the graph."""
     last_message = state["messages"][-1]
@@ -245,8 +343,7 @@ def router(state: AgentState) -> str:
     # If the last message is a ToolMessage, it means a tool was executed (either normally or via workaround)
     # Route back to manager to process the tool output
     if isinstance(last_message, ToolMessage):
-        logger.debug("Last message is ToolMessage, routing back to manager")
-        return "manager"
+        return route_after_tools(state)
     
     # Check if the LLM made tool calls using the standard format
     if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
@@ -264,10 +361,16 @@ def router(state: AgentState) -> str:
 # --- 5. Compile the Graph ---
 workflow = StateGraph(AgentState)
 
+workflow.add_node("memory", memory_node)
+workflow.add_node("intent", intent_node)
 workflow.add_node("manager", manager_node)
 workflow.add_node("tools", tool_node)
+workflow.add_node("finalize", finalize_node)
+
+workflow.set_entry_point("memory")
+workflow.add_edge("memory", "intent")
 
-workflow.set_entry_point("manager")
+workflow.add_conditional_edges("intent", route_after_intent, {"manager": "manager", END: END})
 
 workflow.add_conditional_edges(
     "manager",
@@ -276,12 +379,15 @@ workflow.add_conditional_edges(
     {
         "tools": "tools",
         "manager": "manager",
+        "finalize": "finalize",
         END: END
     }
 )
 
-# After tools are executed, always return to the manager to process the results
-workflow.add_edge("tools", "manager")
+# After tools are executed, return to the manager to process the results, unless
+# the tools' output is already the answer
+workflow.add_conditional_edges("tools", route_after_tools, {"manager": "manager", "finalize": "finalize"})
+workflow.add_edge("finalize", END)
 
 # Set up the checkpointer for memory
 checkpointer = MongoDBSaver(get_memory_db(), collection_name="agent_threads")
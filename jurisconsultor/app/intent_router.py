@@ -0,0 +1,142 @@
+import os
+import re
+import json
+import logging
+import threading
+import unicodedata
+from typing import Callable, Dict, Optional
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# Deterministic fast path for the agent.
+# Simple commands such as "lista mis proyectos" or "muéstrame las tareas del
+# proyecto X" are recognized with regular expressions, dispatched straight to the
+# tool and answered with a fixed formatter, so they cost no LLM round-trip.
+# Anything that is not recognized (or cannot be resolved unambiguously) goes to
+# the LLM as before. Hit rates are counted per intent.
+
+INTENT_FAST_PATH_ENABLED = os.getenv("AGENT_INTENT_FAST_PATH", "true").lower() == "true"
+
+_LIST_VERBS = r"(?:lista|listame|listar|muestra|muestrame|mostrar|ensename|dame|ver|quiero ver|cuales son)"
+_POLITE = r"(?:por favor\s+)?"
+_POLITE_END = r"(?:\s+por favor)?"
+
+LIST_PROJECTS_PATTERNS = [
+    re.compile(rf"^{_POLITE}{_LIST_VERBS}\s+(?:todos\s+)?(?:mis|los)\s+proyectos{_POLITE_END}$"),
+    re.compile(rf"^{_POLITE}(?:que|cuales)\s+proyectos\s+tengo{_POLITE_END}$"),
+    re.compile(r"^mis proyectos$"),
+]
+LIST_TASKS_PATTERNS = [
+    re.compile(rf"^{_POLITE}{_LIST_VERBS}\s+(?:todas\s+)?(?:las\s+)?tareas\s+del\s+proyecto\s+(?P<project>.+?){_POLITE_END}$"),
+    re.compile(rf"^{_POLITE}(?:que|cuales)\s+tareas\s+tiene\s+el\s+proyecto\s+(?P<project>.+?){_POLITE_END}$"),
+]
+
+
+def normalize(text: str) -> str:
+    """Lowercases, strips accents and punctuation and collapses whitespace."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[¿?¡!.,;:\"'“”]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class IntentStats:
+    """Counts how many messages the fast path answered, per intent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.hits: Dict[str, int] = {}
+        self.unresolved: Dict[str, int] = {}
+
+    def record(self, intent: Optional[str], resolved: bool = True):
+        with self._lock:
+            self.total += 1
+            if intent is None:
+                return
+            counter = self.hits if resolved else self.unresolved
+            counter[intent] = counter.get(intent, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hits = sum(self.hits.values())
+            return {
+                "enabled": INTENT_FAST_PATH_ENABLED,
+                "messages": self.total,
+                "fast_path_answers": hits,
+                "hit_rate": round(hits / self.total, 4) if self.total else 0.0,
+                "hits": dict(self.hits),
+                # Recognized, but handed to the LLM (e.g. unknown or ambiguous project name)
+                "unresolved": dict(self.unresolved),
+            }
+
+
+intent_stats = IntentStats()
+
+
+def _match(patterns, text):
+    for pattern in patterns:
+        match = pattern.match(text)
+        if match:
+            return match
+    return None
+
+
+def format_projects(result: dict) -> str:
+    if "error" in result:
+        return f"FINAL_ANSWER: No pude obtener la lista de proyectos. {result['error']}"
+    projects = result.get("projects", [])
+    if not projects:
+        return "FINAL_ANSWER: No tienes proyectos registrados."
+    lines = [f"- {p.get('name', 'Sin nombre')} (ID: {p['_id']})" for p in projects]
+    return f"FINAL_ANSWER: Tienes {len(projects)} proyecto(s):\n" + "\n".join(lines)
+
+
+def format_tasks(result: dict, project_label: str) -> str:
+    if "error" in result:
+        return f"FINAL_ANSWER: No pude obtener las tareas del proyecto {project_label}. {result['error']}"
+    tasks = result.get("tasks", [])
+    if not tasks:
+        return f"FINAL_ANSWER: El proyecto {project_label} no tiene tareas."
+    lines = [f"- {t.get('title', 'Sin título')} [{t.get('status', 'todo')}]" for t in tasks]
+    return f"FINAL_ANSWER: El proyecto {project_label} tiene {len(tasks)} tarea(s):\n" + "\n".join(lines)
+
+
+def _resolve_project(reference: str, run_tool: Callable[..., str]) -> Optional[tuple]:
+    """Returns (project_id, label) for an ObjectId or a unique project name, or None."""
+    if ObjectId.is_valid(reference):
+        return reference, reference
+    listing = json.loads(run_tool("list_projects"))
+    matches = [p for p in listing.get("projects", []) if normalize(p.get("name", "")) == reference]
+    if len(matches) != 1:
+        return None
+    return matches[0]["_id"], matches[0]["name"]
+
+
+def dispatch(message: str, run_tool: Callable[..., str]) -> Optional[str]:
+    """Answers `message` through the fast path, or returns None if the LLM must handle it.
+    `run_tool(name, *args)` executes a tool and returns its JSON string result."""
+    if not INTENT_FAST_PATH_ENABLED:
+        return None
+    text = normalize(message)
+
+    if _match(LIST_PROJECTS_PATTERNS, text):
+        intent_stats.record("list_projects")
+        logger.info("Intent fast path: list_projects")
+        return format_projects(json.loads(run_tool("list_projects")))
+
+    match = _match(LIST_TASKS_PATTERNS, text)
+    if match:
+        resolved = _resolve_project(match.group("project"), run_tool)
+        if resolved is None:
+            intent_stats.record("list_tasks_for_project", resolved=False)
+            return None
+        project_id, label = resolved
+        intent_stats.record("list_tasks_for_project")
+        logger.info(f"Intent fast path: list_tasks_for_project {project_id}")
+        return format_tasks(json.loads(run_tool("list_tasks_for_project", project_id)), label)
+
+    intent_stats.record(None)
+    return None
@@ -0,0 +1,206 @@
+import os
+import socket
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Background job queue backed by MongoDB.
+# Jobs are documents in the `jobs` collection, so they survive restarts. Workers
+# claim jobs atomically with find_one_and_update and hold a lease that is renewed
+# while the job runs; a job whose worker died is picked up again once its lease
+# expires. Failed jobs are retried up to JOB_MAX_ATTEMPTS times, and so are jobs
+# whose worker died: an expired job that used all its attempts is marked failed.
+
+JOBS_COLLECTION = "jobs"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 2))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 300))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+
+_handlers: Dict[str, Callable[[Database, dict], Optional[dict]]] = {}
+_wakeup = threading.Event()
+
+
+def register_handler(job_type: str):
+    """Decorator that registers the function executing jobs of the given type.
+    The handler receives (db, payload) and may return a JSON-serializable result dict."""
+    def decorator(func):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def enqueue(db: Database, job_type: str, payload: dict, owner_email: Optional[str] = None) -> ObjectId:
+    """Stores a new job and wakes up the local workers."""
+    if job_type not in _handlers:
+        raise ValueError(f"No handler registered for job type '{job_type}'.")
+    now = datetime.utcnow()
+    job_doc = {
+        "type": job_type,
+        "payload": payload,
+        "owner_email": owner_email,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": JOB_MAX_ATTEMPTS,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "lease_expires_at": None,
+        "worker_id": None,
+    }
+    job_id = db[JOBS_COLLECTION].insert_one(job_doc).inserted_id
+    logger.info(f"Enqueued {job_type} job {job_id}.")
+    _wakeup.set()
+    return job_id
+
+
+def _attempts_left(left: bool) -> dict:
+    operator = "$lt" if left else "$gte"
+    return {"$expr": {operator: ["$attempts", {"$ifNull": ["$max_attempts", JOB_MAX_ATTEMPTS]}]}}
+
+
+def fail_abandoned_jobs(db: Database, now: datetime) -> int:
+    """Marks failed the running jobs whose lease expired on their last attempt, e.g. because
+    the job crashes its worker, so they are not retried forever."""
+    result = db[JOBS_COLLECTION].update_many(
+        {
+            "type": {"$in": list(_handlers)},
+            "status": "running",
+            "lease_expires_at": {"$lt": now},
+            **_attempts_left(False),
+        },
+        {"$set": {
+            "status": "failed",
+            "error": "The job's worker stopped before finishing it on its last attempt.",
+            "finished_at": now,
+            "lease_expires_at": None,
+        }},
+    )
+    if result.modified_count:
+        logger.warning(f"Marked {result.modified_count} abandoned jobs as failed.")
+    return result.modified_count
+
+
+def claim_next_job(db: Database, worker_id: str) -> Optional[dict]:
+    """Atomically claims the oldest runnable job: a queued one, or a running one whose lease
+    expired and that has attempts left."""
+    now = datetime.utcnow()
+    fail_abandoned_jobs(db, now)
+    return db[JOBS_COLLECTION].find_one_and_update(
+        {
+            "type": {"$in": list(_handlers)},
+            "$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires_at": {"$lt": now}, **_attempts_left(True)},
+            ],
+        },
+        {
+            "$set": {
+                "status": "running",
+                "worker_id": worker_id,
+                "started_at": now,
+                "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _renew_lease_until(db: Database, job_id: ObjectId, worker_id: str, done: threading.Event):
+    while not done.wait(JOB_LEASE_SECONDS / 3):
+        db[JOBS_COLLECTION].update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}},
+        )
+
+
+def run_job(db: Database, job: dict, worker_id: str):
+    """Executes a claimed job and records its outcome."""
+    job_id = job["_id"]
+    jobs = db[JOBS_COLLECTION]
+    done = threading.Event()
+    threading.Thread(target=_renew_lease_until, args=(db, job_id, worker_id, done), daemon=True).start()
+    logger.info(f"Worker {worker_id} running {job['type']} job {job_id} (attempt {job['attempts']}).")
+    try:
+        result = _handlers[job["type"]](db, job["payload"])
+        jobs.update_one(
+            {"_id": job_id, "worker_id": worker_id},
+            {"$set": {"status": "succeeded", "result": result, "error": None, "finished_at": datetime.utcnow(), "lease_expires_at": None}},
+        )
+        logger.info(f"Job {job_id} succeeded.")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}\n{traceback.format_exc()}")
+        retry = job["attempts"] < job.get("max_attempts", JOB_MAX_ATTEMPTS)
+        jobs.update_one(
+            {"_id": job_id, "worker_id": worker_id},
+            {"$set": {
+                "status": "queued" if retry else "failed",
+                "error": str(e),
+                "finished_at": None if retry else datetime.utcnow(),
+                "lease_expires_at": None,
+            }},
+        )
+        if retry:
+            _wakeup.set()
+    finally:
+        done.set()
+
+
+class JobWorkerPool:
+    """A set of worker threads that poll the job queue."""
+
+    def __init__(self, get_db: Callable[[], Database], concurrency: int = JOB_WORKERS):
+        self.get_db = get_db
+        self.concurrency = concurrency
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _worker_loop(self, worker_id: str):
+        db = self.get_db()
+        while not self._stop.is_set():
+            try:
+                job = claim_next_job(db, worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} could not poll the job queue: {e}")
+                job = None
+            if job is None:
+                _wakeup.wait(JOB_POLL_SECONDS)
+                _wakeup.clear()
+                continue
+            run_job(db, job, worker_id)
+
+    def start(self):
+        if self.concurrency <= 0:
+            logger.info("Job workers disabled (JOB_WORKERS=0).")
+            return
+        host = socket.gethostname()
+        for index in range(self.concurrency):
+            worker_id = f"{host}:{os.getpid()}:{index}"
+            thread = threading.Thread(target=self._worker_loop, args=(worker_id,), name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.concurrency} job workers.")
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+def get_job(db: Database, job_id: ObjectId) -> Optional[dict]:
+    return db[JOBS_COLLECTION].find_one({"_id": job_id})
+
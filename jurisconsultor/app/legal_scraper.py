@@ -3,7 +3,8 @@ import glob
 import argparse
 import logging
 from pypdf import PdfReader
-from utils import get_mongo_client, get_public_db_conn, get_private_db_conn, generate_embedding
+from utils import get_mongo_client, get_public_db_conn, get_private_db_conn
+import embedding_models
 import re
 
 logger = logging.getLogger(__name__)
@@ -89,14 +90,21 @@ def process_single_document(pdf_path: str, db_type: str, company_id: str = None)
 
         source_name = os.path.basename(pdf_path)
 
+        # Every active or building model embeds the new chunks, so a model being
+        # re-embedded stays complete. One batch per model for the whole document.
+        models = embedding_models.maintained_models(cur) if processed_chunks else []
+        embeddings = {model.id: embedding_models.embed(model, processed_chunks) for model in models}
+        legacy = next((model for model in models if model.is_legacy), None)
+
         for i, chunk in enumerate(processed_chunks):
-            embedding = generate_embedding(chunk)
-            
             cur.execute(
                 "INSERT INTO documents (content, embedding, source) VALUES (%s, %s, %s) RETURNING id;",
-                (chunk, embedding.tolist(), source_name)
+                (chunk, embeddings[legacy.id][i].tolist() if legacy else None, source_name)
             )
             document_id = cur.fetchone()[0]
+            for model in models:
+                if not model.is_legacy:
+                    embedding_models.store_embedding(cur, model, document_id, embeddings[model.id][i])
 
             if company_id:
                 cur.execute(
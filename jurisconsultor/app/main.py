@@ -6,26 +6,30 @@ from logging_config import LOGGING_CONFIG
 dictConfig(LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
 
-from fastapi import FastAPI, Depends, HTTPException, status, Body, APIRouter
+from fastapi import FastAPI, Depends, HTTPException, status, Body, APIRouter, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pymongo.database import Database
 from jose import JWTError
 from pydantic import BaseModel
 from typing import Optional, List
 
-from graph_agent import graph # New LangGraph agent
-from langchain_core.messages import HumanMessage, AIMessage
-from langgraph.errors import GraphRecursionError
 
 from models import UserCreate, UserInDB, Token, TokenData, UserBase, UserResponse
 from security import create_access_token, create_refresh_token, verify_password, verify_token
 from users import create_user, get_user
-from utils import get_mongo_client
 from routers import projects, tasks, admin, documents, sources, superadmin
 from dependencies import get_db, get_current_user, oauth2_scheme
 
-from db_manager import close_db_connection
+from db_manager import close_db_connection, get_db as get_db_from_manager
+import batch_generation
+import document_jobs # Registers the document generation job handlers
+from job_queue import JobWorkerPool
+from db_indexes import ensure_indexes_in_background
+from migrate_company_ids import run_migration_in_background as migrate_company_ids_in_background
+from pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+import startup
 
 app = FastAPI(
     title="Jurisconsultor API",
@@ -46,14 +50,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER], # Pagination headers of the list endpoints
 )
 
+job_workers = JobWorkerPool(get_db_from_manager)
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Application startup. MongoDB client initialized.")
+    ensure_indexes_in_background(get_db_from_manager)
+    # Routers match both company_id forms until this reports complete
+    migrate_company_ids_in_background(get_db_from_manager)
+    job_workers.start()
+    # The agent graph and the embedding model load in the background (see startup.py)
+    startup.start_warmup()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    job_workers.stop()
+    batch_generation.shutdown_executor()
     logger.info("Closing MongoDB connection.")
     close_db_connection()
 
@@ -143,6 +158,19 @@ def read_root():
     """Root endpoint for health checks."""
     return {"status": "ok"}
 
+@app.get("/health/live", tags=["Health"])
+def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/health/ready", tags=["Health"])
+def readiness(response: Response):
+    """Readiness probe: MongoDB answers and the agent and the embedding model are loaded."""
+    ready, report = startup.readiness(get_db_from_manager().client)
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
+
 @app.post("/ask")
 async def ask(
     request: AskRequest,
@@ -150,6 +178,10 @@ async def ask(
     token: str = Depends(oauth2_scheme),
 ):
     """Endpoint to interact with the new LangGraph conversational agent."""
+    # LangChain is only needed here; it is kept off the startup path (see startup.py)
+    from langchain_core.messages import HumanMessage, AIMessage
+    from langgraph.errors import GraphRecursionError
+
     logger.info(f"User {current_user.email} is asking: '{request.question}'")
     logger.info(f"[BEFORE TRY] About to invoke graph")
     
@@ -160,7 +192,9 @@ async def ask(
     
     try:
         logger.info(f"[IN TRY] Invoking graph with inputs: messages={len(inputs['messages'])}, company_id={inputs['company_id']}")
-        final_state = graph.invoke(inputs, config=config)
+        # The graph is synchronous; run it in the thread pool so the event loop keeps
+        # serving other requests. The tools' auth context is request-scoped (tools.py).
+        final_state = await run_in_threadpool(lambda: startup.get_graph().invoke(inputs, config=config))
         logger.info(f"[AFTER INVOKE] Graph returned. Type: {type(final_state)}")
         if final_state and final_state.get("messages"):
             logger.info(f"[MESSAGES] Number of messages in final_state: {len(final_state['messages'])}")
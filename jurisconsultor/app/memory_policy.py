@@ -0,0 +1,93 @@
+import os
+import logging
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+logger = logging.getLogger(__name__)
+
+# Memory policy for agent threads.
+# The last MEMORY_KEEP_TURNS turns (a user message and everything the agent did
+# to answer it) are kept verbatim; older turns are folded into a rolling summary
+# and removed from the checkpointed state. Folding happens in steps of
+# MEMORY_FOLD_EVERY turns, so the summarizer runs once every few turns rather than
+# on every message. MEMORY_MAX_TOKENS caps the kept history: if the recent turns
+# are larger than that, more of them are folded. Token counts are estimated.
+
+MEMORY_KEEP_TURNS = int(os.getenv("MEMORY_KEEP_TURNS", 6))
+MEMORY_FOLD_EVERY = int(os.getenv("MEMORY_FOLD_EVERY", 4))
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", 6000))
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", 800))
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """Eres el módulo de memoria de un asistente legal. Resume en ESPAÑOL la conversación siguiente para que el asistente pueda continuarla.
+Conserva los datos concretos: nombres de personas, proyectos e IDs, plantillas, documentos generados, hechos del caso y decisiones tomadas. Omite saludos y detalles irrelevantes.
+El resumen no debe superar {max_words} palabras.
+
+Resumen anterior:
+{previous_summary}
+
+Conversación a incorporar:
+{transcript}"""
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    return sum(len(str(m.content)) for m in messages) // CHARS_PER_TOKEN
+
+
+def split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Groups messages into turns, each starting at a HumanMessage, so tool calls
+    always stay together with their results."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def messages_to_fold(
+    messages: List[BaseMessage],
+    keep_turns: int = MEMORY_KEEP_TURNS,
+    fold_every: int = MEMORY_FOLD_EVERY,
+    max_tokens: int = MEMORY_MAX_TOKENS,
+) -> List[BaseMessage]:
+    """Returns the oldest messages that should be folded into the summary (possibly none).
+    The current turn (the last one) is never folded."""
+    turns = split_turns(messages)
+    fold_count = 0
+    if len(turns) > keep_turns + fold_every:
+        fold_count = len(turns) - keep_turns
+
+    # Token cap over what would be kept
+    while fold_count < len(turns) - 1 and estimate_tokens([m for turn in turns[fold_count:] for m in turn]) > max_tokens:
+        fold_count += 1
+    return [m for turn in turns[:fold_count] for m in turn]
+
+
+def _transcript(messages: List[BaseMessage]) -> str:
+    roles = {"human": "Usuario", "ai": "Asistente", "tool": "Herramienta"}
+    lines = []
+    for message in messages:
+        content = str(message.content).strip()
+        if content:
+            lines.append(f"{roles.get(message.type, message.type)}: {content}")
+    return "\n".join(lines)
+
+
+def summarize(llm, previous_summary: Optional[str], messages: List[BaseMessage]) -> str:
+    """Folds `messages` into the previous summary with the LLM."""
+    prompt = SUMMARY_PROMPT.format(
+        max_words=int(MEMORY_SUMMARY_MAX_TOKENS * 0.75),
+        previous_summary=previous_summary or "(ninguno)",
+        transcript=_transcript(messages),
+    )
+    response = llm.invoke([HumanMessage(content=prompt)])
+    return str(response.content).strip()
+
+
+def summary_message(summary: Optional[str]) -> List[SystemMessage]:
+    """The system message that gives the LLM the summary of the folded turns, if any."""
+    if not summary:
+        return []
+    return [SystemMessage(content=f"Resumen de la conversación anterior con este usuario:\n{summary}")]
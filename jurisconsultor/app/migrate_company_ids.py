@@ -0,0 +1,222 @@
+import os
+import time
+import argparse
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.database import Database
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Migration that stores every `company_id` as an ObjectId.
+# Older code paths (and the MCP server) stored the company id as a string, which
+# forced the routers to query {"$in": [str(id), ObjectId(id)]}. The migration
+# walks each collection in _id order, in batches, and records the last processed
+# _id in the `migrations` collection, so an interrupted pass resumes where it
+# stopped; a finished pass starts over from the beginning next time, so string
+# ids written later are converted too. Each update is conditional on the string
+# value it read, so documents modified concurrently are never overwritten.
+#
+# The API runs it in a background thread at startup and the scheduler repeats it
+# every COMPANY_ID_MIGRATION_HOURS. Until a run finds no convertible string left,
+# the routers keep matching both forms (company_id_filter); `python
+# migrate_company_ids.py` runs it by hand (--pause throttles it between batches).
+
+MIGRATION_ID = "company_id_to_objectid"
+MIGRATION_COLLECTIONS = ["users", "projects", "tasks"]
+DEFAULT_BATCH_SIZE = 500
+COMPANY_ID_MIGRATION_HOURS = int(os.getenv("COMPANY_ID_MIGRATION_HOURS", 24))
+COMPLETION_CACHE_SECONDS = float(os.getenv("COMPANY_ID_MIGRATION_CACHE_SECONDS", 60))
+
+# Strings that convert to an ObjectId; $regex only matches string values
+CONVERTIBLE = {"$regex": "^[0-9a-fA-F]{24}$"}
+
+
+def _progress(db: Database) -> dict:
+    return db.migrations.find_one({"_id": MIGRATION_ID}) or {"_id": MIGRATION_ID, "collections": {}}
+
+
+def pending_collections(db: Database, collections: List[str] = MIGRATION_COLLECTIONS) -> List[str]:
+    """The collections that still hold a company_id string convertible to an ObjectId."""
+    return [name for name in collections if db[name].find_one({"company_id": CONVERTIBLE}, {"_id": 1})]
+
+
+def migrate_collection(db: Database, collection_name: str, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0) -> dict:
+    """Converts the string company_id values of one collection. Returns counters for the run."""
+    collection = db[collection_name]
+    state = _progress(db).get("collections", {}).get(collection_name, {})
+    last_id: Optional[ObjectId] = state.get("last_id")
+    if last_id is not None:
+        logger.info(f"{collection_name}: resuming after _id {last_id}.")
+    converted = invalid = 0
+    while True:
+        query = {"company_id": {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(collection.find(query, {"company_id": 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        updates = []
+        for doc in batch:
+            if ObjectId.is_valid(doc["company_id"]):
+                updates.append(UpdateOne(
+                    {"_id": doc["_id"], "company_id": doc["company_id"]},
+                    {"$set": {"company_id": ObjectId(doc["company_id"])}},
+                ))
+            else:
+                # Not an ObjectId (e.g. a tenant slug); left untouched and reported
+                invalid += 1
+                logger.warning(f"{collection_name} {doc['_id']}: company_id '{doc['company_id']}' is not an ObjectId.")
+        if updates:
+            converted += collection.bulk_write(updates, ordered=False).modified_count
+
+        last_id = batch[-1]["_id"]
+        db.migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {f"collections.{collection_name}.last_id": last_id, "updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        logger.info(f"{collection_name}: converted {converted} so far (last _id {last_id}).")
+        if pause:
+            time.sleep(pause)
+
+    # The pass is over: the next one starts from the beginning
+    db.migrations.update_one(
+        {"_id": MIGRATION_ID},
+        {
+            "$unset": {f"collections.{collection_name}.last_id": ""},
+            "$set": {f"collections.{collection_name}.passed_at": datetime.utcnow(), "updated_at": datetime.utcnow()},
+        },
+        upsert=True,
+    )
+    return {"converted": converted, "invalid": invalid}
+
+
+def _set_complete(db: Database, complete: bool):
+    global _completion_cache
+    db.migrations.update_one(
+        {"_id": MIGRATION_ID},
+        {"$set": {"complete": complete, "updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    with _completion_lock:
+        _completion_cache = (complete, time.monotonic() + COMPLETION_CACHE_SECONDS)
+
+
+def run_migration(db: Database, collections: List[str] = MIGRATION_COLLECTIONS, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0) -> dict:
+    """Runs a pass over `collections` and records whether every convertible string is gone."""
+    pending = pending_collections(db, collections)
+    if pending:
+        # New string ids appeared since the last complete run: match both forms again meanwhile
+        _set_complete(db, False)
+    results = {name: migrate_collection(db, name, batch_size, pause) for name in collections}
+    _set_complete(db, not pending_collections(db, collections))
+    return results
+
+
+_completion_cache = (False, 0.0)
+_completion_lock = threading.Lock()
+
+
+def migration_complete(db: Database) -> bool:
+    """Whether the last run left no convertible string, cached for COMPLETION_CACHE_SECONDS."""
+    global _completion_cache
+    with _completion_lock:
+        complete, expires_at = _completion_cache
+        if time.monotonic() < expires_at:
+            return complete
+    complete = bool(_progress(db).get("complete"))
+    with _completion_lock:
+        _completion_cache = (complete, time.monotonic() + COMPLETION_CACHE_SECONDS)
+    return complete
+
+
+def company_id_filter(db: Database, company_id):
+    """The query value matching a company's documents: equality once the migration is
+    complete, both the ObjectId and its string form until then."""
+    if migration_complete(db):
+        return company_id
+    return {"$in": [company_id, str(company_id)]}
+
+
+def run_migration_in_background(get_db: Callable[[], Database]) -> threading.Thread:
+    """Runs the migration in a daemon thread so startup is not delayed by it."""
+    def migrate():
+        try:
+            for name, counters in run_migration(get_db()).items():
+                logger.info(f"company_id migration, {name}: {counters['converted']} converted, {counters['invalid']} not convertible.")
+        except PyMongoError as e:
+            logger.error(f"company_id migration failed: {e}")
+
+    thread = threading.Thread(target=migrate, name="company-id-migration", daemon=True)
+    thread.start()
+    return thread
+
+
+def _plan_summary(db: Database, collection_name: str, query: dict) -> dict:
+    explain = db.command("explain", {"find": collection_name, "filter": query}, verbosity="executionStats")
+    stats = explain["executionStats"]
+    stages = []
+    winning_plan = explain["queryPlanner"]["winningPlan"]
+    # Servers using the slot-based engine nest the classic plan under "queryPlan"
+    stage = winning_plan.get("queryPlan", winning_plan)
+    while stage:
+        stages.append(stage["stage"])
+        stage = stage.get("inputStage")
+    return {
+        "plan": " <- ".join(stages),
+        "keys_examined": stats["totalKeysExamined"],
+        "docs_examined": stats["totalDocsExamined"],
+        "returned": stats["nReturned"],
+    }
+
+
+def compare_query_plans(db: Database, company_id: ObjectId) -> dict:
+    """Explains the projects-by-company query with the old mixed-type predicate and with the
+    equality predicate used after the migration."""
+    return {
+        "before": _plan_summary(db, "projects", {"company_id": {"$in": [str(company_id), company_id]}}),
+        "after": _plan_summary(db, "projects", {"company_id": company_id}),
+    }
+
+
+def main():
+    from logging.config import dictConfig
+    from logging_config import LOGGING_CONFIG
+    from db_manager import get_db
+
+    parser = argparse.ArgumentParser(description="Convert company_id values stored as strings to ObjectId.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Documents per batch.")
+    parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep between batches.")
+    parser.add_argument("--explain", type=str, metavar="COMPANY_ID", help="Print the projects query plan before and after.")
+    parser.add_argument("--restart", action="store_true", help="Forget the recorded progress and scan from the beginning.")
+    parser.add_argument("--status", action="store_true", help="Only report whether convertible string ids remain.")
+    args = parser.parse_args()
+
+    dictConfig(LOGGING_CONFIG)
+    db = get_db()
+    if args.status:
+        pending = pending_collections(db)
+        print(f"Pending collections: {', '.join(pending) or '-'}; recorded complete: {bool(_progress(db).get('complete'))}")
+        return
+    if args.restart:
+        db.migrations.delete_one({"_id": MIGRATION_ID})
+
+    for name, counters in run_migration(db, batch_size=args.batch_size, pause=args.pause).items():
+        print(f"{name}: {counters['converted']} converted, {counters['invalid']} not convertible")
+
+    if args.explain:
+        plans = compare_query_plans(db, ObjectId(args.explain))
+        for label, summary in plans.items():
+            print(f"{label}: {summary['plan']} | keys examined {summary['keys_examined']}, "
+                  f"docs examined {summary['docs_examined']}, returned {summary['returned']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -150,6 +150,38 @@ class GeneratedDocumentInDB(GeneratedDocumentBase):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     is_archived: bool = False
 
+# --- Document Batch Models ---
+class DocumentBatchError(BaseModel):
+    index: Optional[int] = None
+    error: str
+
+class DocumentBatchInDB(BaseModel):
+    model_config = model_config
+    id: PyObjectId = Field(alias='_id')
+    template_name: str
+    project_id: PyObjectId
+    owner_email: str
+    status: str = "queued" # queued, running, completed, failed
+    total: int
+    completed: int = 0
+    failed: int = 0
+    errors: List[DocumentBatchError] = []
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+# --- Background Job Models ---
+class JobInDB(BaseModel):
+    model_config = model_config
+    id: PyObjectId = Field(alias='_id')
+    type: str
+    status: str # queued, running, succeeded, failed
+    attempts: int = 0
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 # --- Agent Conversation State Models ---
 class ConversationState(BaseModel):
     model_config = model_config
@@ -170,6 +202,7 @@ class ScrapingSourceBase(BaseModel):
     pdf_direct_url: Optional[str] = None # If provided, scraper downloads directly from here
     pdf_link_contains: Optional[str] = None # If not direct, look for links on 'url' containing this string
     pdf_link_ends_with: Optional[str] = None # If not direct, look for links on 'url' ending with this string
+    check_interval_hours: Optional[float] = None # Adaptive check interval; None uses the scheduler default
 
 class ScrapingSourceCreate(ScrapingSourceBase):
     pass
@@ -182,6 +215,7 @@ class ScrapingSourceUpdate(BaseModel):
     pdf_direct_url: Optional[str] = None
     pdf_link_contains: Optional[str] = None
     pdf_link_ends_with: Optional[str] = None
+    check_interval_hours: Optional[float] = None
 
 class ScrapingSourceInDB(ScrapingSourceBase):
     model_config = model_config
@@ -190,3 +224,8 @@ class ScrapingSourceInDB(ScrapingSourceBase):
     last_known_hash: Optional[str] = None
     status: str = "pending" # e.g., pending, success, failed
     error_message: Optional[str] = None
+    # Adaptive scheduling state, maintained by the scraper (see source_schedule.py)
+    last_checked_at: Optional[datetime] = None
+    last_changed_at: Optional[datetime] = None
+    next_check_at: Optional[datetime] = None
+    consecutive_failures: int = 0
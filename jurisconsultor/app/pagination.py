@@ -0,0 +1,110 @@
+import os
+import json
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Type
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+
+# Keyset pagination for the list endpoints.
+# Pages are read with a range predicate on the sort key instead of skip(), so
+# every page costs the same no matter how deep it is. The sort key is `_id`, or
+# another field with `_id` as tie-breaker (e.g. created_at). The position is
+# handed to the client as an opaque cursor in the X-Next-Cursor response header
+# and sent back as `after`; the response body stays a plain list. The total is
+# only counted when the client asks for it (`include_total`), in X-Total-Count.
+# Every request is bounded: without `limit` a page holds DEFAULT_PAGE_SIZE items,
+# and clients that need the whole list follow X-Next-Cursor (see
+# frontend/src/api.js, getAllPages).
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 500))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class PageParams:
+    """Pagination parameters of a list request."""
+
+    def __init__(self, after: Optional[str], limit: int, include_total: bool):
+        self.after = after
+        self.limit = limit
+        self.include_total = include_total
+
+
+def page_params(
+    after: Optional[str] = Query(None, description="Cursor returned in X-Next-Cursor by the previous page."),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description=f"Page size ({DEFAULT_PAGE_SIZE} by default)."),
+    include_total: bool = Query(False, description="Return the total number of matches in X-Total-Count."),
+) -> PageParams:
+    """Dependency that reads the pagination query parameters."""
+    if limit is None:
+        limit = min(DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    return PageParams(after, limit, include_total)
+
+
+def encode_cursor(sort_value: Any, last_id: ObjectId) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = {"$date": sort_value.isoformat()}
+    payload = json.dumps({"v": sort_value, "id": str(last_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Returns (sort value, _id) from a cursor. Raises HTTPException(400) if it is malformed."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        sort_value = payload["v"]
+        if isinstance(sort_value, dict) and "$date" in sort_value:
+            sort_value = datetime.fromisoformat(sort_value["$date"])
+        return sort_value, ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+
+def projection_for(model: Type[BaseModel]) -> Dict[str, int]:
+    """Builds a MongoDB projection with the fields a response model reads."""
+    return {(field.alias or name): 1 for name, field in model.model_fields.items()}
+
+
+def paginate(
+    collection: Collection,
+    query: dict,
+    page: PageParams,
+    response: Response,
+    sort_field: str = "_id",
+    direction: int = ASCENDING,
+    projection: Optional[Dict[str, int]] = None,
+) -> List[dict]:
+    """Reads one page of `query` ordered by `sort_field` (then `_id`) and sets the
+    pagination headers on the response. Returns the raw documents of the page."""
+    page_query = query
+    if page.after:
+        last_value, last_id = decode_cursor(page.after)
+        op = "$gt" if direction == ASCENDING else "$lt"
+        if sort_field == "_id":
+            keyset = {"_id": {op: last_id}}
+        else:
+            keyset = {"$or": [
+                {sort_field: {op: last_value}},
+                {sort_field: last_value, "_id": {op: last_id}},
+            ]}
+        page_query = {"$and": [query, keyset]} if query else keyset
+
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    # One extra document tells whether there is a next page without counting
+    documents = list(collection.find(page_query, projection).sort(sort).limit(page.limit + 1))
+    if len(documents) > page.limit:
+        documents = documents[:page.limit]
+        last = documents[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(None if sort_field == "_id" else last.get(sort_field), last["_id"])
+
+    if page.include_total:
+        response.headers[TOTAL_COUNT_HEADER] = str(collection.count_documents(query))
+    return documents
@@ -0,0 +1,62 @@
+import os
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, List, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# Concurrent execution of the tool calls of one agent step.
+# When the LLM asks for several tools at once (e.g. listing projects and a legal
+# question), they run in parallel, each in a copy of the caller's context so the
+# request-scoped auth context of tools.py is preserved. Every step gets its own
+# pool of at most TOOL_MAX_WORKERS threads, so calls of one request that hang
+# never hold the threads another request needs.
+# The step waits at most TOOL_STEP_TIMEOUT_SECONDS; calls still running then are
+# reported as timed out (the thread finishes in the background, its result is
+# discarded). Calls with side effects (`untimed`) are always awaited instead: a
+# call the agent was told failed must not complete afterwards. Results are
+# always returned in the order of the calls.
+
+TOOL_STEP_TIMEOUT_SECONDS = float(os.getenv("TOOL_STEP_TIMEOUT_SECONDS", 60))
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", 16))
+
+Call = TypeVar("Call")
+Result = TypeVar("Result")
+
+
+def run_calls(
+    calls: Sequence[Call],
+    run_one: Callable[[Call], Result],
+    on_timeout: Callable[[Call], Result],
+    timeout: float = TOOL_STEP_TIMEOUT_SECONDS,
+    untimed: Callable[[Call], bool] = lambda call: False,
+) -> List[Result]:
+    """Runs run_one(call) for every call concurrently and returns the results in order.
+    Calls not finished within `timeout` seconds get on_timeout(call) as their result,
+    except those for which untimed(call) is true, which are awaited until they finish.
+    run_one is expected to turn its own errors into results."""
+    if not calls:
+        return []
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=min(len(calls), TOOL_MAX_WORKERS), thread_name_prefix="agent-tool")
+    try:
+        futures = [executor.submit(contextvars.copy_context().run, run_one, call) for call in calls]
+        wait(futures, timeout=timeout)
+        for call, future in zip(calls, futures):
+            if untimed(call) and not future.done():
+                logger.info(f"Tool call {call} has side effects; waiting for it past the {timeout} s step timeout.")
+                wait([future])
+    finally:
+        # Timed-out calls keep running in the background; nothing waits for them
+        executor.shutdown(wait=False, cancel_futures=True)
+    results = []
+    for call, future in zip(calls, futures):
+        if future.done() and not future.cancelled():
+            results.append(future.result())
+        else:
+            logger.warning(f"Tool call {call} did not finish within {timeout} s.")
+            results.append(on_timeout(call))
+    logger.debug(f"Ran {len(calls)} tool calls in {(time.perf_counter() - start) * 1000:.1f} ms.")
+    return results
@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from pymongo.database import Database
+
+from migrate_company_ids import company_id_filter
+
+# Project and task operations used by the agent's tools.
+# These mirror the tool endpoints of the project-manager MCP server and return the
+# same payloads, so the tools can run them in-process against the application
+# database (single-node deployments) instead of calling the server over HTTP.
+
+
+class ProjectNotFoundError(LookupError):
+    """Raised when a project does not exist for the tenant."""
+
+
+def _company_id(tenant_id: str):
+    return ObjectId(tenant_id) if ObjectId.is_valid(tenant_id) else tenant_id
+
+
+def _company_query(db: Database, tenant_id: str):
+    if ObjectId.is_valid(tenant_id):
+        return company_id_filter(db, ObjectId(tenant_id))
+    return tenant_id
+
+
+def _project_for_tenant(db: Database, tenant_id: str, project_id: str) -> dict:
+    project = None
+    if ObjectId.is_valid(project_id):
+        project = db.projects.find_one({"_id": ObjectId(project_id), "company_id": _company_query(db, tenant_id)}, {"_id": 1})
+    if not project:
+        raise ProjectNotFoundError(f"Project {project_id} not found for tenant {tenant_id}.")
+    return project
+
+
+def list_projects(db: Database, tenant_id: str) -> dict:
+    projects_list = []
+    for project in db.projects.find({"company_id": _company_query(db, tenant_id)}):
+        project["_id"] = str(project["_id"])
+        project["company_id"] = str(project["company_id"])
+        projects_list.append(project)
+    return {"success": True, "projects": projects_list}
+
+
+def create_project(db: Database, tenant_id: str, user_email: str, project_name: str, project_description: Optional[str] = None) -> dict:
+    project_doc = {
+        "name": project_name,
+        "description": project_description,
+        "company_id": _company_id(tenant_id),
+        "owner_email": user_email,
+        "members": [user_email],
+        "created_at": datetime.utcnow(),
+        "is_archived": False,
+    }
+    result = db.projects.insert_one(project_doc)
+    return {"success": True, "project_id": str(result.inserted_id), "project_name": project_name}
+
+
+def create_task(db: Database, tenant_id: str, project_id: str, title: str, description: Optional[str] = None) -> dict:
+    project = _project_for_tenant(db, tenant_id, project_id)
+    task_doc = {
+        "project_id": project["_id"],
+        "title": title,
+        "description": description,
+        "creator_email": "system@mcp.com", # Same placeholder as the MCP server
+        "assignee_email": None,
+        "status": "todo",
+        "created_at": datetime.utcnow(),
+    }
+    result = db.tasks.insert_one(task_doc)
+    return {"success": True, "task_id": str(result.inserted_id), "task_title": title}
+
+
+def list_tasks_for_project(db: Database, tenant_id: str, project_id: str) -> dict:
+    project = _project_for_tenant(db, tenant_id, project_id)
+    tasks_list = []
+    for task in db.tasks.find({"project_id": project["_id"]}):
+        task["_id"] = str(task["_id"])
+        task["project_id"] = str(task["project_id"])
+        tasks_list.append(task)
+    return {"success": True, "tasks": tasks_list, "project_id": project_id}
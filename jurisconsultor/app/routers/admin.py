@@ -7,6 +7,8 @@ from bson import ObjectId
 from models import UserCreate, UserInDB, UserBase, UserUpdate, PyObjectId, UserResponse
 from dependencies import get_db, get_admin_user, get_project_lead_user
 from users import create_user, get_user
+from user_cache import user_cache
+from migrate_company_ids import company_id_filter
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +24,7 @@ def list_users_in_company(admin_user: UserInDB = Depends(get_admin_user), db: Da
     if not admin_user.company_id:
         raise HTTPException(status_code=400, detail="Admin user is not associated with a company.")
         
-    # Query for users where company_id can be either a string or an ObjectId
-    users_cursor = db.users.find({
-        "company_id": {
-            "$in": [str(admin_user.company_id), admin_user.company_id]
-        }
-    })
+    users_cursor = db.users.find({"company_id": company_id_filter(db, admin_user.company_id)})
     users_list = [UserInDB(**user_data).model_dump(by_alias=False) for user_data in users_cursor]
     logger.info(f"Admin user company_id: {admin_user.company_id}")
     logger.info(f"MongoDB query for users: {{'company_id': '{admin_user.company_id}'}}")
@@ -40,7 +37,7 @@ def list_company_users(lead_user: UserInDB = Depends(get_project_lead_user), db:
     if not lead_user.company_id:
         raise HTTPException(status_code=400, detail="User is not associated with a company.")
     
-    users_cursor = db.users.find({"company_id": {"$in": [str(lead_user.company_id), lead_user.company_id]}})
+    users_cursor = db.users.find({"company_id": company_id_filter(db, lead_user.company_id)})
     # Return UserResponse to avoid exposing hashed_password
     return [UserResponse(email=u.email, full_name=u.full_name, role=u.role) for u in [UserInDB(**user_data) for user_data in users_cursor]]
 
@@ -70,11 +67,12 @@ def delete_user(user_id: PyObjectId, admin_user: UserInDB = Depends(get_admin_us
         raise HTTPException(status_code=400, detail="Cannot delete yourself.")
 
     # Find the user to delete and ensure they belong to the admin's company
-    user_to_delete = db.users.find_one({"_id": user_id, "company_id": {"$in": [str(admin_user.company_id), admin_user.company_id]}})
+    user_to_delete = db.users.find_one({"_id": user_id, "company_id": company_id_filter(db, admin_user.company_id)})
     if not user_to_delete:
         raise HTTPException(status_code=404, detail="User not found in this company.")
     
     db.users.delete_one({"_id": user_id})
+    user_cache.invalidate(user_to_delete["email"])
     return {"message": "User deleted successfully."}
 
 @router.put("/users/{user_id}", response_model=UserBase)
@@ -87,7 +85,7 @@ def update_user(user_id: PyObjectId, user_update: UserUpdate, admin_user: UserIn
         raise HTTPException(status_code=400, detail="Admin user is not associated with a company.")
     
     # Find the user to update and ensure they belong to the admin's company
-    user_to_update = db.users.find_one({"_id": user_id, "company_id": {"$in": [str(admin_user.company_id), admin_user.company_id]}})
+    user_to_update = db.users.find_one({"_id": user_id, "company_id": company_id_filter(db, admin_user.company_id)})
     
     logger.info(f"Query for user_id {user_id} returned: {user_to_update}")
 
@@ -108,6 +106,7 @@ def update_user(user_id: PyObjectId, user_update: UserUpdate, admin_user: UserIn
         {"$set": update_data}
     )
     logger.info(f"Update result: {result.raw_result}") # New log
+    user_cache.invalidate(user_to_update["email"], update_data.get("email"))
     
     updated_user = db.users.find_one({"_id": user_id})
     logger.info(f"User {user_id} updated successfully by admin {admin_user.email}.")
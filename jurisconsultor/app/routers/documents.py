@@ -1,17 +1,25 @@
 import os
+import io
+import csv
 import json
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, UploadFile, File, Form, Response
+from pymongo import DESCENDING, ReturnDocument
 from pymongo.database import Database
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from pydantic import BaseModel
 from fastapi.responses import FileResponse
 
-from models import GeneratedDocumentInDB, UserInDB, PyObjectId
+from models import GeneratedDocumentInDB, UserInDB, PyObjectId, DocumentBatchInDB, JobInDB
 from dependencies import get_db, get_current_user
-from utils import answer_with_rag, search_raw_documents, get_public_db_conn # New import
-import tools as legacy_tools
+from pagination import PageParams, page_params, paginate, projection_for
+from migrate_company_ids import company_id_filter
+from utils import search_raw_documents, get_public_db_conn # New import
+from docx_templates import template_cache
+import batch_generation
+import job_queue
+from document_jobs import generate_document, DocumentGenerationError
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +28,6 @@ router = APIRouter(
     tags=["documents"],
 )
 
-TEMPLATE_DIR = "../formatos/"
-
 # --- Pydantic Models for Requests ---
 
 class GenerateFromFormRequest(BaseModel):
@@ -30,26 +36,131 @@ class GenerateFromFormRequest(BaseModel):
     document_name: str
     context: Dict[str, Any]
 
+class BatchGenerateRequest(BaseModel):
+    template_name: str
+    project_id: PyObjectId
+    document_name: str # May reference context fields, e.g. "Demanda {nombre_demandado}"
+    contexts: List[Dict[str, Any]]
+
+# --- Helpers ---
+
+def _start_batch(
+    db: Database,
+    current_user: UserInDB,
+    template_name: str,
+    project_id: PyObjectId,
+    document_name: str,
+    contexts: List[Dict[str, Any]],
+) -> DocumentBatchInDB:
+    """Validates a bulk generation request, records the batch and enqueues its rendering."""
+    if not contexts:
+        raise HTTPException(status_code=400, detail="The batch contains no records.")
+    if len(contexts) > batch_generation.BATCH_MAX_RECORDS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {batch_generation.BATCH_MAX_RECORDS} records.")
+    try:
+        batch_generation.validate_document_name(document_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        template_cache.get(template_name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Template '{template_name}' not found.")
+
+    batch_id = batch_generation.create_batch(db, template_name, project_id, current_user.email, len(contexts))
+    job_queue.enqueue(
+        db,
+        "generate_batch",
+        {"batch_id": str(batch_id), "document_name": document_name, "contexts": contexts},
+        owner_email=current_user.email,
+    )
+    logger.info(f"User {current_user.email} queued batch {batch_id} with {len(contexts)} documents from '{template_name}'.")
+    return DocumentBatchInDB(**db[batch_generation.BATCHES_COLLECTION].find_one({"_id": batch_id}))
+
+def _is_company_admin(db: Database, current_user: UserInDB, project_id: Optional[PyObjectId]) -> bool:
+    """True for superadmins, and for admins of the company the project belongs to."""
+    if current_user.role == "superadmin":
+        return True
+    if current_user.role != "admin" or project_id is None:
+        return False
+    query = {"_id": project_id, "company_id": company_id_filter(db, current_user.company_id)}
+    return db.projects.count_documents(query, limit=1) > 0
+
+def _get_batch_for_user(batch_id: PyObjectId, db: Database, current_user: UserInDB) -> dict:
+    batch = db[batch_generation.BATCHES_COLLECTION].find_one({"_id": batch_id})
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    if batch["owner_email"] != current_user.email and not _is_company_admin(db, current_user, batch.get("project_id")):
+        raise HTTPException(status_code=403, detail="Not authorized to access this batch.")
+    return batch
+
+def _job_project_id(db: Database, job: dict) -> Optional[PyObjectId]:
+    """The project a generation job writes to: in its payload, or in its batch record."""
+    payload = job.get("payload") or {}
+    if payload.get("project_id"):
+        return PyObjectId.validate(payload["project_id"])
+    if payload.get("batch_id"):
+        batch = db[batch_generation.BATCHES_COLLECTION].find_one({"_id": PyObjectId.validate(payload["batch_id"])}, {"project_id": 1})
+        return batch and batch.get("project_id")
+    return None
+
+def _authorize_document(
+    document_id: PyObjectId,
+    db: Database,
+    current_user: UserInDB,
+    action: str,
+    allowed_roles: tuple = ("superadmin", "admin"),
+) -> dict:
+    """Loads a generated document and checks that the user may act on it, in a single
+    aggregation. The document owner is always authorized, and so are superadmins when in
+    `allowed_roles`. Admins (when in `allowed_roles`) are authorized when the document's
+    project belongs to their company, and leads when they are a member of it; the project
+    is resolved with a $lookup in the same round-trip."""
+    pipeline = [{"$match": {"_id": document_id}}, {"$limit": 1}]
+    project_match = None
+    if current_user.role == "lead":
+        project_match = {"members": current_user.email}
+    elif current_user.role == "admin" and "admin" in allowed_roles:
+        project_match = {"company_id": company_id_filter(db, current_user.company_id)}
+    if project_match is not None:
+        pipeline.append({"$lookup": {
+            "from": "projects",
+            "let": {"project_id": "$project_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$project_id"]}, **project_match}},
+                {"$project": {"_id": 1}},
+            ],
+            "as": "authorizing_projects",
+        }})
+    document = next(db.generated_documents.aggregate(pipeline), None)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found.")
+
+    authorized = (
+        (current_user.role == "superadmin" and "superadmin" in allowed_roles) or
+        document["owner_email"] == current_user.email or
+        bool(document.pop("authorizing_projects", None))
+    )
+    if not authorized:
+        raise HTTPException(status_code=403, detail=f"Not authorized to {action} this document.")
+    return document
+
 # --- Endpoints ---
 
 @router.get("/templates", response_model=List[str])
 def list_templates():
     """Lists all available .docx templates from the formats directory."""
-    try:
-        files = os.listdir(TEMPLATE_DIR)
-        docx_files = [f for f in files if f.endswith('.docx')]
-        return docx_files
-    except FileNotFoundError:
-        return []
+    return template_cache.list_templates()
 
 @router.get("/templates/{template_name}/placeholders", response_model=List[str])
 def get_placeholders_for_template(template_name: str):
     """Returns the list of placeholders for a given template name."""
-    result_str = legacy_tools.get_template_placeholders(template_name)
-    result = json.loads(result_str)
-    if "error" in result:
-        raise HTTPException(status_code=404, detail=result["error"])
-    return result
+    try:
+        metadata = template_cache.get(template_name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Template '{template_name}' not found.")
+    if not metadata.placeholders:
+        raise HTTPException(status_code=404, detail=f"No placeholders like '{{field}}' found in the template '{template_name}'.")
+    return metadata.placeholders
 
 @router.post("/generate_from_form", response_model=GeneratedDocumentInDB)
 def generate_document_from_form(
@@ -58,52 +169,112 @@ def generate_document_from_form(
     current_user: UserInDB = Depends(get_current_user),
 ):
     """Orchestrates document generation from a form submission in a deterministic way."""
-    context = request.context
-    logger.info(f"Context received for document generation: {context}")
-    logger.info(f"Checking RAG condition: ('lista_de_hechos' in context: {'lista_de_hechos' in context}) and (context['lista_de_hechos'] is truthy: {bool(context.get('lista_de_hechos'))})")
-    
-    # 1. If 'lista_de_hechos' (facts) are present, use RAG to find legal articles
-    if 'lista_de_hechos' in context and context['lista_de_hechos']:
-        rag_query = f"Based on the following facts: {context['lista_de_hechos']}, what legal articles and laws are applicable? Provide a concise list of articles and laws."
-        logger.info(f"RAG Query: {rag_query}")
-        legal_articles = answer_with_rag(rag_query)
-        logger.info(f"RAG Result (legal_articles): {legal_articles}")
-        # Assign the RAG findings to the most relevant placeholder
-        context["articulos_aplicables"] = legal_articles
-        logger.info(f"Context after RAG: {context}")
-
-    # 2. Call the tool to fill the template and save the document file
-    result_str = legacy_tools.fill_template_and_save_document(
-        template_name=request.template_name,
-        document_name=request.document_name,
-        context=context
-    )
-    result = json.loads(result_str)
-
-    if "error" in result:
-        raise HTTPException(status_code=500, detail=result["error"])
-
-    # 3. Create the document record in the database
-    file_path = result.get("file_path")
-    if not file_path:
-        raise HTTPException(status_code=500, detail="Tool failed to return a file path.")
-
-    doc_data = {
-        "file_name": request.document_name,
-        "project_id": request.project_id,
-        "owner_email": current_user.email,
-        "file_path": file_path,
-        "is_archived": False, # New field for archiving
-    }
-    
-    insert_result = db.generated_documents.insert_one(doc_data)
-    created_doc = db.generated_documents.find_one({"_id": insert_result.inserted_id})
-
-    if not created_doc:
-        raise HTTPException(status_code=500, detail="Failed to create and retrieve document record from database.")
+    try:
+        created_doc = generate_document(
+            db,
+            template_name=request.template_name,
+            project_id=request.project_id,
+            document_name=request.document_name,
+            context=request.context,
+            owner_email=current_user.email,
+        )
+    except DocumentGenerationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
     return GeneratedDocumentInDB(**created_doc)
 
+@router.post("/generate_from_form/async", response_model=JobInDB, status_code=status.HTTP_202_ACCEPTED)
+def enqueue_document_from_form(
+    request: GenerateFromFormRequest,
+    db: Database = Depends(get_db),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """Queues the generation of a document (RAG + rendering) and returns the job to poll."""
+    payload = request.model_dump()
+    payload["project_id"] = str(request.project_id)
+    payload["owner_email"] = current_user.email
+    job_id = job_queue.enqueue(db, "generate_document", payload, owner_email=current_user.email)
+    return JobInDB(**job_queue.get_job(db, job_id))
+
+@router.get("/jobs/{job_id}", response_model=JobInDB)
+def get_generation_job(
+    job_id: PyObjectId,
+    db: Database = Depends(get_db),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """Returns the status of a document generation job. When it succeeded, `result`
+    holds the id of the generated document."""
+    job = job_queue.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job.get("owner_email") != current_user.email and not _is_company_admin(db, current_user, _job_project_id(db, job)):
+        raise HTTPException(status_code=403, detail="Not authorized to access this job.")
+    return JobInDB(**job)
+
+@router.post("/batches", response_model=DocumentBatchInDB, status_code=status.HTTP_202_ACCEPTED)
+def generate_documents_batch(
+    request: BatchGenerateRequest,
+    db: Database = Depends(get_db),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """Queues the generation of one document per context for a single template."""
+    return _start_batch(
+        db, current_user,
+        request.template_name, request.project_id, request.document_name, request.contexts,
+    )
+
+@router.post("/batches/upload", response_model=DocumentBatchInDB, status_code=status.HTTP_202_ACCEPTED)
+async def generate_documents_batch_from_file(
+    template_name: str = Form(...),
+    project_id: PyObjectId = Form(...),
+    document_name: str = Form(...),
+    file: UploadFile = File(...),
+    db: Database = Depends(get_db),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """
+    Queues a batch from an uploaded file. A CSV must have a header row whose columns
+    are the template placeholders; a JSON file must contain a list of objects.
+    """
+    content = (await file.read()).decode("utf-8-sig")
+    try:
+        if file.filename.endswith(".csv"):
+            contexts = [dict(row) for row in csv.DictReader(io.StringIO(content))]
+        elif file.filename.endswith(".json"):
+            contexts = json.loads(content)
+            if not isinstance(contexts, list) or not all(isinstance(c, dict) for c in contexts):
+                raise ValueError("The JSON file must contain a list of objects.")
+        else:
+            raise HTTPException(status_code=400, detail="File must be a CSV or JSON file.")
+    except (csv.Error, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Error processing file: {e}")
+
+    return _start_batch(db, current_user, template_name, project_id, document_name, contexts)
+
+@router.get("/batches/{batch_id}", response_model=DocumentBatchInDB)
+def get_documents_batch(
+    batch_id: PyObjectId,
+    db: Database = Depends(get_db),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """Returns the progress of a bulk generation."""
+    return DocumentBatchInDB(**_get_batch_for_user(batch_id, db, current_user))
+
+@router.get("/batches/{batch_id}/download", response_model=None)
+def download_documents_batch(
+    batch_id: PyObjectId,
+    db: Database = Depends(get_db),
+    current_user: UserInDB = Depends(get_current_user),
+):
+    """Downloads all the documents of a finished batch as a zip file."""
+    batch = _get_batch_for_user(batch_id, db, current_user)
+    if batch["status"] in ["queued", "running"]:
+        raise HTTPException(status_code=409, detail="The batch is still being generated.")
+    zip_path = batch.get("zip_path")
+    if not zip_path or not os.path.exists(zip_path):
+        raise HTTPException(status_code=404, detail="No documents were generated for this batch.")
+    return FileResponse(path=zip_path, filename=os.path.basename(zip_path), media_type="application/zip")
+
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_generated_document(
@@ -112,33 +283,17 @@ def delete_generated_document(
     current_user: UserInDB = Depends(get_current_user),
 ):
     """Deletes a generated document and its record from the database."""
-    # 1. Fetch the document record
-    document = db.generated_documents.find_one({"_id": document_id})
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found.")
+    # Owner, Project Lead (of the document's project), Admin (of its company), or Superadmin can delete
+    document = _authorize_document(document_id, db, current_user, "delete")
 
-    # 2. Check permissions
-    # Owner, Project Lead (of the document's project), Admin, or Superadmin can delete
-    can_delete = (
-        current_user.role == "superadmin" or # Superadmin can delete any document
-        document["owner_email"] == current_user.email or
-        current_user.role == "admin" or
-        (
-            current_user.role == "lead" and
-            db.projects.find_one({"_id": document["project_id"], "members": current_user.email})
-        )
-    )
-    if not can_delete:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this document.")
-
-    # 3. Delete the physical file
+    # Delete the physical file
     if os.path.exists(document["file_path"]):
         try:
             os.remove(document["file_path"])
         except OSError as e:
             raise HTTPException(status_code=500, detail=f"Failed to delete physical file: {e}")
 
-    # 4. Delete the database record
+    # Delete the database record
     db.generated_documents.delete_one({"_id": document_id})
 
     return # 204 No Content
@@ -155,32 +310,16 @@ def archive_generated_document(
     current_user: UserInDB = Depends(get_current_user),
 ):
     """Archives or unarchives a generated document."""
-    # 1. Fetch the document record
-    document = db.generated_documents.find_one({"_id": document_id})
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found.")
-
-    # 2. Check permissions
-    # Owner, Project Lead (of the document's project), Admin, or Superadmin can archive/unarchive
-    can_archive = (
-        current_user.role == "superadmin" or # Superadmin can archive/unarchive any document
-        document["owner_email"] == current_user.email or
-        current_user.role == "admin" or
-        (
-            current_user.role == "lead" and
-            db.projects.find_one({"_id": document["project_id"], "members": current_user.email})
-        )
-    )
-    if not can_archive:
-        raise HTTPException(status_code=403, detail="Not authorized to archive/unarchive this document.")
+    # Owner, Project Lead (of the document's project), Admin (of its company), or Superadmin can archive/unarchive
+    _authorize_document(document_id, db, current_user, "archive/unarchive")
 
-    # 3. Update the archive status
-    db.generated_documents.update_one(
+    updated_document = db.generated_documents.find_one_and_update(
         {"_id": document_id},
-        {"$set": {"is_archived": request.is_archived, "last_updated": datetime.utcnow()}}
+        {"$set": {"is_archived": request.is_archived, "last_updated": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER,
     )
-
-    updated_document = db.generated_documents.find_one({"_id": document_id})
+    if not updated_document:
+        raise HTTPException(status_code=404, detail="Document not found.")
     return GeneratedDocumentInDB(**updated_document)
 
 
@@ -191,24 +330,10 @@ def download_generated_document(
     current_user: UserInDB = Depends(get_current_user),
 ):
     """Downloads a generated document."""
-    # 1. Fetch the document record
-    document = db.generated_documents.find_one({"_id": document_id})
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found.")
-
-    # 2. Check permissions (same as delete/archive)
-    can_download = (
-        document["owner_email"] == current_user.email or
-        current_user.role == "admin" or
-        (
-            current_user.role == "lead" and
-            db.projects.find_one({"_id": document["project_id"], "members": current_user.email})
-        )
-    )
-    if not can_download:
-        raise HTTPException(status_code=403, detail="Not authorized to download this document.")
+    # Owner, Project Lead (of the document's project) or Admin (of its company) can download
+    document = _authorize_document(document_id, db, current_user, "download", allowed_roles=("admin",))
 
-    # 3. Return the file
+    # Return the file
     file_path = document["file_path"]
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Physical file not found on server.")
@@ -239,17 +364,19 @@ def debug_search_raw_docs(
 
 @router.get("/", response_model=List[GeneratedDocumentInDB])
 def list_documents(
+    response: Response,
     db: Database = Depends(get_db),
     current_user: UserInDB = Depends(get_current_user),
-    include_archived: Optional[bool] = False # New parameter
+    include_archived: Optional[bool] = False, # New parameter
+    page: PageParams = Depends(page_params),
 ):
-    """Lists generated documents based on user role."""
+    """Lists generated documents based on user role, newest first, one page at a time."""
     query = {}
     if current_user.role == 'superadmin':
         # Superadmin sees all documents
         pass
     elif current_user.role == "admin":
-        company_projects = list(db.projects.find({"company_id": current_user.company_id}, {"_id": 1}))
+        company_projects = list(db.projects.find({"company_id": company_id_filter(db, current_user.company_id)}, {"_id": 1}))
         project_ids = [p["_id"] for p in company_projects]
         query = {"project_id": {"$in": project_ids}}
     elif current_user.role == "lead":
@@ -263,5 +390,9 @@ def list_documents(
     if not include_archived:
         query["is_archived"] = False
 
-    documents_cursor = db.generated_documents.find(query).sort("created_at", -1)
-    return [GeneratedDocumentInDB(**doc) for doc in documents_cursor]
\ No newline at end of file
+    # Newest first by _id: documents generated before created_at was recorded have none
+    documents = paginate(
+        db.generated_documents, query, page, response,
+        direction=DESCENDING, projection=projection_for(GeneratedDocumentInDB),
+    )
+    return [GeneratedDocumentInDB(**doc) for doc in documents]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Response
 from pymongo.database import Database
 from typing import List, Optional
 import logging
@@ -7,6 +7,8 @@ logger = logging.getLogger(__name__)
 
 from models import ProjectCreate, ProjectInDB, UserInDB, PyObjectId
 from dependencies import get_db, get_current_user, get_project_lead_user
+from pagination import PageParams, page_params, paginate, projection_for
+from migrate_company_ids import company_id_filter
 
 router = APIRouter(
     prefix="/projects",
@@ -36,7 +38,7 @@ def delete_project(project_id: PyObjectId, db: Database = Depends(get_db), lead_
     query_filter = {"_id": project_id}
     if lead_user.role != "superadmin":
         # If not superadmin, restrict to projects within their company
-        query_filter["company_id"] = {"$in": [str(lead_user.company_id), lead_user.company_id]}
+        query_filter["company_id"] = company_id_filter(db, lead_user.company_id)
 
     project_to_delete = db.projects.find_one(query_filter)
     if not project_to_delete:
@@ -63,7 +65,7 @@ def archive_project(
     query_filter = {"_id": project_id}
     if lead_user.role != "superadmin":
         # If not superadmin, restrict to projects within their company
-        query_filter["company_id"] = {"$in": [str(lead_user.company_id), lead_user.company_id]}
+        query_filter["company_id"] = company_id_filter(db, lead_user.company_id)
 
     project_to_update = db.projects.find_one(query_filter)
     if not project_to_update:
@@ -79,9 +81,11 @@ def archive_project(
 
 @router.get("/", response_model=List[ProjectInDB])
 def list_projects(
+    response: Response,
     db: Database = Depends(get_db), 
     current_user: UserInDB = Depends(get_current_user),
-    include_archived: Optional[bool] = False
+    include_archived: Optional[bool] = False,
+    page: PageParams = Depends(page_params),
 ):
     """
     List projects.
@@ -96,7 +100,7 @@ def list_projects(
         pass
     elif current_user.company_id:
         # For other roles, filter by company
-        query_filter["company_id"] = {"$in": [str(current_user.company_id), current_user.company_id]}
+        query_filter["company_id"] = company_id_filter(db, current_user.company_id)
         # If the user is not an admin, further restrict to projects they are a member of
         if current_user.role != 'admin':
             query_filter["members"] = current_user.email
@@ -113,8 +117,8 @@ def list_projects(
 
     logger.info(f"Querying projects for user {current_user.email} (role: {current_user.role}) with filter: {query_filter}")
 
-    projects_cursor = db.projects.find(query_filter)
-    return [ProjectInDB(**p) for p in projects_cursor]
+    projects = paginate(db.projects, query_filter, page, response, projection=projection_for(ProjectInDB))
+    return [ProjectInDB(**p) for p in projects]
 
 @router.post("/{project_id}/members", response_model=ProjectInDB)
 def add_project_member(
@@ -124,11 +128,11 @@ def add_project_member(
     lead_user: UserInDB = Depends(get_project_lead_user),
 ):
     """Adds a user to a project. Only admins or project leads can add members."""
-    project = db.projects.find_one({"_id": project_id, "company_id": {"$in": [str(lead_user.company_id), lead_user.company_id]}})
+    project = db.projects.find_one({"_id": project_id, "company_id": company_id_filter(db, lead_user.company_id)})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found in this company.")
 
-    user_to_add = db.users.find_one({"email": member_email, "company_id": {"$in": [str(lead_user.company_id), lead_user.company_id]}})
+    user_to_add = db.users.find_one({"email": member_email, "company_id": company_id_filter(db, lead_user.company_id)})
     if not user_to_add:
         raise HTTPException(status_code=404, detail="User to add not found in this company.")
 
@@ -148,7 +152,7 @@ def remove_project_member(
     lead_user: UserInDB = Depends(get_project_lead_user),
 ):
     """Removes a user from a project. Only admins or project leads can remove members."""
-    project = db.projects.find_one({"_id": project_id, "company_id": {"$in": [str(lead_user.company_id), lead_user.company_id]}})
+    project = db.projects.find_one({"_id": project_id, "company_id": company_id_filter(db, lead_user.company_id)})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found in this company.")
 
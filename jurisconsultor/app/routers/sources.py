@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response
 from pymongo.database import Database
 from typing import List
 import csv
@@ -13,6 +13,7 @@ from models import (
     PyObjectId
 )
 from dependencies import get_db, get_admin_user
+from pagination import PageParams, page_params, paginate, projection_for
 
 router = APIRouter(
     prefix="/sources",
@@ -22,6 +23,9 @@ router = APIRouter(
 
 SOURCES_COLLECTION = "scraping_sources"
 
+# Changing any of these fields invalidates the learned schedule of a source
+SCHEDULE_RESET_FIELDS = {"url", "scraper_type", "pdf_direct_url", "pdf_link_contains", "pdf_link_ends_with", "check_interval_hours"}
+
 def _generate_filename(name: str) -> str:
     """Sanitizes a string to be a valid filename."""
     if not name:
@@ -112,11 +116,11 @@ def create_source(
     return ScrapingSourceInDB(**created_source)
 
 @router.get("/", response_model=List[ScrapingSourceInDB])
-def list_sources(db: Database = Depends(get_db)):
+def list_sources(response: Response, db: Database = Depends(get_db), page: PageParams = Depends(page_params)):
     """
-    List all scraping sources. (Admin only)
+    List the scraping sources, one page at a time. (Admin only)
     """
-    sources = db[SOURCES_COLLECTION].find()
+    sources = paginate(db[SOURCES_COLLECTION], {}, page, response, projection=projection_for(ScrapingSourceInDB))
     return [ScrapingSourceInDB(**s) for s in sources]
 
 @router.get("/{source_id}", response_model=ScrapingSourceInDB)
@@ -146,6 +150,11 @@ def update_source(
     if "name" in update_data and "local_filename" not in update_data:
         update_data["local_filename"] = _generate_filename(update_data["name"])
 
+    # Make the scheduler pick the source up on its next poll
+    if SCHEDULE_RESET_FIELDS & update_data.keys():
+        update_data["next_check_at"] = None
+        update_data["consecutive_failures"] = 0
+
     result = db[SOURCES_COLLECTION].update_one(
         {"_id": source_id},
         {"$set": update_data}
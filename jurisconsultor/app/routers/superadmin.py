@@ -1,5 +1,5 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from typing import List
 from pymongo.database import Database
 from bson import ObjectId
@@ -7,6 +7,10 @@ from bson import ObjectId
 from models import UserCreate, UserInDB, UserUpdate, PyObjectId, CompanyCreate, CompanyInDB, UserResponse
 from dependencies import get_db, get_super_admin_user
 from users import create_user, get_user
+from pagination import PageParams, page_params, paginate, projection_for
+from user_cache import user_cache
+import tool_transport
+import intent_router
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +23,10 @@ router = APIRouter(
 # --- User Management ---
 
 @router.get("/users", response_model=List[UserInDB])
-def list_all_users(db: Database = Depends(get_db)):
-    """Lists all users across all companies."""
-    users_cursor = db.users.find({})
-    return [UserInDB(**user_data) for user_data in users_cursor]
+def list_all_users(response: Response, db: Database = Depends(get_db), page: PageParams = Depends(page_params)):
+    """Lists the users across all companies, one page at a time."""
+    users = paginate(db.users, {}, page, response, projection=projection_for(UserInDB))
+    return [UserInDB(**user_data) for user_data in users]
 
 @router.post("/users", response_model=UserInDB, status_code=201)
 def create_any_user(new_user: UserCreate, db: Database = Depends(get_db)):
@@ -61,6 +65,7 @@ def update_any_user(user_id: PyObjectId, user_update: UserUpdate, db: Database =
 
 
     db.users.update_one({"_id": user_id}, {"$set": update_data})
+    user_cache.invalidate(user_to_update["email"], update_data.get("email"))
     
     updated_user = db.users.find_one({"_id": user_id})
     return UserInDB(**updated_user)
@@ -68,9 +73,10 @@ def update_any_user(user_id: PyObjectId, user_update: UserUpdate, db: Database =
 @router.delete("/users/{user_id}", status_code=204)
 def delete_any_user(user_id: PyObjectId, db: Database = Depends(get_db)):
     """Deletes any user."""
-    result = db.users.delete_one({"_id": user_id})
-    if result.deleted_count == 0:
+    deleted_user = db.users.find_one_and_delete({"_id": user_id}, projection={"email": 1})
+    if deleted_user is None:
         raise HTTPException(status_code=404, detail="User not found.")
+    user_cache.invalidate(deleted_user["email"])
     return 
 
 # --- Company (Tenant) Management ---
@@ -100,7 +106,9 @@ def delete_company(company_id: PyObjectId, db: Database = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Company not found.")
 
     # Delete associated users
+    company_emails = db.users.distinct("email", {"company_id": company_id})
     db.users.delete_many({"company_id": company_id})
+    user_cache.invalidate(*company_emails)
     
     # Delete associated projects
     db.projects.delete_many({"company_id": company_id})
@@ -157,3 +165,15 @@ def get_system_logs(filename: str, lines: int = 200):
     except Exception as e:
         logger.error(f"Error reading log file {filename}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error reading log file: {e}")
+
+# --- Agent Tool Metrics ---
+
+@router.get("/tools/latency")
+def get_tool_latency():
+    """Latency of the agent's project/task tool calls, per transport and tool."""
+    return {"transport": tool_transport.TOOL_TRANSPORT, "latency": tool_transport.latency_stats.snapshot()}
+
+@router.get("/agent/intents")
+def get_intent_stats():
+    """Hit rate of the agent's deterministic intent fast path."""
+    return intent_router.intent_stats.snapshot()
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from pymongo.database import Database
 from typing import List
 
 from models import TaskCreate, TaskInDB, UserInDB, ProjectInDB, PyObjectId, TaskUpdate
 from dependencies import get_db, get_current_user
+from pagination import PageParams, page_params, paginate, projection_for
+from migrate_company_ids import company_id_filter
 
 router = APIRouter(
     prefix="/tasks",
@@ -14,7 +16,7 @@ router = APIRouter(
 def verify_project_membership(project_id: PyObjectId, current_user: UserInDB, db: Database) -> ProjectInDB:
     project_data = db.projects.find_one({
         "_id": project_id, 
-        "company_id": {"$in": [str(current_user.company_id), current_user.company_id]}
+        "company_id": company_id_filter(db, current_user.company_id)
     })
     if not project_data:
         raise HTTPException(status_code=404, detail="Project not found or user does not have access")
@@ -44,12 +46,12 @@ def create_task(task: TaskCreate, db: Database = Depends(get_db), current_user:
     return TaskInDB(**created_task)
 
 @router.get("/project/{project_id}", response_model=List[TaskInDB])
-def list_tasks_for_project(project_id: PyObjectId, db: Database = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
-    """List all tasks for a specific project. User must be a member of the project."""
+def list_tasks_for_project(project_id: PyObjectId, response: Response, db: Database = Depends(get_db), current_user: UserInDB = Depends(get_current_user), page: PageParams = Depends(page_params)):
+    """List the tasks of a specific project, one page at a time. User must be a member of the project."""
     verify_project_membership(project_id, current_user, db)
     
-    tasks_cursor = db.tasks.find({"project_id": project_id})
-    return [TaskInDB(**t) for t in tasks_cursor]
+    tasks = paginate(db.tasks, {"project_id": project_id}, page, response, projection=projection_for(TaskInDB))
+    return [TaskInDB(**t) for t in tasks]
 
 @router.put("/{task_id}", response_model=TaskInDB)
 def update_task(task_id: PyObjectId, task_update: TaskUpdate, db: Database = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
@@ -1,6 +1,10 @@
+import os
 import logging
 from apscheduler.schedulers.blocking import BlockingScheduler
 from web_downloader import run_scraper
+from checkpoint_retention import run_compaction, CHECKPOINT_COMPACTION_HOURS
+from embedding_models import run_pending_reembedding, EMBEDDING_REEMBED_MINUTES
+from migrate_company_ids import run_migration as run_company_id_migration, COMPANY_ID_MIGRATION_HOURS
 
 # Configure logging explicitly to ensure output is captured
 logging.basicConfig(
@@ -14,19 +18,80 @@ logging.basicConfig(
 logging.getLogger('apscheduler').setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 
+# How often the scheduler wakes up to look for due sources. Each source keeps its
+# own adaptive interval (see source_schedule.py), so this only bounds the latency.
+POLL_INTERVAL_MINUTES = int(os.getenv("SCHEDULER_POLL_MINUTES", 60))
+POLL_JITTER_SECONDS = int(os.getenv("SCHEDULER_POLL_JITTER_SECONDS", 120))
+
 def scheduled_job():
     """The job that will be executed by the scheduler."""
     logger.info("--- Starting scheduled scraper job ---")
     try:
-        run_scraper()
+        run_scraper(due_only=True)
         logger.info("--- Scheduled scraper job finished successfully ---")
     except Exception as e:
         logger.error(f"An error occurred during the scheduled scraper job: {e}", exc_info=True)
 
+def compaction_job():
+    """Deletes old agent checkpoints (see checkpoint_retention.py)."""
+    logger.info("--- Starting checkpoint compaction job ---")
+    try:
+        run_compaction()
+    except Exception as e:
+        logger.error(f"An error occurred during the checkpoint compaction job: {e}", exc_info=True)
+
+def company_id_migration_job():
+    """Converts company_id strings written since the last pass (see migrate_company_ids.py)."""
+    logger.info("--- Starting company_id migration job ---")
+    try:
+        from db_manager import get_db
+        run_company_id_migration(get_db())
+    except Exception as e:
+        logger.error(f"An error occurred during the company_id migration job: {e}", exc_info=True)
+
+def reembedding_job():
+    """Fills the vectors of the embedding models being built (see embedding_models.py)."""
+    logger.info("--- Starting re-embedding job ---")
+    try:
+        run_pending_reembedding()
+    except Exception as e:
+        logger.error(f"An error occurred during the re-embedding job: {e}", exc_info=True)
+
 if __name__ == "__main__":
     scheduler = BlockingScheduler()
-    # Schedule the job to run every 24 hours
-    scheduler.add_job(scheduled_job, 'interval', hours=24)
+    # Poll for due sources; only the sources whose next_check_at has passed are scraped
+    scheduler.add_job(
+        scheduled_job,
+        'interval',
+        minutes=POLL_INTERVAL_MINUTES,
+        jitter=POLL_JITTER_SECONDS,
+        max_instances=1,
+        coalesce=True,
+    )
+    # Retention of the agent's conversation checkpoints
+    scheduler.add_job(
+        compaction_job,
+        'interval',
+        hours=CHECKPOINT_COMPACTION_HOURS,
+        max_instances=1,
+        coalesce=True,
+    )
+    # Keeps company_id stored as ObjectId (the API also runs it at startup)
+    scheduler.add_job(
+        company_id_migration_job,
+        'interval',
+        hours=COMPANY_ID_MIGRATION_HOURS,
+        max_instances=1,
+        coalesce=True,
+    )
+    # Background re-embedding when switching embedding models; a bounded number of batches per run
+    scheduler.add_job(
+        reembedding_job,
+        'interval',
+        minutes=EMBEDDING_REEMBED_MINUTES,
+        max_instances=1,
+        coalesce=True,
+    )
     
     logger.info("Scheduler started. Press Ctrl+C to exit.")
     
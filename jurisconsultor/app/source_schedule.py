@@ -0,0 +1,89 @@
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Adaptive per-source scheduling for the scraper.
+# Each source in `scraping_sources` carries its own `check_interval_hours` and
+# `next_check_at`. Sources whose content changes often are checked more often,
+# stable laws drift towards the maximum interval, and failing sources back off
+# exponentially. Jitter spreads checks so they don't all fire at the same time.
+
+DEFAULT_INTERVAL_HOURS = float(os.getenv("SCRAPER_DEFAULT_INTERVAL_HOURS", 24))
+MIN_INTERVAL_HOURS = float(os.getenv("SCRAPER_MIN_INTERVAL_HOURS", 12))
+MAX_INTERVAL_HOURS = float(os.getenv("SCRAPER_MAX_INTERVAL_HOURS", 24 * 30))
+UNCHANGED_GROWTH_FACTOR = float(os.getenv("SCRAPER_UNCHANGED_GROWTH_FACTOR", 1.5))
+CHANGED_SHRINK_FACTOR = float(os.getenv("SCRAPER_CHANGED_SHRINK_FACTOR", 0.5))
+FAILURE_BASE_HOURS = float(os.getenv("SCRAPER_FAILURE_BASE_HOURS", 1))
+MAX_FAILURE_BACKOFF_HOURS = float(os.getenv("SCRAPER_MAX_FAILURE_BACKOFF_HOURS", 24 * 7))
+JITTER_FRACTION = float(os.getenv("SCRAPER_JITTER_FRACTION", 0.1))
+
+OUTCOME_CHANGED = "changed"
+OUTCOME_UNCHANGED = "unchanged"
+OUTCOME_FAILED = "failed"
+
+
+def due_sources_query(now: Optional[datetime] = None) -> dict:
+    """Returns the MongoDB filter for sources that have a URL and are due for a check.
+    Sources that were never scheduled (no `next_check_at`) are always due."""
+    now = now or datetime.utcnow()
+    return {
+        "url": {"$ne": None},
+        "$or": [
+            {"next_check_at": None},
+            {"next_check_at": {"$lte": now}},
+        ],
+    }
+
+
+def _clamp(hours: float, low: float, high: float) -> float:
+    return max(low, min(high, hours))
+
+
+def _apply_jitter(hours: float, rng: random.Random) -> float:
+    if JITTER_FRACTION <= 0:
+        return hours
+    return hours * (1 + rng.uniform(-JITTER_FRACTION, JITTER_FRACTION))
+
+
+def next_schedule(source: dict, outcome: str, now: Optional[datetime] = None, rng: Optional[random.Random] = None) -> dict:
+    """
+    Computes the scheduling fields to `$set` on a source after a check.
+
+    Args:
+        source (dict): The source document as stored before this check.
+        outcome (str): One of OUTCOME_CHANGED, OUTCOME_UNCHANGED or OUTCOME_FAILED.
+        now (datetime, optional): Reference time, defaults to utcnow.
+        rng (random.Random, optional): Random generator used for the jitter.
+
+    Returns:
+        A dict with `check_interval_hours`, `consecutive_failures`, `next_check_at`
+        and `last_checked_at` (plus `last_changed_at` when the content changed).
+    """
+    now = now or datetime.utcnow()
+    rng = rng or random
+    interval = float(source.get("check_interval_hours") or DEFAULT_INTERVAL_HOURS)
+    failures = int(source.get("consecutive_failures") or 0)
+
+    fields = {"last_checked_at": now}
+
+    if outcome == OUTCOME_FAILED:
+        failures += 1
+        # The learned interval is kept untouched; only the retry delay backs off.
+        delay = _clamp(FAILURE_BASE_HOURS * (2 ** (failures - 1)), FAILURE_BASE_HOURS, MAX_FAILURE_BACKOFF_HOURS)
+    else:
+        failures = 0
+        if outcome == OUTCOME_CHANGED:
+            interval *= CHANGED_SHRINK_FACTOR
+            fields["last_changed_at"] = now
+        elif outcome == OUTCOME_UNCHANGED:
+            interval *= UNCHANGED_GROWTH_FACTOR
+        else:
+            raise ValueError(f"Unknown scrape outcome: {outcome}")
+        interval = _clamp(interval, MIN_INTERVAL_HOURS, MAX_INTERVAL_HOURS)
+        delay = interval
+
+    fields["check_interval_hours"] = round(interval, 2)
+    fields["consecutive_failures"] = failures
+    fields["next_check_at"] = now + timedelta(hours=_apply_jitter(delay, rng))
+    return fields
@@ -0,0 +1,154 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Tuple
+
+import pymongo
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Startup pipeline of the API.
+# Importing main.py only loads what is needed to start serving requests. The agent
+# graph (LangChain, LangGraph, the LLM clients and the checkpointer) is imported on
+# first use, and so is the embedding model (sentence-transformers/torch). At startup
+# a warm-up thread loads both in the background, so the first /ask does not pay for
+# them. /health/live answers as soon as the process serves HTTP; /health/ready
+# answers 503 until MongoDB responds to a ping and the warm-up has finished.
+# STARTUP_WARMUP=false skips the warm-up (everything loads on first use).
+# With a shared embedding service the warm-up waits for the service to answer,
+# retrying with exponential backoff (up to EMBEDDING_SERVICE_RETRY_MAX_SECONDS
+# between attempts): the service may still be loading its model when the API starts.
+
+STARTUP_WARMUP_ENABLED = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", 2))
+EMBEDDING_SERVICE_RETRY_MAX_SECONDS = float(os.getenv("EMBEDDING_SERVICE_RETRY_MAX_SECONDS", 30))
+
+PENDING, READY, FAILED, LAZY = "pending", "ready", "failed", "lazy"
+
+
+class StartupState:
+    """Status and load time of the components loaded off the critical path."""
+
+    def __init__(self, components):
+        self._lock = threading.Lock()
+        self._components = {name: {"status": PENDING} for name in components}
+
+    def set(self, name: str, status: str, seconds: float = None, error: str = None):
+        with self._lock:
+            entry = {"status": status}
+            if seconds is not None:
+                entry["seconds"] = round(seconds, 2)
+            if error:
+                entry["error"] = error
+            self._components[name] = entry
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._components.items()}
+
+    def ready(self) -> bool:
+        with self._lock:
+            return all(entry["status"] in (READY, LAZY) for entry in self._components.values())
+
+
+startup_state = StartupState(["agent", "embedding_model"])
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """Returns the compiled agent graph, importing graph_agent on first use."""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            start = time.perf_counter()
+            from graph_agent import graph
+            _graph = graph
+            startup_state.set("agent", READY, time.perf_counter() - start)
+        return _graph
+
+
+def _wait_for_embedding_service(service):
+    """Polls the embedding service until it answers. The component stays pending (with
+    the last error) meanwhile, instead of failing for good on a cold start."""
+    delay = 1.0
+    while True:
+        try:
+            service.health()
+            return
+        except Exception as e:
+            startup_state.set("embedding_model", PENDING, error=f"Embedding service not available: {e}")
+            logger.warning(f"Warm-up: embedding service not available ({e}), retrying in {delay:.0f} s.")
+            time.sleep(delay)
+            delay = min(delay * 2, EMBEDDING_SERVICE_RETRY_MAX_SECONDS)
+
+
+def _load_embedding_model():
+    import embedding_client
+    service = embedding_client.get_client()
+    if service is not None:
+        # The model lives in the embedding service; only wait until it answers
+        _wait_for_embedding_service(service)
+        return
+    from utils import get_embedding_model
+    import embedding_models
+    try:
+        model_name = embedding_models.active_model().model_name
+    except Exception as e:
+        # The registry lives in PostgreSQL; warm the configured model if it cannot be read
+        logger.warning(f"Warm-up: could not read the active embedding model ({e}), using EMBEDDING_MODEL_NAME.")
+        model_name = None
+    get_embedding_model(model_name)
+
+
+def _warm(name: str, load: Callable[[], None]):
+    start = time.perf_counter()
+    try:
+        load()
+        startup_state.set(name, READY, time.perf_counter() - start)
+        logger.info(f"Warm-up: {name} loaded in {time.perf_counter() - start:.2f} s.")
+    except Exception as e:
+        startup_state.set(name, FAILED, time.perf_counter() - start, str(e))
+        logger.error(f"Warm-up: could not load {name}: {e}", exc_info=True)
+
+
+def warm_up():
+    _warm("agent", get_graph)
+    _warm("embedding_model", _load_embedding_model)
+
+
+def start_warmup() -> threading.Thread:
+    """Loads the agent and the embedding model in a daemon thread."""
+    if not STARTUP_WARMUP_ENABLED:
+        # Loaded on first use; readiness does not wait for them
+        for name in startup_state.snapshot():
+            startup_state.set(name, LAZY)
+        logger.info("Startup warm-up disabled; the agent and the embedding model load on first use.")
+        return None
+    thread = threading.Thread(target=warm_up, name="startup-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def ping_mongo(client: MongoClient) -> Tuple[bool, str]:
+    try:
+        with pymongo.timeout(READINESS_TIMEOUT_SECONDS):
+            client.admin.command("ping")
+        return True, READY
+    except PyMongoError as e:
+        return False, str(e)
+
+
+def readiness(client: MongoClient) -> Tuple[bool, dict]:
+    """Returns (ready, report) for the readiness probe."""
+    mongo_ok, mongo_status = ping_mongo(client)
+    components = startup_state.snapshot()
+    components["mongodb"] = {"status": READY if mongo_ok else FAILED}
+    if not mongo_ok:
+        components["mongodb"]["error"] = mongo_status
+    ready = mongo_ok and startup_state.ready()
+    return ready, {"status": "ready" if ready else "not_ready", "components": components}
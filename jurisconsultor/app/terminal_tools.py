@@ -0,0 +1,80 @@
+import os
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import intent_router
+
+logger = logging.getLogger(__name__)
+
+# Terminal tools.
+# Some tools already return a user-facing answer (the RAG tool writes it with its
+# own LLM call) or a result that a fixed formatter can present (project and task
+# listings). Such tools are marked with `metadata={"terminal": <formatter>}`; when
+# every tool of a step is terminal, the graph answers with the formatted results
+# and skips the extra LLM pass that would only restate them. Results a formatter
+# cannot handle (errors, unexpected payloads) go to the LLM as before.
+# AGENT_TERMINAL_TOOLS=false disables the shortcut.
+
+TERMINAL_TOOLS_ENABLED = os.getenv("AGENT_TERMINAL_TOOLS", "true").lower() == "true"
+
+FINAL_ANSWER_PREFIX = "FINAL_ANSWER:"
+
+
+def format_answer(content: str) -> Optional[str]:
+    """The tool output is the answer itself."""
+    content = content.strip()
+    if not content or content.startswith("Error"):
+        return None
+    if content.startswith(FINAL_ANSWER_PREFIX):
+        return content
+    return f"{FINAL_ANSWER_PREFIX} {content}"
+
+
+def format_projects(content: str) -> Optional[str]:
+    result = json.loads(content)
+    if "error" in result:
+        return None
+    return intent_router.format_projects(result)
+
+
+def format_tasks(content: str) -> Optional[str]:
+    result = json.loads(content)
+    if "error" in result:
+        return None
+    return intent_router.format_tasks(result, result.get("project_id", ""))
+
+
+FORMATTERS: Dict[str, Callable[[str], Optional[str]]] = {
+    "answer": format_answer,
+    "projects": format_projects,
+    "tasks": format_tasks,
+}
+
+
+def formatter_for(tool) -> Optional[str]:
+    """The terminal formatter declared in the tool's metadata, if any."""
+    if tool is None:
+        return None
+    return (tool.metadata or {}).get("terminal")
+
+
+def final_answer(results: List[Tuple[Optional[str], str]]) -> Optional[str]:
+    """Builds the final answer from (formatter name, tool output) pairs, or returns None
+    if any result is not terminal or cannot be formatted."""
+    if not TERMINAL_TOOLS_ENABLED or not results:
+        return None
+    parts = []
+    for formatter_name, content in results:
+        formatter = FORMATTERS.get(formatter_name)
+        if formatter is None:
+            return None
+        try:
+            formatted = formatter(str(content))
+        except (ValueError, TypeError, KeyError) as e:
+            logger.debug(f"Terminal formatter '{formatter_name}' could not format the tool output: {e}")
+            return None
+        if formatted is None:
+            return None
+        parts.append(formatted[len(FINAL_ANSWER_PREFIX):].strip())
+    return f"{FINAL_ANSWER_PREFIX} " + "\n\n".join(parts)
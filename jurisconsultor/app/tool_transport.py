@@ -0,0 +1,160 @@
+import os
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Transports used by the agent's project and task tools.
+# "http" calls the project-manager MCP server through one pooled requests.Session
+# with connect/read timeouts. "inprocess" runs the same operations directly
+# against the application database (project_service.py), which removes the
+# network hop on single-node deployments. TOOL_TRANSPORT selects the transport.
+# Every call is timed and the latencies are kept per (transport, tool).
+
+TOOL_TRANSPORT = os.getenv("TOOL_TRANSPORT", "http")
+API_BASE_URL = os.getenv("BACKEND_API_URL", "http://jurisbot-project-manager-mcp:8000")
+TOOL_HTTP_CONNECT_TIMEOUT = float(os.getenv("TOOL_HTTP_CONNECT_TIMEOUT", 3))
+TOOL_HTTP_READ_TIMEOUT = float(os.getenv("TOOL_HTTP_READ_TIMEOUT", 30))
+TOOL_HTTP_POOL_SIZE = int(os.getenv("TOOL_HTTP_POOL_SIZE", 10))
+LATENCY_SAMPLES = 500
+
+
+class HttpToolTransport:
+    """Calls the tool endpoints of the project-manager MCP server."""
+
+    name = "http"
+
+    def __init__(self, base_url: str = API_BASE_URL):
+        self.base_url = base_url
+        self.timeout = (TOOL_HTTP_CONNECT_TIMEOUT, TOOL_HTTP_READ_TIMEOUT)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TOOL_HTTP_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method: str, path: str, headers: dict, **kwargs) -> dict:
+        response = self.session.request(method, f"{self.base_url}{path}", headers=headers, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def list_projects(self, tenant_id: str, headers: dict, user_email: Optional[str] = None) -> dict:
+        return self._request("GET", "/tools/list_projects", headers, params={"tenant_id": tenant_id})
+
+    def create_project(self, tenant_id: str, headers: dict, user_email: str, project_name: str, project_description: Optional[str] = None) -> dict:
+        payload = {
+            "project_name": project_name,
+            "tenant_id": tenant_id,
+            "user_email": user_email,
+            "project_description": project_description,
+        }
+        return self._request("POST", "/tools/create_project", headers, json=payload)
+
+    def create_task(self, tenant_id: str, headers: dict, project_id: str, title: str, description: Optional[str] = None) -> dict:
+        payload = {"project_id": project_id, "title": title, "tenant_id": tenant_id, "description": description}
+        return self._request("POST", "/tools/create_task", headers, json=payload)
+
+    def list_tasks_for_project(self, tenant_id: str, headers: dict, project_id: str) -> dict:
+        return self._request("GET", "/tools/list_tasks_for_project", headers, params={"project_id": project_id, "tenant_id": tenant_id})
+
+
+class InProcessToolTransport:
+    """Runs the tool operations directly against the application database."""
+
+    name = "inprocess"
+
+    def _db(self):
+        from db_manager import get_db
+        return get_db()
+
+    def list_projects(self, tenant_id: str, headers: dict, user_email: Optional[str] = None) -> dict:
+        import project_service
+        return project_service.list_projects(self._db(), tenant_id)
+
+    def create_project(self, tenant_id: str, headers: dict, user_email: str, project_name: str, project_description: Optional[str] = None) -> dict:
+        import project_service
+        return project_service.create_project(self._db(), tenant_id, user_email, project_name, project_description)
+
+    def create_task(self, tenant_id: str, headers: dict, project_id: str, title: str, description: Optional[str] = None) -> dict:
+        import project_service
+        return project_service.create_task(self._db(), tenant_id, project_id, title, description)
+
+    def list_tasks_for_project(self, tenant_id: str, headers: dict, project_id: str) -> dict:
+        import project_service
+        return project_service.list_tasks_for_project(self._db(), tenant_id, project_id)
+
+
+TRANSPORTS = {
+    HttpToolTransport.name: HttpToolTransport,
+    InProcessToolTransport.name: InProcessToolTransport,
+}
+
+
+class ToolLatencyStats:
+    """Keeps the most recent call latencies per (transport, tool)."""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self._latencies = defaultdict(lambda: deque(maxlen=samples))
+        self._errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, transport: str, tool: str, seconds: float, error: bool = False):
+        with self._lock:
+            self._latencies[(transport, tool)].append(seconds * 1000)
+            if error:
+                self._errors[(transport, tool)] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = {key: sorted(values) for key, values in self._latencies.items()}
+            errors = dict(self._errors)
+        report = {}
+        for (transport, tool), values in items.items():
+            report.setdefault(transport, {})[tool] = {
+                "calls": len(values),
+                "errors": errors.get((transport, tool), 0),
+                "mean_ms": round(sum(values) / len(values), 2),
+                "p50_ms": round(values[len(values) // 2], 2),
+                "p95_ms": round(values[max(int(len(values) * 0.95) - 1, 0)], 2),
+                "max_ms": round(values[-1], 2),
+            }
+        return report
+
+
+latency_stats = ToolLatencyStats()
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Returns the transport selected by TOOL_TRANSPORT, created on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            if TOOL_TRANSPORT not in TRANSPORTS:
+                raise ValueError(f"Unknown TOOL_TRANSPORT '{TOOL_TRANSPORT}'. Expected one of: {', '.join(TRANSPORTS)}.")
+            _transport = TRANSPORTS[TOOL_TRANSPORT]()
+            logger.info(f"Agent tools use the '{TOOL_TRANSPORT}' transport.")
+        return _transport
+
+
+def call_tool(tool: str, *args, **kwargs) -> dict:
+    """Calls `tool` on the configured transport and records its latency."""
+    transport = get_transport()
+    start = time.perf_counter()
+    error = False
+    try:
+        return getattr(transport, tool)(*args, **kwargs)
+    except Exception:
+        error = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        latency_stats.record(transport.name, tool, elapsed, error)
+        logger.debug(f"Tool {tool} via {transport.name} took {elapsed * 1000:.1f} ms.")
@@ -1,132 +1,82 @@
-import requests
 import json
 import os
-import re
-import docx
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 import logging
-from jose import jwt
+from jose import JWTError
+
+from docx_templates import template_cache
+from security import verify_token
+from tool_transport import call_tool
 
 
 logger = logging.getLogger(__name__)
 
 # This module defines the core logic for the tools the AI agent can use.
 
-API_BASE_URL = os.getenv("BACKEND_API_URL", "http://jurisbot-project-manager-mcp:8000")
-TEMPLATE_DIR = "../formatos/"
 GENERATED_DOCS_PATH = "../documentos_generados/"
 
-_auth_token = None
-_tenant_id = None
+# The caller's token and tenant are request-scoped: every request (and every thread
+# or task it starts) sees only its own values, so one worker can run many agent
+# sessions concurrently.
+_auth_token: ContextVar[str] = ContextVar("auth_token", default=None)
+_tenant_id: ContextVar[str] = ContextVar("tenant_id", default=None)
 
 def set_auth_token(token: str):
-    """Sets the authentication token for the API calls for the current turn."""
-    global _auth_token
-    _auth_token = token
+    """Sets the authentication token for the API calls of the current context."""
+    _auth_token.set(token)
 
 def set_tenant_id(tenant_id: str):
-    """Sets the tenant ID for the API calls for the current turn."""
-    global _tenant_id
-    _tenant_id = tenant_id
+    """Sets the tenant ID for the API calls of the current context."""
+    _tenant_id.set(tenant_id)
+
+@contextmanager
+def auth_context(token: str, tenant_id: str):
+    """Sets the token and tenant for the tool calls made inside the block and restores
+    the previous values on exit."""
+    token_reset = _auth_token.set(token)
+    tenant_reset = _tenant_id.set(tenant_id)
+    try:
+        yield
+    finally:
+        _tenant_id.reset(tenant_reset)
+        _auth_token.reset(token_reset)
 
 def _get_headers() -> dict:
     """Helper function to get authentication headers."""
-    if not _auth_token:
+    if not _auth_token.get():
         # This clear error message is crucial for the agent to understand the problem.
         raise ValueError("Authentication token not set. I cannot use tools that require API calls. I must inform the user about a potential login issue.")
-    if not _tenant_id:
+    if not _tenant_id.get():
         raise ValueError("Tenant ID not set. I cannot use tools that require API calls.")
     return {
-        "Authorization": f"Bearer {_auth_token}",
-        "X-Tenant-ID": _tenant_id,
+        "Authorization": f"Bearer {_auth_token.get()}",
+        "X-Tenant-ID": _tenant_id.get(),
         "Content-Type": "application/json",
     }
 
 def get_template_placeholders(template_name: str) -> str:
-    """Reads a .docx template and extracts its placeholders in a robust manner."""
+    """Returns the placeholders of a .docx template, served from the parsed-template cache."""
     try:
-        template_path = os.path.join(TEMPLATE_DIR, template_name)
-        if not os.path.exists(template_path):
-            return json.dumps({"error": f"Template '{template_name}' not found."})
-        
-        doc = docx.Document(template_path)
-        placeholders = set()
-        
-        # Regex to find placeholders, including those split across runs
-        placeholder_regex = re.compile(r'{{(.*?)}}')
-
-        # Function to extract placeholders from a text block (paragraph or cell)
-        def extract_from_block(block):
-            # Reassemble text from runs to handle split placeholders
-            full_run_text = "".join(run.text for run in block.runs)
-            for match in placeholder_regex.finditer(full_run_text):
-                placeholders.add(match.group(1).strip())
-
-        # Process paragraphs
-        for para in doc.paragraphs:
-            extract_from_block(para)
-
-        # Process tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    extract_from_block(cell) # Cells also have .runs
-                    # Also check cell's paragraphs for good measure
-                    for para_in_cell in cell.paragraphs:
-                         extract_from_block(para_in_cell)
-
-        if not placeholders:
-            # If the above fails, fall back to a simpler full-text search
-            full_text = "\n".join([p.text for p in doc.paragraphs])
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        full_text += "\n" + cell.text
-            
-            found = set(re.findall(r"{{(.*?)}}", full_text))
-            if not found:
-                return json.dumps({"error": f"No placeholders like '{{field}}' found in the template '{template_name}'."})
-            return json.dumps([p.strip() for p in found])
-
-        return json.dumps(list(placeholders))
+        metadata = template_cache.get(template_name)
+    except FileNotFoundError:
+        return json.dumps({"error": f"Template '{template_name}' not found."})
     except Exception as e:
         return json.dumps({"error": f"Failed to read template. {e}"})
 
+    if not metadata.placeholders:
+        return json.dumps({"error": f"No placeholders like '{{field}}' found in the template '{template_name}'."})
+    return json.dumps(metadata.placeholders)
+
 def fill_template_and_save_document(template_name: str, document_name: str, context: dict) -> str:
     """Fills and saves a .docx template with the provided context. Returns the path of the new file."""
     if not document_name or not context:
         return json.dumps({"error": "Called with missing document_name or context."})
     try:
-        template_path = os.path.join(TEMPLATE_DIR, template_name)
-        if not os.path.exists(template_path):
-            return json.dumps({"error": f"Template '{template_name}' not found."})
-
-        doc = docx.Document(template_path)
-
-        # Helper to replace text in a block (paragraph or cell) while preserving some formatting
-        def replace_text_in_block(block, key, value):
-            search_text = f"{{{{{key}}}}}"
-            if search_text in block.text:
-                # Build up the new text
-                new_text = block.text.replace(search_text, str(value))
-                # Clear existing runs and add new run with replaced text
-                for run in block.runs:
-                    run.clear()
-                block.add_run(new_text)
-
-        # Replace placeholders in paragraphs
-        for para in doc.paragraphs:
-            for key, value in context.items():
-                replace_text_in_block(para, key, value)
-
-        # Replace placeholders in tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for para in cell.paragraphs:
-                        for key, value in context.items():
-                            replace_text_in_block(para, key, value)
-        
+        # Single pass over the pre-compiled template; run formatting is preserved
+        doc = template_cache.render(template_name, context)
+
         # Save the new document
         new_file_name = f"{document_name.replace(' ', '_')}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.docx"
         new_file_path = os.path.join(GENERATED_DOCS_PATH, new_file_name)
@@ -134,82 +84,72 @@ def fill_template_and_save_document(template_name: str, document_name: str, cont
         doc.save(new_file_path)
         
         return json.dumps({"success": True, "file_path": new_file_path})
+    except FileNotFoundError:
+        return json.dumps({"error": f"Template '{template_name}' not found."})
     except Exception as e:
         return json.dumps({"error": f"Failed to fill and save document. {e}"})
 
 
 
+def _current_user_email() -> str:
+    """Returns the email (the `sub` claim) of the token set for the current turn."""
+    return _user_email_from_token(_auth_token.get())
+
+def _user_email_from_token(token: str) -> str:
+    # Verified on every call (signature and exp): a token must stop working once it expires
+    payload_data = verify_token(token)
+    user_email = payload_data.get("sub")
+    if not user_email:
+        raise ValueError("Could not extract user email from token.")
+    return user_email
+
+def _to_json(data: dict) -> str:
+    # The in-process transport returns datetimes that the HTTP transport receives as strings
+    return json.dumps(data, default=str)
+
 def list_projects() -> str:
     """Lists all projects the user is a member of."""
     try:
         headers = _get_headers()
-        logger.debug(f"Calling API to list projects at {API_BASE_URL}/tools/list_projects with tenant_id: {_tenant_id}")
-        response = requests.get(f"{API_BASE_URL}/tools/list_projects?tenant_id={_tenant_id}", headers=headers)
-        response.raise_for_status()
-        json_response = response.json()
-        logger.debug(f"API response for list_projects: {json_response}")
-        return json.dumps(json_response)
+        tenant_id = _tenant_id.get()
+        logger.debug(f"Listing projects with tenant_id: {tenant_id}")
+        json_response = call_tool("list_projects", tenant_id, headers)
+        logger.debug(f"Response for list_projects: {json_response}")
+        return _to_json(json_response)
     except Exception as e:
         logger.error(f"Failed to list projects. {e}")
         return json.dumps({"error": f"Failed to list projects. {e}"})
 
 def create_project(project_name: str, project_description: str = None) -> str:
-    """Creates a new project via the backend API."""
+    """Creates a new project through the configured tool transport."""
     try:
         headers = _get_headers()
-        
-        # Decode the token to get the user's email
-        # This assumes the same secret and algorithm are used as in the main app's security module
-        secret_key = os.getenv("SECRET_KEY")
-        algorithm = os.getenv("ALGORITHM")
-        if not secret_key or not algorithm:
-            raise ValueError("SECRET_KEY and ALGORITHM environment variables must be set.")
-            
         try:
-            payload_data = jwt.decode(_auth_token, secret_key, algorithms=[algorithm])
-            user_email = payload_data.get("sub")
-            if not user_email:
-                return json.dumps({"error": "Could not extract user email from token."})
-        except jwt.JWTError as e:
+            user_email = _current_user_email()
+        except JWTError as e:
             logger.error(f"JWT decoding error: {e}")
             return json.dumps({"error": f"Invalid token. {e}"})
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
 
-        payload = {
-            "project_name": project_name,
-            "tenant_id": _tenant_id,
-            "user_email": user_email, # Add the user's email to the payload
-            "project_description": project_description
-        }
-        response = requests.post(f"{API_BASE_URL}/tools/create_project", headers=headers, json=payload)
-        response.raise_for_status()
-        project_data = response.json()
+        project_data = call_tool("create_project", _tenant_id.get(), headers, user_email, project_name, project_description)
         return json.dumps({"success": True, "project_id": project_data["project_id"], "project_name": project_data["project_name"]})
     except Exception as e:
         return json.dumps({"error": f"Failed to create project. {e}"})
 
 def create_new_task(project_id: str, title: str, description: str = None) -> str:
-    """Creates a new task for a given project via the backend API."""
+    """Creates a new task for a given project through the configured tool transport."""
     try:
         headers = _get_headers()
-        payload = {
-            "project_id": project_id,
-            "title": title,
-            "tenant_id": _tenant_id,
-            "description": description
-        }
-        response = requests.post(f"{API_BASE_URL}/tools/create_task", headers=headers, json=payload)
-        response.raise_for_status()
-        task_data = response.json()
+        task_data = call_tool("create_task", _tenant_id.get(), headers, project_id, title, description)
         return json.dumps({"success": True, "task_id": task_data["task_id"], "task_title": task_data["task_title"]})
     except Exception as e:
         return json.dumps({"error": f"Failed to create task. {e}"})
 
 def list_tasks_for_project(project_id: str) -> str:
-    """Lists all tasks for a given project via the backend API."""
+    """Lists all tasks for a given project through the configured tool transport."""
     try:
         headers = _get_headers()
-        response = requests.get(f"{API_BASE_URL}/tools/list_tasks_for_project?project_id={project_id}&tenant_id={_tenant_id}", headers=headers)
-        response.raise_for_status()
-        return json.dumps(response.json())
+        return _to_json(call_tool("list_tasks_for_project", _tenant_id.get(), headers, project_id))
     except Exception as e:
-        return json.dumps({"error": f"Failed to list tasks for project {project_id}. {e}"})
\ No newline at end of file
+        return json.dumps({"error": f"Failed to list tasks for project {project_id}. {e}"})
@@ -0,0 +1,70 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from models import UserInDB
+
+# TTL-bounded in-process cache of authenticated users.
+# get_current_user runs on every authenticated request; caching the user for a
+# short time removes the Mongo round-trip from most of them. Entries are keyed by
+# (email, token iat), so a new login never reuses an entry created for an older
+# token. The endpoints that modify or delete users invalidate the entries of that
+# user explicitly; in multi-worker deployments the other workers converge within
+# USER_CACHE_TTL_SECONDS.
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 1024))
+
+
+class UserCache:
+    """Thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Optional[int]], Tuple[float, UserInDB]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, email: str, iat: Optional[int]) -> Optional[UserInDB]:
+        """Returns a copy of the cached user, or None if absent or expired."""
+        if self.ttl_seconds <= 0:
+            return None
+        key = (email, iat)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Callers get their own copy, so a request can never alter the cached user
+        return user.model_copy()
+
+    def put(self, email: str, iat: Optional[int], user: UserInDB):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[(email, iat)] = (time.monotonic() + self.ttl_seconds, user.model_copy())
+            self._entries.move_to_end((email, iat))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *emails: Optional[str]):
+        """Drops every cached entry of the given users, whatever token they came from."""
+        targets = {email for email in emails if email}
+        if not targets:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in targets]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
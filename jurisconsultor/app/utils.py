@@ -5,7 +5,6 @@ import json
 import logging
 from typing import List, Dict, Any # New import
 from functools import lru_cache
-from sentence_transformers import SentenceTransformer
 import psycopg2
 from psycopg2.extras import execute_values
 from pymongo import MongoClient
@@ -13,6 +12,9 @@ from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from dotenv import load_dotenv
 from tenacity import retry, wait_fixed, stop_after_attempt, before_log, after_log, retry_if_exception_type
 
+import embedding_client
+import embedding_models
+
 # Setup logger for this module
 logger = logging.getLogger(__name__)
 
@@ -41,10 +43,16 @@ def get_mongo_client():
     logger.info("MongoDB connection successful.")
     return client
 
-@lru_cache(maxsize=1)
-def get_embedding_model():
-    model_name = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
-    return SentenceTransformer(model_name)
+def get_embedding_model(model_name: str = None):
+    return _load_embedding_model(model_name or os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"))
+
+# Three slots: the active model, the one being re-embedded (see embedding_models.py)
+# and, right after a switch, the previous active model
+@lru_cache(maxsize=3)
+def _load_embedding_model(model_name: str):
+    # Imported on first use: sentence-transformers pulls in torch, which takes seconds to import
+    from embedding_backends import load_model
+    return load_model(model_name)
 
 def get_public_db_conn():
     public_postgres_uri = os.getenv("PUBLIC_POSTGRES_URI")
@@ -60,9 +68,15 @@ def get_private_db_conn():
 
 # --- Embedding Generation ---
 
-def generate_embedding(text: str):
-    model = get_embedding_model()
-    return model.encode(text)
+def generate_embedding(text: str, model_name: str = None):
+    return generate_embeddings([text], model_name)[0]
+
+def generate_embeddings(texts: List[str], model_name: str = None):
+    """Embeds several texts at once, with the shared embedding service if one is configured."""
+    service = embedding_client.get_client()
+    if service is not None:
+        return service.embed(texts, model_name)
+    return get_embedding_model(model_name).encode(texts)
 
 # --- LLM & RAG Core Logic ---
 
@@ -104,20 +118,22 @@ def call_llm(prompt: str, json_format: bool = False) -> str:
         logger.error(f"An error occurred while querying the LLM: {e}")
         return f"Error: No se pudo obtener una respuesta del modelo de lenguaje. {e}"
 
-def find_relevant_documents(query_embedding, top_k=3, query_text: str = None):
+def find_relevant_documents(query_embedding, top_k=3, query_text: str = None, model=None):
     """
     Finds the most relevant document chunks from the database using a hybrid approach
-    (vector search + keyword search).
+    (vector search + keyword search). `query_embedding` must come from `model`
+    (the active embedding model by default).
     """
     try:
         conn = get_public_db_conn()
         cur = conn.cursor()
         
         # 1. Vector Search
+        model = model or embedding_models.active_model(cur)
         embedding_str = str(query_embedding.tolist())
-        sql_query = "SELECT content, source FROM documents ORDER BY embedding <-> %s LIMIT %s;"
-        logger.info(f"Executing RAG retrieval (vector) query with limit {top_k}")
-        cur.execute(sql_query, (embedding_str, top_k))
+        sql_query, params = model.search_query(embedding_str, top_k)
+        logger.info(f"Executing RAG retrieval (vector, {model.storage}) query with limit {top_k}")
+        cur.execute(sql_query, params)
         vector_results = cur.fetchall()
         
         # 2. Keyword Search
@@ -166,7 +182,9 @@ def answer_with_rag(question: str) -> str:
         Documento Hipotético:"""
         hypothetical_document = call_llm(hyde_prompt)
         logger.debug(f"Generated hypothetical document for HyDE: {hypothetical_document}")
-        question_embedding = generate_embedding(hypothetical_document)
+        # The question is embedded and searched with the same model, even if the active one changes meanwhile
+        embedding_model = embedding_models.active_model()
+        question_embedding = embedding_models.embed(embedding_model, [hypothetical_document])[0]
 
         # 2. Extract keywords for full-text search
         keyword_prompt = f"""Extrae las 3-5 palabras clave más importantes de la siguiente pregunta para una búsqueda en una base de datos legal. Devuelve solo las palabras clave separadas por espacios.
@@ -176,7 +194,7 @@ def answer_with_rag(question: str) -> str:
         logger.info(f"Extracted keywords for search: {keywords}")
 
         # 3. Find relevant documents using the hybrid approach
-        relevant_docs = find_relevant_documents(question_embedding, query_text=keywords)
+        relevant_docs = find_relevant_documents(question_embedding, query_text=keywords, model=embedding_model)
         if not relevant_docs:
             logger.warning("No relevant documents found for RAG.")
             return "Error: No se encontraron documentos relevantes para responder a la pregunta del usuario."
@@ -10,6 +10,10 @@ from typing import Optional # Added this import
 
 from utils import get_mongo_client
 from legal_scraper import process_single_document, delete_document_by_source
+from source_schedule import (
+    due_sources_query, next_schedule,
+    OUTCOME_CHANGED, OUTCOME_UNCHANGED, OUTCOME_FAILED,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -126,9 +130,18 @@ def calculate_hash(data: bytes) -> str:
     """Calculates the SHA256 hash of the given data."""
     return hashlib.sha256(data).hexdigest()
 
-def run_scraper():
+def _record_outcome(sources_collection, source: dict, outcome: str, fields: dict):
+    """Stores the result of a source check together with its next scheduled check."""
+    update = dict(fields)
+    update.update(next_schedule(source, outcome))
+    sources_collection.update_one({"_id": source["_id"]}, {"$set": update})
+
+def run_scraper(due_only: bool = False):
     """
     Main function to run the web scraping and processing pipeline.
+
+    Args:
+        due_only (bool): If True, only sources whose `next_check_at` has passed are processed.
     """
     logger.info("Starting web scraper run...")
     mongo_client = get_mongo_client()
@@ -137,11 +150,11 @@ def run_scraper():
     sources_collection = db[SOURCES_COLLECTION]
     
     logger.info(f"Scraping sources from database: '{db_name}'")
-    sources = list(sources_collection.find({"url": {"$ne": None}}))
-    logger.info(f"Found {len(sources)} sources to process.")
+    query = due_sources_query() if due_only else {"url": {"$ne": None}}
+    sources = list(sources_collection.find(query))
+    logger.info(f"Found {len(sources)} {'due ' if due_only else ''}sources to process.")
 
     for source in sources:
-        source_id = source["_id"]
         logger.info(f"Processing source: {source['name']} (URL: {source['url']})")
         
         try:
@@ -158,10 +171,7 @@ def run_scraper():
                 # Use specialized scraper for ordenjuridico.gob.mx
                 pdf_url = scrape_ordenjuridico_law(source['url'], source['name'])
                 if not pdf_url:
-                    sources_collection.update_one(
-                        {"_id": source_id},
-                        {"$set": {"status": "failed", "error_message": "Specialized scraper failed to find PDF link."}}
-                    )
+                    _record_outcome(sources_collection, source, OUTCOME_FAILED, {"status": "failed", "error_message": "Specialized scraper failed to find PDF link."})
                     continue
             elif scraper_type in ['generic_html', 'HTML Genérico']:
                 # Option 1: Direct PDF URL provided
@@ -182,28 +192,19 @@ def run_scraper():
                     )
             else:
                 logger.error(f"Unknown scraper_type '{scraper_type}' for source '{source['name']}'.")
-                sources_collection.update_one(
-                    {"_id": source_id},
-                    {"$set": {"status": "failed", "error_message": f"Unknown scraper type: {scraper_type}"}}
-                )
+                _record_outcome(sources_collection, source, OUTCOME_FAILED, {"status": "failed", "error_message": f"Unknown scraper type: {scraper_type}"})
                 continue
             # --- End Determine PDF URL ---
             
             if not pdf_url:
                 logger.warning(f"No PDF link found for source: {source['name']}. Check URL and matching criteria.")
-                sources_collection.update_one(
-                    {"_id": source_id},
-                    {"$set": {"status": "failed", "error_message": "No PDF link found matching criteria."}}
-                )
+                _record_outcome(sources_collection, source, OUTCOME_FAILED, {"status": "failed", "error_message": "No PDF link found matching criteria."})
                 continue
 
             # 3. Download the PDF and calculate hash
             pdf_content = download_pdf(pdf_url)
             if not pdf_content:
-                sources_collection.update_one(
-                    {"_id": source_id},
-                    {"$set": {"status": "failed", "error_message": f"Failed to download PDF from {pdf_url}."}}
-                )
+                _record_outcome(sources_collection, source, OUTCOME_FAILED, {"status": "failed", "error_message": f"Failed to download PDF from {pdf_url}."})
                 continue
             
             new_hash = calculate_hash(pdf_content)
@@ -211,10 +212,7 @@ def run_scraper():
             # 4. Check if the file has changed
             if new_hash == source.get('last_known_hash'):
                 logger.info(f"Source '{source['name']}' is already up to date. Skipping.")
-                sources_collection.update_one(
-                    {"_id": source_id},
-                    {"$set": {"status": "up_to_date", "last_checked_at": datetime.utcnow()}}
-                )
+                _record_outcome(sources_collection, source, OUTCOME_UNCHANGED, {"status": "up_to_date"})
                 continue
                 
             logger.info(f"New version of '{source['name']}' detected (hash: {new_hash[:10]}...).")
@@ -223,10 +221,7 @@ def run_scraper():
             local_filename = source.get('local_filename')
             if not local_filename:
                 logger.error(f"Source '{source['name']}' is missing 'local_filename'. Cannot process.")
-                sources_collection.update_one(
-                    {"_id": source_id},
-                    {"$set": {"status": "failed", "error_message": "Missing local_filename."}}
-                )
+                _record_outcome(sources_collection, source, OUTCOME_FAILED, {"status": "failed", "error_message": "Missing local_filename."})
                 continue
 
             # Delete old data before processing new file
@@ -244,25 +239,22 @@ def run_scraper():
             process_single_document(local_pdf_path, db_type='public', company_id=None)
 
             # 6. Update the source record in DB
-            sources_collection.update_one(
-                {"_id": source_id},
+            _record_outcome(
+                sources_collection,
+                source,
+                OUTCOME_CHANGED,
                 {
-                    "$set": {
-                        "status": "success",
-                        "last_known_hash": new_hash,
-                        "last_downloaded_at": datetime.utcnow(),
-                        "error_message": None
-                    }
+                    "status": "success",
+                    "last_known_hash": new_hash,
+                    "last_downloaded_at": datetime.utcnow(),
+                    "error_message": None
                 }
             )
             logger.info(f"Successfully updated source '{source['name']}'.")
 
         except Exception as e:
             logger.error(f"An unexpected error occurred while processing source '{source['name']}': {e}", exc_info=True)
-            sources_collection.update_one(
-                {"_id": source_id},
-                {"$set": {"status": "failed", "error_message": str(e)}}
-            )
+            _record_outcome(sources_collection, source, OUTCOME_FAILED, {"status": "failed", "error_message": str(e)})
 
     logger.info("Web scraper run finished.")
 
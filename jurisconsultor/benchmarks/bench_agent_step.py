@@ -0,0 +1,108 @@
+"""
+Benchmark: per-step overhead of the agent graph when the LLM client and the
+ToolNode are built on every step (previous manager_node/tool_node) versus built
+once at module load and shared (current graph_agent).
+
+The tools are stand-ins with the same names and signatures as graph_agent's, so
+no database, model or network is needed; only the construction and dispatch
+overhead is measured.
+
+Usage (from the jurisconsultor/ directory):
+    python benchmarks/bench_agent_step.py [--iterations N]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langchain_openai import ChatOpenAI
+from langgraph.prebuilt import ToolNode
+
+
+@tool
+def get_template_placeholders(template_name: str) -> str:
+    """Inspecciona una plantilla .docx y devuelve una lista de sus placeholders."""
+    return "[]"
+
+@tool
+def answer_legal_question_with_rag(question: str) -> str:
+    """Responde una pregunta legal con la base de conocimiento."""
+    return "respuesta"
+
+@tool
+def fill_template_and_save_document(template_name: str, project_id: str, document_name: str, context: dict) -> str:
+    """Rellena y guarda una plantilla .docx."""
+    return "{}"
+
+@tool
+def list_projects(dummy_input: str = "Este es un input dummy") -> str:
+    """Lista todos los proyectos disponibles para el usuario."""
+    return '{"projects": []}'
+
+@tool
+def create_new_project(project_name: str, project_description: str = None) -> str:
+    """Crea un nuevo proyecto."""
+    return "{}"
+
+@tool
+def list_tasks_for_project(project_id: str) -> str:
+    """Lista todas las tareas para un proyecto dado."""
+    return '{"tasks": []}'
+
+
+AGENT_TOOLS = [
+    get_template_placeholders,
+    answer_legal_question_with_rag,
+    fill_template_and_save_document,
+    list_projects,
+    create_new_project,
+    list_tasks_for_project,
+]
+
+STATE = {"messages": [AIMessage(content="", tool_calls=[{"name": "list_projects", "args": {}, "id": "call_1"}])]}
+
+
+def new_llm():
+    return ChatOpenAI(model="bench", temperature=0, openai_api_key="bench", openai_api_base="http://localhost:1/v1")
+
+
+def per_step_construction():
+    """One tool step plus one forced-final step, building the clients each time."""
+    ToolNode(AGENT_TOOLS).invoke(STATE)
+    new_llm()
+
+
+def shared(tool_executor):
+    def step():
+        tool_executor.invoke(STATE)
+    return step
+
+
+def timed(label: str, func, iterations: int) -> float:
+    func()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    per_call_ms = (time.perf_counter() - start) * 1000 / iterations
+    print(f"{label:<32} {per_call_ms:8.2f} ms/step")
+    return per_call_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-step overhead of the agent graph.")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    before = timed("build per step (before)", per_step_construction, args.iterations)
+    # Built once, as graph_agent does at import time
+    new_llm()
+    after = timed("shared at module load (after)", shared(ToolNode(AGENT_TOOLS)), args.iterations)
+    print(f"Overhead removed per step: {before - after:.2f} ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
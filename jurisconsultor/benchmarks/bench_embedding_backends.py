@@ -0,0 +1,98 @@
+"""
+Benchmark: embedding backends (torch, onnx, onnx-int8) on CPU.
+
+For each backend it reports the encoding throughput, how close its vectors are to
+the torch vectors (cosine similarity), and retrieval recall@k against the torch
+ranking: every text is used as a query over the whole corpus, and recall is the
+share of the torch top-k neighbours the backend also returns.
+
+The corpus is read from a text file (one passage per line) or from the
+`documents` table (--from-db, uses PUBLIC_POSTGRES_URI).
+
+Usage (from the jurisconsultor/ directory):
+    python benchmarks/bench_embedding_backends.py --corpus passages.txt [--model NAME] [--k 5]
+    python benchmarks/bench_embedding_backends.py --from-db --limit 2000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import numpy as np
+from embedding_backends import BACKENDS, load_model
+
+
+def read_corpus(args):
+    if args.from_db:
+        from utils import get_public_db_conn
+        conn = get_public_db_conn()
+        cur = conn.cursor()
+        cur.execute("SELECT content FROM documents ORDER BY id LIMIT %s;", (args.limit,))
+        texts = [row[0] for row in cur.fetchall()]
+        conn.close()
+        return texts
+    with open(args.corpus, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()][:args.limit]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def top_k(vectors: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k nearest neighbours (cosine) of every vector, excluding itself."""
+    unit = normalize(vectors)
+    scores = unit @ unit.T
+    np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def encode(model, texts, batch_size):
+    model.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return np.asarray(vectors, dtype=np.float32), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the embedding backends.")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"))
+    parser.add_argument("--corpus", help="Text file with one passage per line.")
+    parser.add_argument("--from-db", action="store_true", help="Read the passages from the documents table.")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Fail if a backend's mean cosine to torch is lower.")
+    args = parser.parse_args()
+    if not args.corpus and not args.from_db:
+        parser.error("Give --corpus or --from-db.")
+
+    texts = read_corpus(args)
+    print(f"{len(texts)} passages, model {args.model}, recall@{args.k} against torch\n")
+
+    reference, reference_neighbours = None, None
+    failed = False
+    print(f"{'backend':<10} {'load s':>7} {'texts/s':>9} {'cos mean':>9} {'cos min':>8} {'recall':>7}")
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        start = time.perf_counter()
+        model = load_model(args.model, backend)
+        load_seconds = time.perf_counter() - start
+        vectors, seconds = encode(model, texts, args.batch_size)
+        if reference is None:
+            reference, reference_neighbours = vectors, top_k(vectors, args.k)
+            cosine_mean = cosine_min = recall = 1.0
+        else:
+            cosines = np.sum(normalize(vectors) * normalize(reference), axis=1)
+            cosine_mean, cosine_min = float(cosines.mean()), float(cosines.min())
+            neighbours = top_k(vectors, args.k)
+            recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(reference_neighbours, neighbours)])
+            failed |= cosine_mean < args.min_cosine
+        print(f"{backend:<10} {load_seconds:7.1f} {len(texts) / seconds:9.1f} {cosine_mean:9.4f} {cosine_min:8.4f} {recall:7.3f}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
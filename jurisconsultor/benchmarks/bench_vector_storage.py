@@ -0,0 +1,179 @@
+"""
+Benchmark: storage formats of the document vectors (see app/embedding_models.py).
+
+Copies a sample of documents.embedding into temporary tables, one per format
+(vector, halfvec, binary with float re-scoring, truncate), and reports for each:
+  - recall@k against the exact float32 ranking (computed in NumPy),
+  - median and p95 query latency in PostgreSQL,
+  - table and index size.
+
+The queries are the embeddings of the questions in --questions (one per line,
+embedded with EMBEDDING_MODEL_NAME), or else --queries documents of the sample,
+which are then excluded from their own results. Truncation is only meaningful for
+Matryoshka models; it is benchmarked when --truncate-dim is given. --formats
+restricts the run, e.g. to vector on pgvector older than 0.7 (no halfvec or
+binary_quantize).
+
+Usage (from the jurisconsultor/ directory, uses PUBLIC_POSTGRES_URI):
+    python benchmarks/bench_vector_storage.py --limit 20000 --k 5 --hnsw
+    python benchmarks/bench_vector_storage.py --questions preguntas.txt --truncate-dim 256 --output report.md
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+import embedding_models
+from embedding_models import EmbeddingModel, BINARY, HALFVEC, TRUNCATE, VECTOR
+
+
+def read_sample(cur, limit):
+    cur.execute(
+        "SELECT id, embedding::vector::text FROM documents WHERE embedding IS NOT NULL ORDER BY id LIMIT %s;",
+        (limit,),
+    )
+    rows = cur.fetchall()
+    return np.array([row[0] for row in rows]), np.array([json.loads(row[1]) for row in rows], dtype=np.float32)
+
+
+def read_queries(args, ids, vectors):
+    """(query vectors, id of the document each query comes from or None)."""
+    if args.questions:
+        from utils import generate_embeddings
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+        return np.asarray(generate_embeddings(questions), dtype=np.float32), [None] * len(questions)
+    picked = np.random.default_rng(args.seed).choice(len(ids), size=min(args.queries, len(ids)), replace=False)
+    return vectors[picked], [int(ids[i]) for i in picked]
+
+
+def exact_neighbours(ids, vectors, query, exclude, k):
+    distances = np.linalg.norm(vectors - query, axis=1)
+    order = [int(ids[i]) for i in np.argsort(distances)]
+    return [i for i in order if i != exclude][:k]
+
+
+def create_table(cur, name, model, ids, vectors, hnsw):
+    stored = model.prepare(vectors)
+    cur.execute(f"CREATE TEMP TABLE {name} (id INTEGER PRIMARY KEY, embedding "
+                f"{embedding_models.column_type(model.storage, model.dimension)} NOT NULL);")
+    execute_values(
+        cur,
+        f"INSERT INTO {name} (id, embedding) VALUES %s",
+        [(int(i), list(map(float, v))) for i, v in zip(ids, stored)],
+        page_size=500,
+    )
+    if model.storage == BINARY:
+        cur.execute(embedding_models.binary_index_sql(name, model.dimension))
+    elif hnsw:
+        cur.execute(f"CREATE INDEX ON {name} USING hnsw (embedding {model.vector_type}_l2_ops);")
+    cur.execute(f"ANALYZE {name};")
+
+
+def search_sql(name, model):
+    """Same shape as EmbeddingModel.search_query, returning ids."""
+    query = f"%s::{model.vector_type}"
+    if model.storage != BINARY:
+        return f"SELECT id FROM {name} ORDER BY embedding <-> {query} LIMIT %s;"
+    bits = f"bit({model.dimension})"
+    return (
+        f"SELECT id FROM (SELECT id, embedding FROM {name} "
+        f"ORDER BY binary_quantize(embedding)::{bits} <~> binary_quantize({query})::{bits} "
+        f"LIMIT %s * {embedding_models.EMBEDDING_BINARY_CANDIDATES}) candidates "
+        f"ORDER BY embedding <-> {query} LIMIT %s;"
+    )
+
+
+def run_queries(cur, name, model, queries, sources, k):
+    sql = search_sql(name, model)
+    prepared = model.prepare(queries)
+    results, latencies = [], []
+    for query, source in zip(prepared, sources):
+        vector = str(list(map(float, query)))
+        # One more result, in case the query document is among them
+        params = (vector, k + 1) if model.storage != BINARY else (vector, k + 1, vector, k + 1)
+        start = time.perf_counter()
+        cur.execute(sql, params)
+        found = [row[0] for row in cur.fetchall()]
+        latencies.append(time.perf_counter() - start)
+        results.append([i for i in found if i != source][:k])
+    return results, latencies
+
+
+def relation_sizes(cur, name):
+    cur.execute("SELECT pg_table_size(%s::regclass), pg_indexes_size(%s::regclass);", (name, name))
+    return cur.fetchone()
+
+
+def mb(size):
+    return f"{size / 1024 / 1024:.1f}"
+
+
+def main():
+    from utils import get_public_db_conn
+
+    parser = argparse.ArgumentParser(description="Compare the vector storage formats.")
+    parser.add_argument("--limit", type=int, default=10000, help="Documents copied into the benchmark tables.")
+    parser.add_argument("--queries", type=int, default=200, help="Sampled documents used as queries.")
+    parser.add_argument("--questions", help="Text file with one question per line, used as queries instead.")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--truncate-dim", type=int, help="Also benchmark Matryoshka truncation to this size.")
+    parser.add_argument("--formats", nargs="+", choices=(VECTOR, HALFVEC, BINARY, TRUNCATE),
+                        help="Formats to benchmark (default: vector, halfvec, binary, and truncate with --truncate-dim).")
+    parser.add_argument("--hnsw", action="store_true", help="Index the vector and halfvec tables with HNSW too.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the report (Markdown) to this file.")
+    args = parser.parse_args()
+
+    conn = get_public_db_conn()
+    cur = conn.cursor()
+    ids, vectors = read_sample(cur, args.limit)
+    if not len(ids):
+        sys.exit("No embedded documents to benchmark.")
+    dimension = vectors.shape[1]
+    queries, sources = read_queries(args, ids, vectors)
+    truth = [exact_neighbours(ids, vectors, q, s, args.k) for q, s in zip(queries, sources)]
+    # Enough HNSW candidates for the coarse pass of binary storage
+    cur.execute(f"SET hnsw.ef_search = {max(40, (args.k + 1) * embedding_models.EMBEDDING_BINARY_CANDIDATES)};")
+
+    formats = [(VECTOR, dimension), (HALFVEC, dimension), (BINARY, dimension)]
+    if args.truncate_dim:
+        formats.append((TRUNCATE, args.truncate_dim))
+    if args.formats:
+        formats = [(storage, dims) for storage, dims in formats if storage in args.formats]
+
+    lines = [
+        f"{len(ids)} documents, {dimension} dimensions, {len(queries)} queries, recall@{args.k} "
+        f"against exact float32{', HNSW on vector/halfvec' if args.hnsw else ''}",
+        "",
+        "| storage | dims | recall | p50 ms | p95 ms | table MB | indexes MB |",
+        "|---|---:|---:|---:|---:|---:|---:|",
+    ]
+    print("\n".join(lines), flush=True)
+    for storage, dims in formats:
+        name = f"bench_{storage}"
+        model = EmbeddingModel(0, "benchmark", dims, name, embedding_models.ACTIVE, storage=storage)
+        create_table(cur, name, model, ids, vectors, args.hnsw)
+        results, latencies = run_queries(cur, name, model, queries, sources, args.k)
+        recall = np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth) if t])
+        table_size, index_size = relation_sizes(cur, name)
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+        lines.append(f"| {storage} | {dims} | {recall:.3f} | {p50:.2f} | {p95:.2f} | {mb(table_size)} | {mb(index_size)} |")
+        print(lines[-1], flush=True)
+
+    # The tables are temporary: nothing is left in the database
+    conn.rollback()
+    conn.close()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
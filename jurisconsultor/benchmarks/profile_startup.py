@@ -0,0 +1,79 @@
+"""
+Import-time profile of the API: runs `python -X importtime -c "import main"` in a
+fresh interpreter and reports the total import time, the slowest modules, and
+whether the heavy dependencies (the agent graph, the LLM clients, torch) are on
+the startup path. Those are expected to load later, in the warm-up thread
+(see app/startup.py).
+
+Usage (from the jurisconsultor/ directory):
+    python benchmarks/profile_startup.py [--module main] [--top 15]
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+# Modules that must not be imported by `import main`
+DEFERRED_MODULES = [
+    "graph_agent",
+    "langchain_openai",
+    "langgraph.checkpoint.mongodb",
+    "sentence_transformers",
+    "torch",
+]
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def profile(module: str):
+    """Returns {module: (self_us, cumulative_us, depth)} and the import error, if any."""
+    env = dict(os.environ)
+    env.setdefault("MONGO_URI", "mongodb://localhost:27017/")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, env=env, capture_output=True, text=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    error = result.stderr.strip().splitlines()[-1] if result.returncode else None
+    return timings, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the import time of the API.")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings, error = profile(args.module)
+    if error:
+        print(f"import {args.module} failed: {error}")
+        sys.exit(1)
+
+    total_ms = timings[args.module][1] / 1000
+    print(f"import {args.module}: {total_ms:.0f} ms")
+    print(f"\nSlowest top-level imports (cumulative):")
+    top_level = sorted(((cum, name) for name, (_, cum, depth) in timings.items() if depth == 1), reverse=True)
+    for cumulative_us, name in top_level[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    print(f"\nDeferred to the warm-up thread:")
+    on_path = False
+    for name in DEFERRED_MODULES:
+        if name in timings:
+            on_path = True
+            print(f"  {name:<32} imported at startup ({timings[name][1] / 1000:.0f} ms)")
+        else:
+            print(f"  {name:<32} not imported")
+    sys.exit(1 if on_path and args.module == "main" else 0)
+
+
+if __name__ == "__main__":
+    main()
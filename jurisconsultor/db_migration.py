@@ -1,18 +1,32 @@
 import os
+import sys
 import argparse
 import psycopg2
 from dotenv import load_dotenv
 
-def main(db_type: str, vector_size: int):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+import embedding_models
+
+def main(db_type: str, vector_size: int, storage: str = "vector", truncate_dim: int = None):
     """
     Main function to run the database migration on the specified database.
     
     Args:
         db_type (str): The type of database to migrate ('public' or 'private').
         vector_size (int): The dimension of the embedding vectors.
+        storage (str): How the vectors are stored: 'vector' (float32), 'halfvec' (float16),
+            'binary' (float32 with a binary-quantized index) or 'truncate' (Matryoshka).
+        truncate_dim (int): The dimensions kept with 'truncate' storage.
     """
     load_dotenv()
 
+    stored_size = vector_size
+    if storage == "truncate":
+        if not truncate_dim or truncate_dim >= vector_size:
+            raise ValueError("--storage truncate needs a --truncate-dim smaller than --vector-size.")
+        stored_size = truncate_dim
+
     if db_type == 'public':
         postgres_uri = os.getenv("PUBLIC_POSTGRES_URI")
     elif db_type == 'private':
@@ -32,7 +46,15 @@ def main(db_type: str, vector_size: int):
         cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
         print(f"Vector extension enabled for {db_type} database.")
 
-        # Drop existing tables for a clean slate
+        # Drop existing tables for a clean slate. To change the embedding model of an
+        # existing corpus without re-ingesting it, use app/embedding_models.py instead.
+        cur.execute("SELECT to_regclass('embedding_models');")
+        if cur.fetchone()[0]:
+            # The model registry and the per-model vector tables describe the dropped documents
+            cur.execute("SELECT table_name FROM embedding_models WHERE table_name IS NOT NULL;")
+            for (table_name,) in cur.fetchall():
+                cur.execute(f"DROP TABLE IF EXISTS {table_name};")
+            cur.execute("DROP TABLE embedding_models;")
         cur.execute("DROP TABLE IF EXISTS documents CASCADE;")
         cur.execute("DROP TABLE IF EXISTS document_ownership CASCADE;")
         print("Dropped existing tables (documents, document_ownership).")
@@ -42,11 +64,19 @@ def main(db_type: str, vector_size: int):
             CREATE TABLE documents (
                 id SERIAL PRIMARY KEY,
                 content TEXT NOT NULL,
-                embedding VECTOR({vector_size}),
+                embedding {embedding_models.column_type(storage, stored_size)},
                 source VARCHAR(255)
             );
         """)
-        print(f"Documents table created successfully with vector size {vector_size} for {db_type} database.")
+        if storage == "binary":
+            cur.execute(embedding_models.binary_index_sql("documents", stored_size))
+        print(f"Documents table created successfully with vector size {stored_size} ({storage}) for {db_type} database.")
+
+        # Record the model and storage of documents.embedding, which retrieval reads
+        cur.execute(embedding_models.REGISTRY_DDL)
+        embedding_models.register_legacy_model(
+            cur, os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"), stored_size, storage
+        )
 
         # Create the document_ownership table
         cur.execute("""
@@ -67,10 +97,16 @@ def main(db_type: str, vector_size: int):
         print(f"Error connecting to PostgreSQL: {e}")
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Run database migrations.")
+    parser = argparse.ArgumentParser(
+        description="Run database migrations. This drops the documents; to switch embedding models "
+                    "without re-ingesting, use app/embedding_models.py."
+    )
     parser.add_argument("db_type", type=str, choices=['public', 'private'], help="The type of database to migrate ('public' or 'private').")
     parser.add_argument("--vector-size", type=int, default=384, help="The dimension of the embedding vectors.")
+    parser.add_argument("--storage", choices=embedding_models.STORAGES, default="vector",
+                        help="Storage format of the vectors (see benchmarks/bench_vector_storage.py).")
+    parser.add_argument("--truncate-dim", type=int, help="Dimensions kept with --storage truncate (Matryoshka models only).")
     
     args = parser.parse_args()
     
-    main(args.db_type, args.vector_size)
\ No newline at end of file
+    main(args.db_type, args.vector_size, args.storage, args.truncate_dim)
\ No newline at end of file
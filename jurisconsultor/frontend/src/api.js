@@ -69,4 +69,19 @@ export const createUser = async (email, password, fullName, role) => {
     }
 };
 
+// List endpoints return one page at a time (keyset pagination). Follows the
+// X-Next-Cursor header until the last page and returns every item, in the same
+// shape as an axios response ({ data }).
+export const getAllPages = async (url, config = {}) => {
+    const items = [];
+    let after;
+    do {
+        const params = { ...config.params, ...(after ? { after } : {}) };
+        const response = await apiClient.get(url, { ...config, params });
+        items.push(...response.data);
+        after = response.headers['x-next-cursor'];
+    } while (after);
+    return { data: items };
+};
+
 export default apiClient;
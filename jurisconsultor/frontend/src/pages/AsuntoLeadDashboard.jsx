@@ -6,7 +6,7 @@ import {
     Tabs, Tab, Card, CardContent
 } from '@mui/material';
 import { Add as AddIcon, PersonAdd as PersonAddIcon, PersonRemove as PersonRemoveIcon } from '@mui/icons-material';
-import apiClient from '../api';
+import apiClient, { getAllPages } from '../api';
 import logger from '../logger';
 
 // Helper component for TabPanel
@@ -57,7 +57,7 @@ function AsuntoLeadDashboard() {
   const fetchProjects = useCallback(async () => {
     setLoading(true);
     try {
-      const response = await apiClient.get('/projects/', { params: { include_archived: false } }); // Only show active projects for lead
+      const response = await getAllPages('/projects/', { params: { include_archived: false } }); // Only show active projects for lead
       // Filter projects where current user is owner or member
       const leadProjects = response.data.filter(p => p.owner_email === currentUser?.email || p.members.includes(currentUser?.email));
       setProjects(leadProjects);
@@ -85,7 +85,7 @@ function AsuntoLeadDashboard() {
     setLoading(true);
     setTasks([]);
     try {
-      const response = await apiClient.get(`/tasks/project/${projectId}`);
+      const response = await getAllPages(`/tasks/project/${projectId}`);
       setTasks(response.data);
     } catch (err) {
       logger.error(`Error fetching tasks for project ${projectId}:`, err);
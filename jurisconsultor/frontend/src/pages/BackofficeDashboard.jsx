@@ -6,7 +6,7 @@ import {
 } from '@mui/material';
 import { Delete as DeleteIcon, Edit as EditIcon, Refresh as RefreshIcon, DragHandle as DragHandleIcon } from '@mui/icons-material';
 import { useNavigate } from 'react-router-dom';
-import apiClient from '../api';
+import apiClient, { getAllPages } from '../api';
 import logger from '../logger';
 import { useAuth } from '../AuthContext';
 
@@ -633,10 +633,10 @@ function BackofficeDashboard() {
         setError('');
         try {
             const [usersRes, companiesRes, projectsRes, documentsRes] = await Promise.all([
-                apiClient.get('/superadmin/users'),
+                getAllPages('/superadmin/users'),
                 apiClient.get('/superadmin/companies'),
-                apiClient.get('/projects/?include_archived=true'),
-                apiClient.get('/documents/?include_archived=true'),
+                getAllPages('/projects/', { params: { include_archived: true } }),
+                getAllPages('/documents/', { params: { include_archived: true } }),
             ]);
             
             const mapId = (item) => ({ ...item, id: item._id });
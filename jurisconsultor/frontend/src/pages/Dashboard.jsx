@@ -6,7 +6,7 @@ import {
     Tabs, Tab, Card, CardContent, Switch, FormControlLabel
 } from '@mui/material';
 import { Add as AddIcon, Send as SendIcon, Delete as DeleteIcon, Archive as ArchiveIcon, Unarchive as UnarchiveIcon, FolderOpen as FolderOpenIcon } from '@mui/icons-material';
-import apiClient from '../api';
+import apiClient, { getAllPages } from '../api';
 import logger from '../logger';
 
 // --- DIALOG COMPONENTS ---
@@ -184,7 +184,7 @@ function Dashboard() {
 
   // --- Data Fetching ---
   const fetchCurrentUser = useCallback(async () => { try { const res = await apiClient.get('/users/me'); setCurrentUser(res.data); } catch { setError('Error al cargar usuario.'); } }, []);
-  const fetchProjects = useCallback(async () => { setLoading(true); try { const res = await apiClient.get('/projects/', { params: { include_archived: includeArchivedProjects } }); setProjects(res.data); } catch { setError('Error al cargar proyectos.'); } finally { setLoading(false); } }, [includeArchivedProjects]);
+  const fetchProjects = useCallback(async () => { setLoading(true); try { const res = await getAllPages('/projects/', { params: { include_archived: includeArchivedProjects } }); setProjects(res.data); } catch { setError('Error al cargar proyectos.'); } finally { setLoading(false); } }, [includeArchivedProjects]);
   
   const fetchTasks = useCallback(async (projectId) => {
     if (!projectId) {
@@ -193,7 +193,7 @@ function Dashboard() {
     }
     setLoading(true);
     try {
-      const res = await apiClient.get(`/tasks/project/${projectId}`);
+      const res = await getAllPages(`/tasks/project/${projectId}`);
       setTasks(res.data);
     } catch (err) {
       logger.error("Error fetching tasks:", err);
@@ -207,7 +207,7 @@ function Dashboard() {
   const fetchGeneratedDocuments = useCallback(async () => { 
     setLoading(true); 
     try { 
-      const res = await apiClient.get('/documents/', { params: { include_archived: showArchivedDocuments } }); 
+      const res = await getAllPages('/documents/', { params: { include_archived: showArchivedDocuments } }); 
       setGeneratedDocuments(res.data); 
     } catch { 
       setError('Error al cargar documentos generados.'); 
@@ -5,7 +5,7 @@ import {
     TextField, Stack, FormControl, InputLabel, Select, MenuItem
 } from '@mui/material';
 import { UploadFile as UploadFileIcon, ExpandMore as ExpandMoreIcon, Edit as EditIcon, Delete as DeleteIcon } from '@mui/icons-material';
-import apiClient from '../api';
+import apiClient, { getAllPages } from '../api';
 import logger from '../logger';
 
 // --- CSV Uploader Component ---
@@ -101,7 +101,7 @@ function SourceList() {
     const fetchSources = async () => {
         setLoading(true);
         try {
-            const response = await apiClient.get('/sources');
+            const response = await getAllPages('/sources');
             setSources(response.data.map(s => ({ ...s, id: s._id }))); // Map _id to id
         } catch (err) {
             setError('Error al cargar las fuentes.');
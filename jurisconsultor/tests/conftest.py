@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The application modules import each other as top-level modules (the container
+# runs them from inside `app/`), so make them importable the same way in tests.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+# db_manager requires MONGO_URI at import time; MongoClient connects lazily, so a
+# local default lets modules that depend on it be imported without a server.
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/")
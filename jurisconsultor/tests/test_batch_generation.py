@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+
+import batch_generation
+
+BATCH_ID = ObjectId()
+PROJECT_ID = ObjectId()
+
+
+@pytest.fixture
+def db(mocker):
+    db = MagicMock()
+    batches = db[batch_generation.BATCHES_COLLECTION]
+    batches.find_one_and_update.return_value = {
+        "_id": BATCH_ID, "template_name": "demanda.docx", "project_id": PROJECT_ID, "owner_email": "a@x.com",
+    }
+    executor = ThreadPoolExecutor(max_workers=2)
+    mocker.patch("batch_generation.get_executor", return_value=executor)
+    mocker.patch("batch_generation._discard_partial_results")
+    mocker.patch("batch_generation._write_zip", return_value="/tmp/batch.zip")
+    yield db
+    executor.shutdown()
+
+
+def final_update(db):
+    return db[batch_generation.BATCHES_COLLECTION].update_one.call_args_list[-1].args[1]
+
+
+def test_names_use_context_fields_and_stay_unique():
+    assert batch_generation.document_name_for("Demanda {nombre}", {"nombre": "Ana"}, 0) == "Demanda Ana_001"
+    assert batch_generation.document_name_for("Demanda {falta}", {}, 9) == "Demanda {falta}_010"
+    # Field access and indexing fall back to the literal name instead of raising
+    assert batch_generation.document_name_for("{a.x}", {}, 0) == "{a.x}_001"
+    assert batch_generation.document_name_for("{a[k]}", {"a": "s"}, 0) == "{a[k]}_001"
+
+
+@pytest.mark.parametrize("name", ["{a.x}", "{a[k]}", "{0}", "{}"])
+def test_unsupported_name_fields_are_rejected(name):
+    with pytest.raises(ValueError, match="Unsupported field"):
+        batch_generation.validate_document_name(name)
+
+
+def test_progress_is_tracked_and_failed_documents_recorded(db, mocker):
+    def render(template_name, document_name, context):
+        if context.get("fail"):
+            raise RuntimeError("missing placeholder")
+        return f"/tmp/{document_name}.docx"
+    mocker.patch("batch_generation.render_document", side_effect=render)
+    records = []
+    db.generated_documents.insert_many.side_effect = lambda documents, ordered: records.extend(documents)
+
+    batch_generation.run_batch(db, BATCH_ID, "Doc {n}", [{"n": "a"}, {"n": "b", "fail": True}, {"n": "c"}])
+
+    updates = [c.args[1] for c in db[batch_generation.BATCHES_COLLECTION].update_one.call_args_list]
+    assert sum(u.get("$inc", {}).get("completed", 0) for u in updates) == 2
+    assert [u["$push"]["errors"] for u in updates if "failed" in u.get("$inc", {})] == [
+        {"index": 1, "error": "missing placeholder"},
+    ]
+    assert sorted(r["file_name"] for r in records) == ["Doc a_001", "Doc c_003"]
+    assert all(r["batch_id"] == BATCH_ID and r["project_id"] == PROJECT_ID for r in records)
+    assert final_update(db)["$set"]["status"] == "completed"
+
+
+def test_a_batch_where_every_document_fails_is_failed(db, mocker):
+    mocker.patch("batch_generation.render_document", side_effect=RuntimeError("boom"))
+
+    batch_generation.run_batch(db, BATCH_ID, "Doc", [{}, {}])
+
+    assert final_update(db)["$set"]["status"] == "failed"
+    db.generated_documents.insert_many.assert_not_called()
+
+
+def test_an_aborted_batch_is_marked_failed_instead_of_staying_running(db, mocker):
+    render = mocker.patch("batch_generation.render_document")
+    mocker.patch("batch_generation.document_name_for", side_effect=TypeError("bad name"))
+
+    batch_generation.run_batch(db, BATCH_ID, "{a[k]}", [{"a": "s"}])
+
+    update = final_update(db)
+    assert update["$set"]["status"] == "failed"
+    assert update["$push"]["errors"] == {"index": None, "error": "bad name"}
+    # Nothing was submitted before the names were computed
+    render.assert_not_called()
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from langgraph.checkpoint.base.id import uuid6
+
+from app import checkpoint_retention
+
+
+def make_memory_db(checkpoints, writes):
+    saver_db = MagicMock()
+    saver_db.__getitem__.side_effect = {"checkpoints": checkpoints, "checkpoint_writes": writes}.__getitem__
+    memory_db = MagicMock()
+    memory_db.__getitem__.side_effect = {"checkpointing_db": saver_db}.__getitem__
+    return memory_db
+
+
+def make_collection(size=100, deleted=3):
+    collection = MagicMock()
+    collection.aggregate.return_value = [{"_id": None, "bytes": size}]
+    collection.delete_many.return_value.deleted_count = deleted
+    return collection
+
+
+def test_checkpoint_ids_compare_by_creation_time():
+    checkpoint_id = str(uuid6(clock_seq=-2))
+    created = checkpoint_retention.checkpoint_time(checkpoint_id)
+
+    assert abs(created - datetime.now(timezone.utc)) < timedelta(seconds=5)
+    assert checkpoint_retention.checkpoint_id_at(created - timedelta(seconds=1)) < checkpoint_id
+    assert checkpoint_retention.checkpoint_id_at(created + timedelta(seconds=1)) > checkpoint_id
+
+
+def test_compaction_trims_threads_to_the_newest_checkpoints():
+    checkpoints, writes = make_collection(size=1000, deleted=30), make_collection(size=500, deleted=60)
+    checkpoints.aggregate.side_effect = [
+        [{"_id": {"thread_id": "ana@example.com", "checkpoint_ns": ""}, "count": 50}],
+        [{"_id": None, "bytes": 1000}],
+    ]
+    checkpoints.find.return_value.sort.return_value.skip.return_value.limit.return_value = iter([{"checkpoint_id": "c-20"}])
+
+    totals = checkpoint_retention.compact_checkpoints(make_memory_db(checkpoints, writes), keep=20, ttl_days=0)
+
+    checkpoints.find.return_value.sort.return_value.skip.assert_called_once_with(19)
+    expected = {"thread_id": "ana@example.com", "checkpoint_ns": "", "checkpoint_id": {"$lt": "c-20"}}
+    checkpoints.delete_many.assert_called_once_with(expected)
+    writes.delete_many.assert_called_once_with(expected)
+    assert totals["trimmed_threads"] == 1
+    assert totals["checkpoints"]["documents"] == 30
+    assert totals["writes"]["documents"] == 60
+    assert totals["reclaimed_bytes"] == 1500
+
+
+def test_compaction_deletes_idle_threads_and_dry_run_deletes_nothing():
+    checkpoints, writes = make_collection(), make_collection()
+    checkpoints.aggregate.side_effect = [
+        [{"_id": "old@example.com", "latest": "x"}],
+        [{"_id": None, "bytes": 100}],
+        [],
+    ]
+    checkpoints.count_documents.return_value = 7
+    now = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+    totals = checkpoint_retention.compact_checkpoints(make_memory_db(checkpoints, writes), keep=20, ttl_days=30, now=now, dry_run=True)
+
+    cutoff = checkpoints.aggregate.call_args_list[0].args[0][1]["$match"]["latest"]["$lt"]
+    assert cutoff == checkpoint_retention.checkpoint_id_at(now - timedelta(days=30))
+    checkpoints.count_documents.assert_called_once_with({"thread_id": "old@example.com"})
+    checkpoints.delete_many.assert_not_called()
+    writes.delete_many.assert_not_called()
+    assert totals["expired_threads"] == 1
+    assert totals["checkpoints"]["documents"] == 7
+
+
+def test_compaction_keeps_at_least_one_checkpoint():
+    with pytest.raises(ValueError):
+        checkpoint_retention.compact_checkpoints(make_memory_db(make_collection(), make_collection()), keep=0)
@@ -0,0 +1,73 @@
+from unittest.mock import MagicMock
+
+from pymongo.errors import OperationFailure
+
+from app import db_indexes
+
+
+def make_db(existing):
+    """Builds a mock database whose collections report the given {collection: {name: key or
+    index_information() entry}} indexes."""
+    db = MagicMock()
+    collections = {}
+
+    def get_collection(name):
+        if name not in collections:
+            collection = MagicMock()
+            info = {"_id_": {"key": [("_id", 1)]}}
+            info.update({index_name: index if isinstance(index, dict) else {"key": index}
+                         for index_name, index in existing.get(name, {}).items()})
+            collection.index_information.return_value = info
+            collections[name] = collection
+        return collections[name]
+
+    db.__getitem__.side_effect = get_collection
+    return db
+
+
+def test_missing_indexes_are_matched_by_key_and_options_not_name():
+    db = make_db({
+        "users": {"legacy_email": {"key": [("email", 1.0)], "unique": True}, "company_id": [("company_id", 1)]},
+        "generated_documents": {"batch": {"key": [("batch_id", 1)], "sparse": True}},
+    })
+
+    missing = {f"{collection}.{model.document['name']}" for collection, model in db_indexes.missing_indexes(db)}
+
+    assert "users.email_unique" not in missing
+    assert "users.company_id" not in missing
+    assert "generated_documents.batch_id" not in missing
+    assert "tasks.project_id" in missing
+    assert "generated_documents.project_id_is_archived_id" in missing
+
+
+def test_same_key_with_other_options_is_a_conflict_not_a_match(caplog):
+    db = make_db({
+        "users": {"legacy_email": [("email", 1)]},
+        "tasks": {"project_id_partial": {"key": [("project_id", 1)], "partialFilterExpression": {"done": False}}},
+    })
+
+    missing, conflicts = db_indexes.compare_indexes(db)
+
+    assert {(c, m.document["name"], existing) for c, m, existing in conflicts} == {
+        ("users", "email_unique", "legacy_email"),
+        ("tasks", "project_id", "project_id_partial"),
+    }
+    assert not {("users", "email_unique"), ("tasks", "project_id")} & {(c, m.document["name"]) for c, m in missing}
+
+    created = db_indexes.ensure_indexes(db)
+
+    assert "users.email_unique" not in created
+    assert [c.args[0][0].document["name"] for c in db["users"].create_indexes.call_args_list] == ["company_id"]
+    assert "users.email_unique requires {'unique': True" in caplog.text
+    assert db_indexes.index_report(db)["conflicts"]
+
+
+def test_ensure_indexes_skips_indexes_that_fail():
+    db = make_db({})
+    db["users"].create_indexes.side_effect = OperationFailure("E11000 duplicate key error")
+
+    created = db_indexes.ensure_indexes(db)
+
+    assert "users.email_unique" not in created
+    assert "tasks.project_id" in created
+    db["tasks"].create_indexes.assert_called_once()
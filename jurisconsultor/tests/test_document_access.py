@@ -0,0 +1,152 @@
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from models import UserInDB
+from routers import documents
+
+COMPANY = ObjectId()
+OTHER_COMPANY = ObjectId()
+PROJECT_ID = ObjectId()
+
+
+def user(role, email="user@x.com", company_id=COMPANY):
+    return UserInDB(_id=ObjectId(), email=email, hashed_password="x", role=role, company_id=company_id)
+
+
+@pytest.fixture
+def db(mocker):
+    mocker.patch("routers.documents.company_id_filter", side_effect=lambda db, company_id: company_id)
+    db = MagicMock()
+    projects = {PROJECT_ID: {"_id": PROJECT_ID, "company_id": COMPANY}}
+    db.projects.count_documents.side_effect = lambda query, limit: int(
+        query["_id"] in projects and projects[query["_id"]]["company_id"] == query["company_id"])
+    return db
+
+
+@pytest.fixture
+def batch_db(db):
+    db[documents.batch_generation.BATCHES_COLLECTION].find_one.return_value = {
+        "_id": ObjectId(), "owner_email": "owner@x.com", "project_id": PROJECT_ID,
+    }
+    return db
+
+
+@pytest.mark.parametrize("current_user", [
+    user("member", email="owner@x.com"),
+    user("admin"),
+    user("superadmin", company_id=None),
+])
+def test_batch_is_readable_by_its_owner_and_the_project_company_admins(batch_db, current_user):
+    assert documents._get_batch_for_user(ObjectId(), batch_db, current_user)["owner_email"] == "owner@x.com"
+
+
+@pytest.mark.parametrize("current_user", [user("member"), user("lead"), user("admin", company_id=OTHER_COMPANY)])
+def test_batch_is_hidden_from_other_users_and_other_companies_admins(batch_db, current_user):
+    with pytest.raises(HTTPException) as exc_info:
+        documents._get_batch_for_user(ObjectId(), batch_db, current_user)
+    assert exc_info.value.status_code == 403
+
+
+@pytest.mark.parametrize("payload", [{"project_id": str(PROJECT_ID)}, {"batch_id": str(ObjectId())}])
+def test_jobs_are_readable_by_admins_of_the_project_company_only(db, mocker, payload):
+    job = {"_id": ObjectId(), "type": "generate_document", "payload": payload, "owner_email": "owner@x.com",
+           "status": "queued", "attempts": 0, "max_attempts": 3, "created_at": documents.datetime.utcnow()}
+    mocker.patch("routers.documents.job_queue.get_job", return_value=job)
+    db[documents.batch_generation.BATCHES_COLLECTION].find_one.return_value = {"project_id": PROJECT_ID}
+
+    assert documents.get_generation_job(job["_id"], db, user("admin")).id == job["_id"]
+    with pytest.raises(HTTPException) as exc_info:
+        documents.get_generation_job(job["_id"], db, user("admin", company_id=OTHER_COMPANY))
+    assert exc_info.value.status_code == 403
+
+
+@pytest.fixture
+def document_db(db):
+    """Evaluates the authorization aggregation over in-memory documents and projects."""
+    projects = {PROJECT_ID: {"_id": PROJECT_ID, "company_id": COMPANY, "members": ["lead@x.com"]}}
+    documents_by_id = {
+        "in_project": {"_id": "in_project", "owner_email": "owner@x.com", "project_id": PROJECT_ID},
+        "no_project": {"_id": "no_project", "owner_email": "owner@x.com", "project_id": ObjectId()},
+    }
+
+    def aggregate(pipeline):
+        document = documents_by_id.get(pipeline[0]["$match"]["_id"])
+        if document is None:
+            return iter([])
+        document = dict(document)
+        for stage in pipeline[2:]:
+            lookup = stage["$lookup"]
+            match = {k: v for k, v in lookup["pipeline"][0]["$match"].items() if k != "$expr"}
+            project = projects.get(document["project_id"])
+            matched = project is not None and all(
+                value in project[field] if field == "members" else project[field] == value
+                for field, value in match.items()
+            )
+            document[lookup["as"]] = [{"_id": project["_id"]}] if matched else []
+        return iter([document])
+
+    db.generated_documents.aggregate.side_effect = aggregate
+    return db
+
+
+@pytest.mark.parametrize("current_user, document_id", [
+    (user("member", email="owner@x.com"), "in_project"),
+    (user("member", email="owner@x.com"), "no_project"),
+    (user("lead", email="lead@x.com"), "in_project"),
+    (user("admin"), "in_project"),
+    (user("superadmin", company_id=None), "in_project"),
+])
+def test_document_access_is_granted(document_db, current_user, document_id):
+    document = documents._authorize_document(document_id, document_db, current_user, "delete")
+
+    assert document["_id"] == document_id
+    assert "authorizing_projects" not in document
+
+
+@pytest.mark.parametrize("current_user, document_id", [
+    (user("member"), "in_project"),
+    (user("lead", email="other@x.com"), "in_project"),
+    (user("admin", company_id=OTHER_COMPANY), "in_project"),
+    # Without a project there is no company to scope the admin to
+    (user("admin"), "no_project"),
+    (user("lead", email="lead@x.com"), "no_project"),
+])
+def test_document_access_is_denied(document_db, current_user, document_id):
+    with pytest.raises(HTTPException) as exc_info:
+        documents._authorize_document(document_id, document_db, current_user, "delete")
+    assert exc_info.value.status_code == 403
+
+
+def test_download_is_not_granted_to_superadmins_and_missing_documents_are_404(document_db):
+    with pytest.raises(HTTPException) as exc_info:
+        documents._authorize_document("in_project", document_db, user("superadmin", company_id=None), "download",
+                                      allowed_roles=("admin",))
+    assert exc_info.value.status_code == 403
+
+    with pytest.raises(HTTPException) as exc_info:
+        documents._authorize_document("missing", document_db, user("admin"), "delete")
+    assert exc_info.value.status_code == 404
+
+
+def test_template_placeholders_route(mocker):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    templates = {"demanda.docx": ["nombre", "fecha"], "vacia.docx": []}
+
+    def get(name):
+        if name not in templates:
+            raise FileNotFoundError(name)
+        return MagicMock(placeholders=templates[name])
+
+    mocker.patch("routers.documents.template_cache").get.side_effect = get
+    app = FastAPI()
+    app.include_router(documents.router)
+    client = TestClient(app)
+
+    assert client.get("/documents/templates/demanda.docx/placeholders").json() == ["nombre", "fecha"]
+    assert client.get("/documents/templates/vacia.docx/placeholders").status_code == 404
+    assert client.get("/documents/templates/falta.docx/placeholders").status_code == 404
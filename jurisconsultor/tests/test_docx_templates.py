@@ -0,0 +1,114 @@
+import os
+
+import docx
+import pytest
+
+from app import docx_templates
+from app.docx_templates import TemplateCache
+
+
+def _write_template(path, *paragraphs):
+    document = docx.Document()
+    for text in paragraphs:
+        document.add_paragraph(text)
+    document.save(path)
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    _write_template(tmp_path / "demanda.docx", "Actor: {{nombre_demandante}}", "Demandado: {{ nombre_demandado }}")
+    return tmp_path
+
+
+def test_parses_placeholders_and_locations(template_dir):
+    cache = TemplateCache(str(template_dir))
+
+    metadata = cache.get("demanda.docx")
+
+    assert metadata.placeholders == ["nombre_demandante", "nombre_demandado"]
+    assert metadata.locations["nombre_demandado"] == ["paragraph:1"]
+
+
+def test_reuses_parsed_template_until_file_changes(template_dir, mocker):
+    cache = TemplateCache(str(template_dir))
+    parse_spy = mocker.spy(docx_templates, "parse_template")
+
+    first = cache.get("demanda.docx")
+    assert cache.get("demanda.docx") is first
+    assert parse_spy.call_count == 1
+
+    template_path = template_dir / "demanda.docx"
+    _write_template(template_path, "Nuevo campo: {{fecha}}")
+    # Make sure the signature changes even on filesystems with coarse timestamps
+    os.utime(template_path, ns=(first.signature[0] + 1_000_000_000, first.signature[0] + 1_000_000_000))
+
+    assert cache.get("demanda.docx").placeholders == ["fecha"]
+    assert parse_spy.call_count == 2
+
+
+def test_missing_template_raises_and_is_evicted(template_dir):
+    cache = TemplateCache(str(template_dir))
+    cache.get("demanda.docx")
+
+    os.remove(template_dir / "demanda.docx")
+
+    with pytest.raises(FileNotFoundError):
+        cache.get("demanda.docx")
+
+
+def test_listing_tracks_directory_changes(template_dir):
+    cache = TemplateCache(str(template_dir))
+    assert cache.list_templates() == ["demanda.docx"]
+
+    _write_template(template_dir / "amparo.docx", "{{quejoso}}")
+    (template_dir / "notas.txt").write_text("no es plantilla")
+    stat = os.stat(template_dir)
+    os.utime(template_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert cache.list_templates() == ["amparo.docx", "demanda.docx"]
+
+
+def test_listing_missing_directory_is_empty(tmp_path):
+    assert TemplateCache(str(tmp_path / "no_existe")).list_templates() == []
+
+
+def _build_formatted_template(path):
+    document = docx.Document()
+    paragraph = document.add_paragraph()
+    paragraph.add_run("Actor: ")
+    bold = paragraph.add_run("{{nombre_")
+    bold.bold = True
+    paragraph.add_run("demandante}}, domicilio {{domicilio}} y {{sin_valor}}.")
+    table = document.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "Monto: {{ monto }}"
+    table.cell(0, 1).text = "Fecha: {{fecha}}"
+    document.save(path)
+
+
+def test_render_replaces_placeholders_and_preserves_formatting(tmp_path):
+    _build_formatted_template(tmp_path / "formato.docx")
+    cache = TemplateCache(str(tmp_path))
+
+    doc = cache.render("formato.docx", {"nombre_demandante": "Ana", "domicilio": "Calle 1", "monto": 100, "fecha": "hoy"})
+
+    paragraph = doc.paragraphs[0]
+    assert paragraph.text == "Actor: Ana, domicilio Calle 1 y {{sin_valor}}."
+    # The value inherits the formatting of the run where the placeholder started
+    assert paragraph.runs[1].text == "Ana"
+    assert paragraph.runs[1].bold
+    assert not paragraph.runs[2].bold
+    assert doc.tables[0].cell(0, 0).text == "Monto: 100"
+    assert doc.tables[0].cell(0, 1).text == "Fecha: hoy"
+
+
+def test_render_compiles_once_and_does_not_mutate_template(tmp_path, mocker):
+    _build_formatted_template(tmp_path / "formato.docx")
+    cache = TemplateCache(str(tmp_path))
+    compile_spy = mocker.spy(docx_templates, "compile_template")
+
+    first = cache.render("formato.docx", {"nombre_demandante": "Ana"})
+    second = cache.render("formato.docx", {"nombre_demandante": "Luis"})
+
+    assert compile_spy.call_count == 1
+    assert first.paragraphs[0].text.startswith("Actor: Ana,")
+    assert second.paragraphs[0].text.startswith("Actor: Luis,")
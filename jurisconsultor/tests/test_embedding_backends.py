@@ -0,0 +1,90 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+import embedding_backends
+
+
+@pytest.fixture
+def sentence_transformers(mocker):
+    module = MagicMock()
+    mocker.patch.dict(sys.modules, {"sentence_transformers": module})
+    return module
+
+
+def test_torch_and_onnx_backends(sentence_transformers):
+    embedding_backends.load_model("all-MiniLM-L6-v2", "torch")
+    embedding_backends.load_model("all-MiniLM-L6-v2", "onnx")
+
+    assert sentence_transformers.SentenceTransformer.call_args_list[0].args == ("all-MiniLM-L6-v2",)
+    assert sentence_transformers.SentenceTransformer.call_args_list[1].kwargs == {"backend": "onnx"}
+
+
+def test_int8_model_is_exported_once(sentence_transformers, mocker, tmp_path):
+    mocker.patch("embedding_backends.EMBEDDING_ONNX_DIR", str(tmp_path))
+    mocker.patch("embedding_backends.EMBEDDING_QUANTIZATION", "avx2")
+    export_dir = embedding_backends.quantized_model_dir("org/legal-model")
+
+    def export(model, config, path):
+        os.makedirs(os.path.join(path, "onnx"))
+        open(os.path.join(path, "onnx", f"model_qint8_{config}.onnx"), "w").close()
+
+    sentence_transformers.export_dynamic_quantized_onnx_model.side_effect = export
+
+    embedding_backends.load_model("org/legal-model", "onnx-int8")
+    embedding_backends.load_model("org/legal-model", "onnx-int8")
+
+    assert sentence_transformers.export_dynamic_quantized_onnx_model.call_count == 1
+    sentence_transformers.SentenceTransformer.assert_called_with(
+        export_dir, backend="onnx", model_kwargs={"file_name": "onnx/model_qint8_avx2.onnx"}
+    )
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        embedding_backends.load_model("all-MiniLM-L6-v2", "tensorrt")
+
+
+PASSAGES = [
+    "El arrendatario debe pagar la renta en el domicilio del arrendador.",
+    "La demanda de amparo se presenta ante el juez de distrito competente.",
+    "El contrato de compraventa se perfecciona con el acuerdo sobre la cosa y el precio.",
+    "El trabajador tiene derecho a una indemnización por despido injustificado.",
+    "La pensión alimenticia se fija según las necesidades del acreedor.",
+    "El testamento ológrafo debe estar escrito de puño y letra del testador.",
+    "La prescripción extingue la acción por el transcurso del tiempo.",
+    "El divorcio sin causa puede solicitarlo cualquiera de los cónyuges.",
+]
+
+
+def _nearest(vectors):
+    import numpy as np
+
+    scores = vectors @ vectors.T
+    np.fill_diagonal(scores, -np.inf)
+    return scores.argmax(axis=1)
+
+
+@pytest.mark.parametrize("backend, min_cosine", [("onnx", 0.999), ("onnx-int8", 0.97)])
+def test_onnx_vectors_stay_close_to_torch(backend, min_cosine, mocker, tmp_path):
+    """Runs EMBEDDING_MODEL_NAME; skipped when the ONNX dependencies or the model are not available."""
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("onnxruntime")
+    import numpy as np
+
+    mocker.patch("embedding_backends.EMBEDDING_ONNX_DIR", str(tmp_path))
+    model_name = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+    try:
+        reference = embedding_backends.load_model(model_name, "torch")
+        model = embedding_backends.load_model(model_name, backend)
+    except OSError as e:
+        pytest.skip(f"Model {model_name} is not available: {e}")
+
+    expected = reference.encode(PASSAGES, normalize_embeddings=True)
+    vectors = model.encode(PASSAGES, normalize_embeddings=True)
+
+    assert np.sum(expected * vectors, axis=1).min() >= min_cosine
+    # Every passage keeps its nearest neighbour
+    assert (_nearest(vectors) == _nearest(expected)).all()
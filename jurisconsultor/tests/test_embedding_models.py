@@ -0,0 +1,164 @@
+import re
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+import embedding_models
+from embedding_models import EmbeddingModel
+
+LEGACY = EmbeddingModel(1, "all-MiniLM-L6-v2", 384, None, embedding_models.ACTIVE)
+NEW = EmbeddingModel(2, "intfloat/multilingual-e5-large", 1024,
+                     embedding_models.table_name_for("intfloat/multilingual-e5-large", 1024), embedding_models.BUILDING)
+
+
+def make_conn(cur):
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+    return conn
+
+
+def test_table_names_are_valid_identifiers():
+    name = embedding_models.table_name_for("Org/Some-Model.v2" + "x" * 80, 768)
+
+    assert re.fullmatch(r"[a-z0-9_]+", name)
+    assert len(name) <= 63
+    assert name != embedding_models.table_name_for("Org/Some-Model.v2" + "x" * 81, 768)
+
+
+def test_search_uses_the_model_vectors():
+    sql, params = LEGACY.search_query("[1,0]", 3)
+    assert "FROM documents d ORDER BY d.embedding <-> %s::vector" in sql
+    assert params == ("[1,0]", 3)
+    assert f"JOIN {NEW.table_name} e ON e.document_id = d.id ORDER BY e.embedding" in NEW.search_query("[1,0]", 3)[0]
+
+
+def test_halfvec_queries_are_cast_to_halfvec():
+    model = EmbeddingModel(1, "m", 384, None, embedding_models.ACTIVE, storage=embedding_models.HALFVEC)
+
+    assert "<-> %s::halfvec" in model.search_query("[1,0]", 3)[0]
+    assert embedding_models.column_type(model.storage, 384) == "HALFVEC(384)"
+
+
+def test_binary_search_rescores_the_hamming_candidates(mocker):
+    mocker.patch("embedding_models.EMBEDDING_BINARY_CANDIDATES", 10)
+    model = EmbeddingModel(1, "m", 384, None, embedding_models.ACTIVE, storage=embedding_models.BINARY)
+
+    sql, params = model.search_query("[1,0]", 3)
+
+    assert "binary_quantize(d.embedding)::bit(384) <~> binary_quantize(%s::vector)::bit(384)" in sql
+    assert sql.endswith("ORDER BY embedding <-> %s::vector LIMIT %s;")
+    assert params == ("[1,0]", 30, "[1,0]", 3)
+
+
+def test_matryoshka_storage_keeps_the_first_dimensions_normalized():
+    model = EmbeddingModel(1, "m", 2, None, embedding_models.ACTIVE, storage=embedding_models.TRUNCATE)
+
+    vectors = model.prepare([[3.0, 4.0, 12.0], [1.0, 0.0, 5.0]])
+
+    assert vectors.shape == (2, 2)
+    np.testing.assert_allclose(vectors, [[0.6, 0.8], [1.0, 0.0]])
+    assert LEGACY.prepare([[3.0, 4.0]]).tolist() == [[3.0, 4.0]]
+
+
+def test_unknown_storage_is_rejected():
+    with pytest.raises(ValueError, match="Unknown vector storage"):
+        embedding_models.column_type("int4", 384)
+
+
+def test_reembed_fills_the_missing_vectors_in_batches(mocker):
+    cur = MagicMock()
+    cur.fetchall.side_effect = [[(1, "a"), (2, "b")], [(5, "c")], []]
+    conn = make_conn(cur)
+    generate = mocker.patch("utils.generate_embeddings", side_effect=lambda texts, model: np.ones((len(texts), 2)))
+    insert = mocker.patch("embedding_models.execute_values")
+
+    assert embedding_models.reembed(conn, NEW, batch_size=2) == 3
+
+    generate.assert_any_call(["a", "b"], NEW.model_name)
+    assert insert.call_args_list[0].args[2] == [(1, [1.0, 1.0]), (2, [1.0, 1.0])]
+    # Each batch resumes after the last embedded document, and is committed on its own
+    assert [c.args[1] for c in cur.execute.call_args_list] == [(0, 2), (2, 2), (5, 2)]
+    assert conn.commit.call_count == 2
+
+
+def test_reembed_stops_after_max_batches(mocker):
+    cur = MagicMock()
+    cur.fetchall.return_value = [(1, "a")]
+    mocker.patch("utils.generate_embeddings", return_value=np.ones((1, 2)))
+    mocker.patch("embedding_models.execute_values")
+
+    assert embedding_models.reembed(make_conn(cur), NEW, max_batches=3) == 3
+
+
+def test_activation_requires_full_coverage():
+    cur = MagicMock()
+    cur.fetchone.side_effect = [(10,), (9,)]
+    conn = make_conn(cur)
+
+    with pytest.raises(embedding_models.IncompleteCoverageError, match="9 of 10"):
+        embedding_models.activate(conn, NEW)
+
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+
+
+def test_activation_retires_the_previous_model():
+    cur = MagicMock()
+    cur.fetchone.side_effect = [(10,), (10,), (2, NEW.model_name, 1024, NEW.table_name, "active", False, "vector")]
+    conn = make_conn(cur)
+    embedding_models._active_cache = (LEGACY, float("inf"))
+
+    activated = embedding_models.activate(conn, NEW)
+
+    statements = [c.args[0] for c in cur.execute.call_args_list]
+    assert statements[0].startswith("LOCK TABLE documents")
+    assert any("SET status = %s WHERE status = %s" in s for s in statements)
+    assert activated.status == embedding_models.ACTIVE
+    conn.commit.assert_called_once()
+    # The next query reads the new active model
+    assert embedding_models._active_cache[0] is None
+
+
+def test_lookups_only_read_the_registry():
+    cur = MagicMock()
+    cur.fetchone.side_effect = [(True,), (2, NEW.model_name, 1024, NEW.table_name, "active", False, "vector")]
+    cur.fetchall.return_value = [(1, LEGACY.model_name, 384, None, "retired", False, "vector")]
+    embedding_models.invalidate_active_model()
+
+    assert embedding_models.active_model(cur).model_name == NEW.model_name
+    cur.fetchone.side_effect = [(True,)]
+    embedding_models.maintained_models(cur)
+
+    statements = [c.args[0].strip() for c in cur.execute.call_args_list]
+    assert statements and all(s.startswith("SELECT") for s in statements)
+    embedding_models.invalidate_active_model()
+
+
+def test_databases_without_registry_use_documents_embedding(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+    cur = MagicMock()
+    cur.fetchone.return_value = (False,)
+
+    models = embedding_models.maintained_models(cur)
+
+    assert [(m.model_name, m.is_legacy, m.status) for m in models] == [("all-MiniLM-L6-v2", True, "active")]
+    with pytest.raises(LookupError, match="init"):
+        embedding_models.get_model(cur, "all-MiniLM-L6-v2")
+
+
+def test_registry_setup_only_alters_registries_missing_the_storage_column():
+    cur = MagicMock()
+    cur.fetchone.side_effect = [(True,), (1,)]
+
+    embedding_models.create_registry(cur)
+
+    statements = [c.args[0] for c in cur.execute.call_args_list]
+    assert not any("ALTER TABLE" in s or "CREATE" in s for s in statements)
+
+    cur.reset_mock()
+    cur.fetchone.side_effect = [(True,), None]
+    embedding_models.create_registry(cur)
+
+    assert cur.execute.call_args_list[-1].args[0].startswith("ALTER TABLE embedding_models ADD COLUMN storage")
+    assert "ALTER" not in embedding_models.REGISTRY_DDL
@@ -0,0 +1,131 @@
+import threading
+from unittest.mock import MagicMock
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import embedding_client
+import embedding_server
+from embedding_server import MicroBatcher
+
+
+def fake_encode(texts, **kwargs):
+    return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_concurrent_requests_are_batched_and_keep_their_vectors():
+    calls = []
+
+    def encode(texts):
+        calls.append(len(texts))
+        return fake_encode(texts)
+
+    batcher = MicroBatcher(encode, max_batch_size=64, max_wait_seconds=0.2)
+    start = threading.Barrier(5)
+    results = {}
+
+    def request(i):
+        start.wait()
+        results[i] = batcher.submit(["x" * i, "y" * (i + 10)]).result(timeout=5)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    batcher.start()
+    for thread in threads:
+        thread.join()
+    batcher.stop()
+
+    assert calls == [10]
+    for i in range(5):
+        assert results[i][:, 0].tolist() == [i, i + 10]
+    assert batcher.stats()["mean_batch_size"] == 10
+
+
+def test_encode_errors_reach_every_request():
+    batcher = MicroBatcher(MagicMock(side_effect=RuntimeError("out of memory")), max_wait_seconds=0)
+    batcher.start()
+    future = batcher.submit(["texto"])
+
+    try:
+        future.result(timeout=5)
+        assert False, "expected an error"
+    except RuntimeError as e:
+        assert "out of memory" in str(e)
+    finally:
+        batcher.stop()
+
+
+def test_embed_endpoint(mocker):
+    model = MagicMock()
+    model.encode.side_effect = fake_encode
+    load = mocker.patch("embedding_server.load_model", return_value=model)
+    mocker.patch("embedding_server._read_registry", return_value=("active-model", {"active-model"}))
+
+    with TestClient(embedding_server.app) as client:
+        response = client.post("/embed", json={"texts": ["abc", "de"]})
+
+    assert response.status_code == 200
+    # The registry's active model is served by default, loaded once at startup
+    assert response.json()["model"] == "active-model"
+    assert response.json()["embeddings"] == [[3.0, 1.0], [2.0, 1.0]]
+    load.assert_called_once_with("active-model")
+
+
+def expire_registry_cache():
+    embedding_server._registered = (embedding_server._registered[0], 0.0)
+
+
+def test_unregistered_models_are_rejected_and_retired_ones_unloaded_after_a_grace_period(mocker):
+    load = mocker.patch("embedding_server.load_model", return_value=MagicMock(encode=fake_encode))
+    registry = mocker.patch("embedding_server._read_registry", return_value=("a", {"a", "b"}))
+
+    with TestClient(embedding_server.app) as client:
+        assert client.post("/embed", json={"texts": ["x"], "model": "b"}).status_code == 200
+        assert client.post("/embed", json={"texts": ["x"], "model": "other"}).status_code == 404
+        assert [c.args[0] for c in load.call_args_list] == ["a", "b"]
+
+        # "b" is retired: API processes may still use it until their cache expires
+        registry.return_value = ("a", {"a"})
+        expire_registry_cache()
+        assert client.post("/embed", json={"texts": ["x"], "model": "b"}).status_code == 200
+
+        # Once the grace period is over, the next refresh unloads it
+        embedding_server._retiring["b"] = 0.0
+        expire_registry_cache()
+        assert client.post("/embed", json={"texts": ["x"], "model": "b"}).status_code == 404
+        assert set(embedding_server.batchers) == {"a"}
+
+
+def test_client_sends_long_inputs_in_chunks(mocker):
+    mocker.patch("embedding_client.EMBEDDING_SERVICE_CHUNK", 2)
+    client = embedding_client.EmbeddingServiceClient("http://embeddings:8002")
+    response = MagicMock()
+    response.json.side_effect = [{"embeddings": [[1, 0], [2, 0]]}, {"embeddings": [[3, 0]]}]
+    client.session = MagicMock()
+    client.session.post.return_value = response
+
+    vectors = client.embed(["a", "b", "c"])
+
+    assert client.session.post.call_count == 2
+    assert vectors.dtype == np.float32
+    assert vectors[:, 0].tolist() == [1, 2, 3]
+
+
+def test_models_being_built_are_read_from_the_registry_and_served(mocker):
+    import embedding_models
+    from embedding_models import EmbeddingModel
+
+    mocker.patch("embedding_server.load_model", return_value=MagicMock(encode=fake_encode))
+    mocker.patch("utils.get_public_db_conn")
+    mocker.patch("embedding_models.maintained_models", return_value=[
+        EmbeddingModel(1, "legacy", 2, None, embedding_models.ACTIVE),
+        EmbeddingModel(2, "new-model", 2, "document_embeddings_new", embedding_models.BUILDING),
+    ])
+
+    with TestClient(embedding_server.app) as client:
+        response = client.post("/embed", json={"texts": ["abc"], "model": "new-model"})
+        assert client.get("/health").json()["model"] == "legacy"
+
+    assert response.status_code == 200
+    assert response.json() == {"model": "new-model", "embeddings": [[3.0, 1.0]]}
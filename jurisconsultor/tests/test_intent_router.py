@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from app import intent_router
+from app.intent_router import IntentStats, dispatch
+
+PROJECTS = {"success": True, "projects": [
+    {"_id": "65f1c2a9e4b0a1b2c3d4e5f6", "name": "Demanda Pérez"},
+    {"_id": "65f1c2a9e4b0a1b2c3d4e5f7", "name": "Amparo López"},
+]}
+TASKS = {"success": True, "tasks": [{"title": "Redactar demanda", "status": "todo"}]}
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(mocker):
+    mocker.patch.object(intent_router, "intent_stats", IntentStats())
+
+
+@pytest.fixture
+def run_tool():
+    calls = []
+
+    def run(name, *args):
+        calls.append((name, *args))
+        return json.dumps(PROJECTS if name == "list_projects" else TASKS)
+
+    run.calls = calls
+    return run
+
+
+@pytest.mark.parametrize("message", ["Lista mis proyectos", "¿Muéstrame mis proyectos, por favor?", "qué proyectos tengo"])
+def test_list_projects_commands_skip_the_llm(message, run_tool):
+    answer = dispatch(message, run_tool)
+
+    assert answer.startswith("FINAL_ANSWER: Tienes 2 proyecto(s)")
+    assert "Demanda Pérez" in answer
+    assert run_tool.calls == [("list_projects",)]
+
+
+def test_tasks_by_project_name_are_resolved_through_the_listing(run_tool):
+    answer = dispatch("Muéstrame las tareas del proyecto demanda perez", run_tool)
+
+    assert run_tool.calls == [("list_projects",), ("list_tasks_for_project", "65f1c2a9e4b0a1b2c3d4e5f6")]
+    assert "Redactar demanda [todo]" in answer
+
+
+def test_unknown_project_and_open_questions_go_to_the_llm(run_tool):
+    assert dispatch("muestra las tareas del proyecto inexistente", run_tool) is None
+    assert dispatch("¿Qué dice el artículo 14 constitucional sobre mis proyectos?", run_tool) is None
+
+    stats = intent_router.intent_stats.snapshot()
+    assert stats["messages"] == 2
+    assert stats["fast_path_answers"] == 0
+    assert stats["unresolved"] == {"list_tasks_for_project": 1}
@@ -0,0 +1,79 @@
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+
+from app import job_queue
+
+
+@pytest.fixture
+def db():
+    return MagicMock()
+
+
+@pytest.fixture(autouse=True)
+def handlers(mocker):
+    mocker.patch.dict(job_queue._handlers, clear=True)
+
+
+def _job(job_type, attempts=1, max_attempts=3):
+    return {"_id": ObjectId(), "type": job_type, "payload": {"x": 1}, "attempts": attempts, "max_attempts": max_attempts}
+
+
+def _last_set(db):
+    return db[job_queue.JOBS_COLLECTION].update_one.call_args[0][1]["$set"]
+
+
+def test_enqueue_rejects_unknown_job_type(db):
+    with pytest.raises(ValueError):
+        job_queue.enqueue(db, "unknown", {})
+
+
+def test_successful_job_stores_result(db):
+    job_queue.register_handler("ok")(lambda db, payload: {"echo": payload["x"]})
+
+    job_queue.run_job(db, _job("ok"), "worker-1")
+
+    update = _last_set(db)
+    assert update["status"] == "succeeded"
+    assert update["result"] == {"echo": 1}
+
+
+def test_failed_job_is_requeued_until_max_attempts(db):
+    def failing(db, payload):
+        raise RuntimeError("LLM timeout")
+    job_queue.register_handler("flaky")(failing)
+
+    job_queue.run_job(db, _job("flaky", attempts=1), "worker-1")
+    assert _last_set(db)["status"] == "queued"
+    assert _last_set(db)["error"] == "LLM timeout"
+
+    job_queue.run_job(db, _job("flaky", attempts=3), "worker-1")
+    assert _last_set(db)["status"] == "failed"
+
+
+def test_claim_takes_queued_or_expired_jobs(db):
+    job_queue.register_handler("ok")(lambda db, payload: None)
+
+    job_queue.claim_next_job(db, "worker-1")
+
+    query, update = db[job_queue.JOBS_COLLECTION].find_one_and_update.call_args[0]
+    assert {"status": "queued"} in query["$or"]
+    expired = next(clause for clause in query["$or"] if clause.get("status") == "running")
+    assert "lease_expires_at" in expired
+    assert expired["$expr"] == {"$lt": ["$attempts", {"$ifNull": ["$max_attempts", job_queue.JOB_MAX_ATTEMPTS]}]}
+    assert update["$set"]["worker_id"] == "worker-1"
+    assert update["$inc"] == {"attempts": 1}
+
+
+def test_expired_jobs_without_attempts_left_are_failed_instead_of_claimed(db):
+    job_queue.register_handler("crashes_worker")(lambda db, payload: None)
+    db[job_queue.JOBS_COLLECTION].update_many.return_value.modified_count = 1
+
+    job_queue.claim_next_job(db, "worker-1")
+
+    query, update = db[job_queue.JOBS_COLLECTION].update_many.call_args[0]
+    assert query["status"] == "running" and "lease_expires_at" in query
+    assert query["$expr"] == {"$gte": ["$attempts", {"$ifNull": ["$max_attempts", job_queue.JOB_MAX_ATTEMPTS]}]}
+    assert update["$set"]["status"] == "failed"
+    assert update["$set"]["lease_expires_at"] is None
@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.graph.message import add_messages
+
+from app import memory_policy
+from app.memory_policy import messages_to_fold, split_turns
+
+
+def conversation(turns, answer="ok"):
+    messages = []
+    for index in range(turns):
+        messages.append(HumanMessage(content=f"pregunta {index}", id=f"h{index}"))
+        messages.append(AIMessage(content="", id=f"c{index}", tool_calls=[{"name": "list_projects", "args": {}, "id": f"t{index}"}]))
+        messages.append(ToolMessage(content="[]", tool_call_id=f"t{index}", id=f"r{index}"))
+        messages.append(AIMessage(content=answer, id=f"a{index}"))
+    return messages
+
+
+def test_turns_keep_tool_calls_with_their_results():
+    turns = split_turns(conversation(3))
+
+    assert len(turns) == 3
+    assert [m.id for m in turns[1]] == ["h1", "c1", "r1", "a1"]
+
+
+def test_nothing_is_folded_until_the_window_plus_step_is_exceeded():
+    assert messages_to_fold(conversation(10), keep_turns=6, fold_every=4, max_tokens=10_000) == []
+
+    folded = messages_to_fold(conversation(11), keep_turns=6, fold_every=4, max_tokens=10_000)
+    assert [m.id for m in folded if isinstance(m, HumanMessage)] == ["h0", "h1", "h2", "h3", "h4"]
+
+
+def test_token_cap_folds_more_turns_but_never_the_current_one():
+    messages = conversation(3, answer="x" * 400)
+
+    folded = messages_to_fold(messages, keep_turns=6, fold_every=4, max_tokens=150)
+
+    assert [m.id for m in folded if isinstance(m, HumanMessage)] == ["h0", "h1"]
+    assert messages_to_fold(conversation(1, answer="x" * 4000), max_tokens=10) == []
+
+
+def test_folded_messages_are_removed_and_summarized():
+    messages = conversation(11)
+    folded = messages_to_fold(messages, keep_turns=6, fold_every=4, max_tokens=10_000)
+    llm = MagicMock()
+    llm.invoke.return_value = AIMessage(content="El usuario revisó sus proyectos.")
+
+    summary = memory_policy.summarize(llm, "Resumen previo.", folded)
+    remaining = add_messages(messages, [RemoveMessage(id=m.id) for m in folded])
+
+    assert summary == "El usuario revisó sus proyectos."
+    prompt = llm.invoke.call_args[0][0][0].content
+    assert "Resumen previo." in prompt and "Usuario: pregunta 0" in prompt
+    assert [m.id for m in remaining if isinstance(m, HumanMessage)] == [f"h{i}" for i in range(5, 11)]
@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+
+import migrate_company_ids
+
+COMPANY = ObjectId()
+
+
+def make_db(batches, progress=None, pending=None):
+    """A database whose `users` collection returns `batches` from successive finds."""
+    users = MagicMock()
+    users.find.return_value.sort.return_value.limit.side_effect = batches
+    users.bulk_write.side_effect = lambda updates, ordered: MagicMock(modified_count=len(updates))
+    users.find_one.side_effect = pending or [None, None]
+    db = MagicMock()
+    db.__getitem__.side_effect = {"users": users}.__getitem__
+    db.migrations.find_one.return_value = progress
+    return db, users
+
+
+@pytest.fixture(autouse=True)
+def reset_completion_cache():
+    migrate_company_ids._completion_cache = (False, 0.0)
+    yield
+    migrate_company_ids._completion_cache = (False, 0.0)
+
+
+def test_string_ids_are_converted_and_invalid_ones_reported():
+    first, second = ObjectId(), ObjectId()
+    db, users = make_db([[{"_id": first, "company_id": str(COMPANY)}, {"_id": second, "company_id": "acme"}], []])
+
+    counters = migrate_company_ids.migrate_collection(db, "users")
+
+    assert counters == {"converted": 1, "invalid": 1}
+    update = users.bulk_write.call_args.args[0][0]
+    # Conditional on the value read, so a concurrent change is not overwritten
+    assert update._filter == {"_id": first, "company_id": str(COMPANY)}
+    assert update._doc == {"$set": {"company_id": COMPANY}}
+    # Progress is recorded after the batch, then cleared when the pass ends
+    assert db.migrations.update_one.call_args_list[0].args[1]["$set"]["collections.users.last_id"] == second
+    assert "collections.users.last_id" in db.migrations.update_one.call_args_list[-1].args[1]["$unset"]
+
+
+def test_an_interrupted_pass_resumes_after_the_last_processed_id():
+    last_id = ObjectId()
+    db, users = make_db([[]], progress={"collections": {"users": {"last_id": last_id}}})
+
+    migrate_company_ids.migrate_collection(db, "users")
+
+    assert users.find.call_args.args[0] == {"company_id": {"$type": "string"}, "_id": {"$gt": last_id}}
+
+
+def test_a_finished_pass_scans_again_from_the_beginning():
+    # A previous version marked finished collections as done and skipped them
+    db, users = make_db([[]], progress={"collections": {"users": {"done": True}}})
+
+    migrate_company_ids.migrate_collection(db, "users")
+
+    assert users.find.call_args.args[0] == {"company_id": {"$type": "string"}}
+
+
+def test_routers_match_both_forms_until_the_migration_is_complete():
+    db, _ = make_db([[{"_id": ObjectId(), "company_id": str(COMPANY)}], []], pending=[{"_id": 1}, None])
+    db.migrations.find_one.return_value = {"complete": False}
+
+    assert migrate_company_ids.company_id_filter(db, COMPANY) == {"$in": [COMPANY, str(COMPANY)]}
+
+    migrate_company_ids._completion_cache = (False, 0.0)
+    migrate_company_ids.run_migration(db, ["users"])
+
+    completions = [c.args[1]["$set"]["complete"] for c in db.migrations.update_one.call_args_list
+                   if "complete" in c.args[1].get("$set", {})]
+    assert completions == [False, True]
+    assert migrate_company_ids.company_id_filter(db, COMPANY) == COMPANY
+
+
+def test_migration_stays_incomplete_while_convertible_strings_remain():
+    db, _ = make_db([[]], pending=[{"_id": 1}, {"_id": 1}])
+
+    migrate_company_ids.run_migration(db, ["users"])
+
+    assert migrate_company_ids.company_id_filter(db, COMPANY) == {"$in": [COMPANY, str(COMPANY)]}
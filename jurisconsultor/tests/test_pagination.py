@@ -0,0 +1,96 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException, Response
+from pymongo import DESCENDING
+
+from app import pagination
+from app.pagination import PageParams, paginate, encode_cursor, decode_cursor
+
+
+def make_collection(documents):
+    collection = MagicMock()
+    cursor = collection.find.return_value.sort.return_value.limit.return_value
+    cursor.__iter__.side_effect = lambda: iter(documents)
+    collection.count_documents.return_value = 42
+    return collection
+
+
+def test_cursor_round_trip_keeps_datetimes():
+    created_at = datetime(2025, 3, 1, 10, 30)
+    last_id = ObjectId()
+
+    assert decode_cursor(encode_cursor(created_at, last_id)) == (created_at, last_id)
+
+
+def test_malformed_cursor_is_a_bad_request():
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+
+def test_full_page_sets_next_cursor_and_fetches_one_extra():
+    documents = [{"_id": ObjectId()} for _ in range(3)]
+    collection = make_collection(documents)
+    response = Response()
+
+    page = paginate(collection, {"project_id": 1}, PageParams(None, 2, False), response)
+
+    assert page == documents[:2]
+    collection.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+    assert decode_cursor(response.headers[pagination.NEXT_CURSOR_HEADER])[1] == documents[1]["_id"]
+    assert pagination.TOTAL_COUNT_HEADER not in response.headers
+
+
+def test_after_cursor_adds_keyset_predicate_on_sort_field():
+    created_at = datetime(2025, 3, 1)
+    last_id = ObjectId()
+    collection = make_collection([])
+    response = Response()
+
+    paginate(collection, {"is_archived": False}, PageParams(encode_cursor(created_at, last_id), 10, True), response,
+             sort_field="created_at", direction=DESCENDING)
+
+    query = collection.find.call_args[0][0]
+    assert query == {"$and": [
+        {"is_archived": False},
+        {"$or": [{"created_at": {"$lt": created_at}}, {"created_at": created_at, "_id": {"$lt": last_id}}]},
+    ]}
+    collection.find.return_value.sort.assert_called_once_with([("created_at", DESCENDING), ("_id", DESCENDING)])
+    assert pagination.NEXT_CURSOR_HEADER not in response.headers
+    assert response.headers[pagination.TOTAL_COUNT_HEADER] == "42"
+    collection.count_documents.assert_called_once_with({"is_archived": False})
+
+
+def test_requests_without_limit_get_the_default_page_size(mocker):
+    mocker.patch("app.pagination.DEFAULT_PAGE_SIZE", 100)
+    documents = [{"_id": ObjectId()} for _ in range(101)]
+    collection = make_collection(documents)
+    response = Response()
+
+    page = paginate(collection, {}, pagination.page_params(None, None, False), response)
+
+    # Lists are bounded even when the client asks for no page: it follows the cursor
+    collection.find.return_value.sort.return_value.limit.assert_called_once_with(101)
+    assert page == documents[:100]
+    assert decode_cursor(response.headers[pagination.NEXT_CURSOR_HEADER]) == (None, documents[99]["_id"])
+
+
+def test_default_page_size_is_capped_by_the_maximum(mocker):
+    mocker.patch("app.pagination.DEFAULT_PAGE_SIZE", 1000)
+    mocker.patch("app.pagination.MAX_PAGE_SIZE", 500)
+
+    assert pagination.page_params(encode_cursor(None, ObjectId()), None, False).limit == 500
+
+
+def test_descending_id_pages_reach_documents_without_created_at():
+    last_id = ObjectId()
+    collection = make_collection([])
+
+    paginate(collection, {"is_archived": False}, PageParams(encode_cursor(None, last_id), 10, False), Response(),
+             direction=DESCENDING)
+
+    assert collection.find.call_args[0][0] == {"$and": [{"is_archived": False}, {"_id": {"$lt": last_id}}]}
+    collection.find.return_value.sort.assert_called_once_with([("_id", DESCENDING)])
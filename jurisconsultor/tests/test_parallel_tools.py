@@ -0,0 +1,74 @@
+import time
+import threading
+import contextvars
+
+import parallel_tools
+
+request_user = contextvars.ContextVar("request_user", default=None)
+
+
+def test_calls_run_concurrently_and_keep_their_order():
+    started = threading.Barrier(3, timeout=2)
+
+    def run_one(call):
+        started.wait()  # only passes if the three calls run at the same time
+        time.sleep(0.01 * (3 - call))
+        return f"result-{call}"
+
+    results = parallel_tools.run_calls([0, 1, 2], run_one, on_timeout=lambda call: "timeout", timeout=5)
+
+    assert results == ["result-0", "result-1", "result-2"]
+
+
+def test_slow_calls_are_reported_as_timed_out():
+    release = threading.Event()
+
+    def run_one(call):
+        if call == "slow":
+            release.wait(5)
+        return call
+
+    start = time.perf_counter()
+    results = parallel_tools.run_calls(["fast", "slow"], run_one, on_timeout=lambda call: f"{call} timed out", timeout=0.2)
+    release.set()
+
+    assert results == ["fast", "slow timed out"]
+    assert time.perf_counter() - start < 2
+
+
+def test_calls_see_the_callers_context():
+    request_user.set("ana@example.com")
+
+    results = parallel_tools.run_calls([1, 2], lambda call: request_user.get(), on_timeout=lambda call: None, timeout=5)
+
+    assert results == ["ana@example.com", "ana@example.com"]
+
+
+def test_hung_calls_of_one_request_do_not_starve_another(mocker):
+    mocker.patch("parallel_tools.TOOL_MAX_WORKERS", 2)
+    release = threading.Event()
+
+    # The first request times out while both of its calls keep their threads busy
+    hung = parallel_tools.run_calls([1, 2], lambda call: release.wait(5), on_timeout=lambda call: "timeout", timeout=0.1)
+    try:
+        start = time.perf_counter()
+        results = parallel_tools.run_calls([1, 2], lambda call: call * 10, on_timeout=lambda call: "timeout", timeout=1)
+        assert results == [10, 20]
+        assert time.perf_counter() - start < 0.5
+    finally:
+        release.set()
+    assert hung == ["timeout", "timeout"]
+
+
+def test_side_effecting_calls_are_awaited_past_the_timeout():
+    def run_one(call):
+        time.sleep(0.4 if call == "create_project" else 0.2)
+        return f"{call} done"
+
+    results = parallel_tools.run_calls(
+        ["create_project", "list_projects"], run_one,
+        on_timeout=lambda call: f"{call} timed out", timeout=0.1, untimed=lambda call: call == "create_project",
+    )
+
+    # list_projects finished while create_project was awaited, so its result is kept too
+    assert results == ["create_project done", "list_projects done"]
@@ -0,0 +1,78 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import source_schedule
+from app.source_schedule import next_schedule, due_sources_query, OUTCOME_CHANGED, OUTCOME_UNCHANGED, OUTCOME_FAILED
+
+NOW = datetime(2025, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(mocker):
+    """Disable jitter so the computed schedules are deterministic."""
+    mocker.patch.object(source_schedule, "JITTER_FRACTION", 0)
+
+
+def test_unchanged_source_grows_interval():
+    source = {"check_interval_hours": 24}
+    fields = next_schedule(source, OUTCOME_UNCHANGED, now=NOW)
+
+    assert fields["check_interval_hours"] == 24 * source_schedule.UNCHANGED_GROWTH_FACTOR
+    assert fields["next_check_at"] == NOW + timedelta(hours=fields["check_interval_hours"])
+    assert fields["consecutive_failures"] == 0
+    assert "last_changed_at" not in fields
+
+
+def test_changed_source_shrinks_interval_but_respects_minimum():
+    source = {"check_interval_hours": source_schedule.MIN_INTERVAL_HOURS}
+    fields = next_schedule(source, OUTCOME_CHANGED, now=NOW)
+
+    assert fields["check_interval_hours"] == source_schedule.MIN_INTERVAL_HOURS
+    assert fields["last_changed_at"] == NOW
+
+
+def test_interval_is_capped_at_maximum():
+    source = {"check_interval_hours": source_schedule.MAX_INTERVAL_HOURS}
+    fields = next_schedule(source, OUTCOME_UNCHANGED, now=NOW)
+
+    assert fields["check_interval_hours"] == source_schedule.MAX_INTERVAL_HOURS
+
+
+def test_failures_back_off_exponentially_and_keep_interval():
+    source = {"check_interval_hours": 48, "consecutive_failures": 0}
+    delays = []
+    for _ in range(3):
+        fields = next_schedule(source, OUTCOME_FAILED, now=NOW)
+        delays.append((fields["next_check_at"] - NOW).total_seconds() / 3600)
+        source.update(fields)
+
+    base = source_schedule.FAILURE_BASE_HOURS
+    assert delays == [base, base * 2, base * 4]
+    assert source["consecutive_failures"] == 3
+    assert source["check_interval_hours"] == 48
+
+
+def test_success_resets_failure_count():
+    source = {"check_interval_hours": 24, "consecutive_failures": 5}
+    fields = next_schedule(source, OUTCOME_UNCHANGED, now=NOW)
+
+    assert fields["consecutive_failures"] == 0
+
+
+def test_jitter_stays_within_bounds(mocker):
+    mocker.patch.object(source_schedule, "JITTER_FRACTION", 0.1)
+    rng = random.Random(42)
+    for _ in range(50):
+        fields = next_schedule({"check_interval_hours": 24}, OUTCOME_UNCHANGED, now=NOW, rng=rng)
+        hours = (fields["next_check_at"] - NOW).total_seconds() / 3600
+        assert 36 * 0.9 <= hours <= 36 * 1.1
+
+
+def test_due_sources_query_includes_unscheduled_sources():
+    query = due_sources_query(now=NOW)
+
+    assert {"next_check_at": None} in query["$or"]
+    assert {"next_check_at": {"$lte": NOW}} in query["$or"]
+    assert query["url"] == {"$ne": None}
@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+import startup
+
+
+@pytest.fixture
+def state(mocker):
+    fresh = startup.StartupState(["agent", "embedding_model"])
+    mocker.patch("startup.startup_state", fresh)
+    return fresh
+
+
+def test_not_ready_until_warm_up_finishes(state):
+    client = MagicMock()
+
+    ready, report = startup.readiness(client)
+    assert not ready
+    assert report["components"]["agent"]["status"] == startup.PENDING
+
+    state.set("agent", startup.READY, 1.0)
+    state.set("embedding_model", startup.READY, 2.0)
+    ready, report = startup.readiness(client)
+    assert ready
+    assert report["components"]["mongodb"]["status"] == startup.READY
+
+
+def test_not_ready_when_mongo_does_not_answer(state):
+    client = MagicMock()
+    client.admin.command.side_effect = ServerSelectionTimeoutError("no servers")
+    state.set("agent", startup.LAZY)
+    state.set("embedding_model", startup.LAZY)
+
+    ready, report = startup.readiness(client)
+
+    assert not ready
+    assert report["components"]["mongodb"] == {"status": startup.FAILED, "error": "no servers"}
+
+
+def test_failed_warm_up_is_reported(state):
+    def load():
+        raise OSError("model not found")
+
+    startup._warm("embedding_model", load)
+
+    assert state.snapshot()["embedding_model"]["status"] == startup.FAILED
+    assert "model not found" in state.snapshot()["embedding_model"]["error"]
+
+
+def test_warm_up_waits_for_a_cold_embedding_service(state, mocker):
+    service = MagicMock()
+    service.health.side_effect = [ConnectionError("refused"), ConnectionError("refused"), {"status": "ok"}]
+    mocker.patch("embedding_client.get_client", return_value=service)
+    sleep = mocker.patch("startup.time.sleep")
+
+    startup._warm("embedding_model", startup._load_embedding_model)
+
+    assert state.snapshot()["embedding_model"]["status"] == startup.READY
+    assert [c.args[0] for c in sleep.call_args_list] == [1.0, 2.0]
+
+
+def test_health_endpoints(state, mocker):
+    import main
+
+    mocker.patch("startup.ping_mongo", return_value=(True, startup.READY))
+    client = TestClient(main.app)
+
+    assert client.get("/health/live").json() == {"status": "ok"}
+    assert client.get("/health/ready").status_code == 503
+
+    state.set("agent", startup.READY)
+    state.set("embedding_model", startup.READY)
+    assert client.get("/health/ready").status_code == 200
@@ -0,0 +1,42 @@
+import json
+from unittest.mock import MagicMock
+
+import terminal_tools
+
+
+def make_tool(metadata):
+    tool = MagicMock()
+    tool.metadata = metadata
+    return tool
+
+
+def test_rag_answer_is_used_as_the_final_answer():
+    answer = terminal_tools.final_answer([("answer", "El plazo es de 15 días hábiles.")])
+
+    assert answer == "FINAL_ANSWER: El plazo es de 15 días hábiles."
+
+
+def test_results_of_several_terminal_tools_are_combined_in_order():
+    projects = json.dumps({"success": True, "projects": [{"_id": "p1", "name": "Demanda"}]})
+    tasks = json.dumps({"success": True, "tasks": [{"title": "Redactar", "status": "todo"}], "project_id": "p1"})
+
+    answer = terminal_tools.final_answer([("projects", projects), ("tasks", tasks)])
+
+    assert answer.startswith("FINAL_ANSWER: Tienes 1 proyecto(s):\n- Demanda (ID: p1)")
+    assert answer.endswith("El proyecto p1 tiene 1 tarea(s):\n- Redactar [todo]")
+    assert answer.count("FINAL_ANSWER:") == 1
+
+
+def test_non_terminal_tools_and_errors_go_back_to_the_llm():
+    assert terminal_tools.final_answer([("answer", "ok"), (None, "{}")]) is None
+    assert terminal_tools.final_answer([("answer", "Error: No se encontraron documentos relevantes.")]) is None
+    assert terminal_tools.final_answer([("projects", json.dumps({"error": "Failed to list projects."}))]) is None
+    # ToolNode reports exceptions as plain text
+    assert terminal_tools.final_answer([("tasks", "Error: ValueError('boom')")]) is None
+    assert terminal_tools.final_answer([]) is None
+
+
+def test_formatter_comes_from_tool_metadata():
+    assert terminal_tools.formatter_for(make_tool({"terminal": "answer"})) == "answer"
+    assert terminal_tools.formatter_for(make_tool(None)) is None
+    assert terminal_tools.formatter_for(None) is None
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+# Imported the way tools.py imports them, so the patches reach the module it uses
+import tools
+import tool_transport
+from security import create_access_token
+from tool_transport import ToolLatencyStats
+
+
+class FakeTransport:
+    name = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def create_project(self, tenant_id, headers, user_email, project_name, project_description=None):
+        self.calls.append(("create_project", tenant_id, user_email, project_name))
+        return {"success": True, "project_id": "p1", "project_name": project_name}
+
+    def list_projects(self, tenant_id, headers, user_email=None):
+        raise RuntimeError("connection refused")
+
+
+@pytest.fixture
+def fake_transport(mocker):
+    transport = FakeTransport()
+    mocker.patch.object(tool_transport, "_transport", transport)
+    mocker.patch.object(tool_transport, "latency_stats", ToolLatencyStats())
+    tools.set_auth_token(create_access_token(data={"sub": "ana@example.com"}))
+    tools.set_tenant_id("65f1c2a9e4b0a1b2c3d4e5f6")
+    yield transport
+    tools.set_auth_token(None)
+    tools.set_tenant_id(None)
+
+
+def test_create_project_uses_transport_and_token_email(fake_transport):
+    result = json.loads(tools.create_project("Demanda Pérez"))
+
+    assert result == {"success": True, "project_id": "p1", "project_name": "Demanda Pérez"}
+    assert fake_transport.calls == [("create_project", "65f1c2a9e4b0a1b2c3d4e5f6", "ana@example.com", "Demanda Pérez")]
+    stats = tool_transport.latency_stats.snapshot()
+    assert stats["fake"]["create_project"]["calls"] == 1
+    assert stats["fake"]["create_project"]["errors"] == 0
+
+
+def test_transport_errors_are_reported_and_counted(fake_transport):
+    result = json.loads(tools.list_projects())
+
+    assert "connection refused" in result["error"]
+    assert tool_transport.latency_stats.snapshot()["fake"]["list_projects"]["errors"] == 1
+
+
+def test_unknown_transport_is_rejected(mocker):
+    mocker.patch.object(tool_transport, "_transport", None)
+    mocker.patch.object(tool_transport, "TOOL_TRANSPORT", "carrier-pigeon")
+
+    with pytest.raises(ValueError):
+        tool_transport.get_transport()
@@ -6,11 +6,22 @@ from unittest.mock import MagicMock, PropertyMock
 # Import the function to be tested
 from app.tools import get_template_placeholders
 
+from docx_templates import template_cache
+
 # Mock the dependencies that are not available in the test environment
 import sys
 sys.modules['docx'] = MagicMock()
 
 
+@pytest.fixture(autouse=True)
+def fresh_template_cache(mocker):
+    """The templates are mocked, so give them a fixed signature and start from an empty cache."""
+    mocker.patch('docx_templates._file_signature', return_value=(0, 0))
+    template_cache.clear()
+    yield
+    template_cache.clear()
+
+
 @pytest.fixture
 def mock_docx_document(mocker):
     """Fixture to create a mock docx.Document object."""
@@ -43,7 +54,7 @@ def mock_docx_document(mocker):
     mock_table.rows = [mock_row]
     mock_doc.tables = [mock_table]
 
-    mocker.patch('app.tools.docx.Document', return_value=mock_doc)
+    mocker.patch('docx_templates.docx.Document', return_value=mock_doc)
     return mock_doc
 
 def test_get_placeholders_robust(mocker, mock_docx_document):
@@ -84,7 +95,7 @@ def test_get_placeholders_no_placeholders(mocker):
     mock_doc.paragraphs = [mock_para]
     mock_doc.tables = []
     
-    mocker.patch('app.tools.docx.Document', return_value=mock_doc)
+    mocker.patch('docx_templates.docx.Document', return_value=mock_doc)
     mocker.patch('os.path.exists', return_value=True)
 
     result_json = get_template_placeholders('no_placeholders.docx')
@@ -0,0 +1,57 @@
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import tools
+
+
+def test_concurrent_sessions_do_not_share_auth_context(mocker):
+    sessions = 16
+    # Every session sets its context before any of them calls a tool
+    barrier = threading.Barrier(sessions)
+
+    def fake_call_tool(tool, tenant_id, headers):
+        return {"success": True, "projects": [{"tenant": tenant_id, "authorization": headers["Authorization"]}]}
+
+    mocker.patch("tools.call_tool", side_effect=fake_call_tool)
+
+    def session(i):
+        with tools.auth_context(f"token-{i}", f"tenant-{i}"):
+            barrier.wait()
+            return json.loads(tools.list_projects())["projects"][0]
+
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        results = list(executor.map(session, range(sessions)))
+
+    assert results == [{"tenant": f"tenant-{i}", "authorization": f"Bearer token-{i}"} for i in range(sessions)]
+
+
+def test_auth_context_is_isolated_between_tasks_and_restored(mocker):
+    mocker.patch("tools.call_tool", side_effect=lambda tool, tenant_id, headers: {"tenant": tenant_id})
+
+    async def session(i):
+        with tools.auth_context(f"token-{i}", f"tenant-{i}"):
+            await asyncio.sleep(0)
+            return json.loads(tools.list_projects())["tenant"]
+
+    async def run_all():
+        return await asyncio.gather(*(session(i) for i in range(8)))
+
+    assert asyncio.run(run_all()) == [f"tenant-{i}" for i in range(8)]
+    # Outside any session no credentials are set
+    assert "Authentication token not set" in json.loads(tools.list_projects())["error"]
+
+
+def test_token_is_verified_on_every_call(mocker):
+    from jose import JWTError
+
+    mocker.patch("tools.verify_token", side_effect=[{"sub": "a@x.com"}, JWTError("Signature has expired.")])
+
+    with tools.auth_context("token", "tenant"):
+        assert tools._current_user_email() == "a@x.com"
+        # The same token, once expired, is rejected rather than served from a cache
+        with pytest.raises(JWTError):
+            tools._current_user_email()
@@ -0,0 +1,64 @@
+from unittest.mock import MagicMock
+
+from bson import ObjectId
+
+from app import dependencies
+from app.models import UserInDB
+from app.security import create_access_token
+from app.user_cache import UserCache
+
+
+def make_user(email="ana@example.com"):
+    return UserInDB(_id=ObjectId(), email=email, full_name="Ana", role="member", hashed_password="x")
+
+
+def test_get_returns_copy_until_ttl_expires(mocker):
+    clock = mocker.patch("app.user_cache.time.monotonic", return_value=100.0)
+    cache = UserCache(ttl_seconds=60, max_entries=10)
+    cache.put("ana@example.com", 1, make_user())
+
+    cached = cache.get("ana@example.com", 1)
+    assert cached.email == "ana@example.com"
+    cached.full_name = "Changed"
+    assert cache.get("ana@example.com", 1).full_name == "Ana"
+    # A token with another iat never shares the entry
+    assert cache.get("ana@example.com", 2) is None
+
+    clock.return_value = 161.0
+    assert cache.get("ana@example.com", 1) is None
+
+
+def test_invalidate_drops_every_token_of_the_user():
+    cache = UserCache(ttl_seconds=60, max_entries=10)
+    cache.put("ana@example.com", 1, make_user())
+    cache.put("ana@example.com", 2, make_user())
+    cache.put("luis@example.com", 1, make_user("luis@example.com"))
+
+    cache.invalidate("ana@example.com", None)
+
+    assert cache.get("ana@example.com", 1) is None
+    assert cache.get("ana@example.com", 2) is None
+    assert cache.get("luis@example.com", 1) is not None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = UserCache(ttl_seconds=60, max_entries=2)
+    cache.put("a@example.com", 1, make_user("a@example.com"))
+    cache.put("b@example.com", 1, make_user("b@example.com"))
+    cache.get("a@example.com", 1)
+    cache.put("c@example.com", 1, make_user("c@example.com"))
+
+    assert cache.get("b@example.com", 1) is None
+    assert cache.get("a@example.com", 1) is not None
+
+
+def test_get_current_user_queries_database_once_per_token(mocker):
+    mocker.patch.object(dependencies, "user_cache", UserCache(ttl_seconds=60, max_entries=10))
+    get_user = mocker.patch.object(dependencies, "get_user", return_value=make_user())
+    token = create_access_token(data={"sub": "ana@example.com"})
+
+    first = dependencies.get_current_user(token=token, db=MagicMock())
+    second = dependencies.get_current_user(token=token, db=MagicMock())
+
+    assert first.email == second.email == "ana@example.com"
+    get_user.assert_called_once()
@@ -0,0 +1,152 @@
+"""
+Benchmark: throughput and latency of the MCP read tools under concurrent calls.
+
+Runs /tools/list_projects and /tools/list_tasks_for_project against a running
+server at increasing concurrency levels. To compare the blocking pymongo version
+with the asyncio one, run it once against each build of the server (same tenant
+data) and compare the tables: with blocking calls the throughput stays flat as
+concurrency grows, because every call holds the event loop.
+
+Without a MongoDB server, --in-process runs the app in this process through
+httpx's ASGITransport, with the tenant database replaced by collections that
+answer after --latency-ms. It measures both builds: "blocking" waits with
+time.sleep inside the awaited calls, as the synchronous pymongo calls of the
+previous build did inside the async endpoints, and "async" waits with
+asyncio.sleep, as the AsyncMongoClient calls do.
+
+Usage (requires httpx):
+    python benchmarks/bench_tools_concurrency.py --url http://localhost:8000 \
+        --tenant-id TENANT --project-id PROJECT_ID [--requests 200] [--concurrency 1 8 32]
+    python benchmarks/bench_tools_concurrency.py --in-process [--latency-ms 5]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import httpx
+from bson import ObjectId
+
+
+async def run_level(client: httpx.AsyncClient, path: str, params: dict, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "errors": errors,
+    }
+
+
+class SimulatedCollection:
+    """A collection whose calls take one database round trip of `latency` seconds."""
+
+    def __init__(self, documents: list, latency: float, blocking: bool):
+        self.documents = documents
+        self.latency = latency
+        self.blocking = blocking
+
+    async def _round_trip(self):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+
+    async def find_one(self, query: dict):
+        await self._round_trip()
+        return dict(self.documents[0])
+
+    def find(self, query: dict):
+        return self._iterate()
+
+    async def _iterate(self):
+        await self._round_trip()
+        for document in self.documents:
+            yield dict(document)
+
+
+def in_process_client(build: str, latency: float, tenant_id: str, project_id: str, limits: httpx.Limits) -> httpx.AsyncClient:
+    """A client calling the server app in this process, on a simulated tenant database."""
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    import server
+
+    blocking = build == "blocking"
+    projects = [{"_id": ObjectId(project_id), "name": "Demanda", "company_id": ObjectId(tenant_id)}]
+    tasks = [{"_id": ObjectId(), "title": f"Tarea {i}", "project_id": ObjectId(project_id)} for i in range(10)]
+    db = SimpleNamespace(
+        projects=SimulatedCollection(projects, latency, blocking),
+        tasks=SimulatedCollection(tasks, latency, blocking),
+    )
+
+    @asynccontextmanager
+    async def lease(tenant_key):
+        yield db
+
+    server.tenant_connections.lease = lease
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://mcp", limits=limits, timeout=60)
+
+
+async def run_endpoints(client: httpx.AsyncClient, endpoints: list, args):
+    for path, params in endpoints:
+        # Warm-up: creates the tenant client and its first connections
+        await client.get(path, params=params)
+        print(f"{path} ({args.requests} requests per level)")
+        print(f"  {'concurrency':>11} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+        for concurrency in args.concurrency:
+            result = await run_level(client, path, params, args.requests, concurrency)
+            print(f"  {concurrency:>11} {result['rps']:>9.1f} {result['p50']:>9.1f} {result['p95']:>9.1f} {result['errors']:>7}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent MCP tool calls.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--tenant-id")
+    parser.add_argument("--project-id")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--in-process", action="store_true", help="Run the app in this process on a simulated database.")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Round trip of the simulated database.")
+    args = parser.parse_args()
+    if args.in_process:
+        args.tenant_id = args.tenant_id or str(ObjectId())
+        args.project_id = args.project_id or str(ObjectId())
+    elif not args.tenant_id or not args.project_id:
+        parser.error("Give --tenant-id and --project-id, or --in-process.")
+
+    endpoints = [
+        ("/tools/list_projects", {"tenant_id": args.tenant_id}),
+        ("/tools/list_tasks_for_project", {"tenant_id": args.tenant_id, "project_id": args.project_id}),
+    ]
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    if not args.in_process:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+            await run_endpoints(client, endpoints, args)
+        return
+    for build in ["blocking", "async"]:
+        print(f"== {build} build, {args.latency_ms:g} ms per database round trip ==")
+        async with in_process_client(build, args.latency_ms / 1000, args.tenant_id, args.project_id, limits) as client:
+            await run_endpoints(client, endpoints, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
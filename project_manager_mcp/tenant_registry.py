@@ -0,0 +1,214 @@
+import os
+import time
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional
+
+from pymongo import AsyncMongoClient, monitoring
+
+logger = logging.getLogger(__name__)
+
+# Per-tenant connection registry.
+# Each tenant has its own MongoDB server. Instead of opening a client per tool
+# call, the registry creates one client per tenant on first use and reuses its
+# connection pool for every later call. The clients use PyMongo's asyncio API, so
+# tool calls never block the event loop. The registry must be used from the event
+# loop of the server. Clients that have been idle for TENANT_IDLE_SECONDS are
+# closed, and so are the least recently used ones beyond TENANT_MAX_CLIENTS.
+# Callers hold a lease on the client while they use it (`lease()`), and a client
+# with a lease or a connection checked out is never closed. Every client is
+# closed on shutdown. Pool activity is tracked with a CMAP listener so it can be
+# inspected per tenant.
+
+TENANT_IDLE_SECONDS = float(os.getenv("TENANT_IDLE_SECONDS", 600))
+TENANT_MAX_CLIENTS = int(os.getenv("TENANT_MAX_CLIENTS", 100))
+TENANT_MONGO_MAX_POOL_SIZE = int(os.getenv("TENANT_MONGO_MAX_POOL_SIZE", 20))
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts the connection pool events of one tenant's MongoDB client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.created = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.clears = 0
+
+    def _add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def connection_created(self, event):
+        self._add(open=1, created=1)
+
+    def connection_closed(self, event):
+        self._add(open=-1)
+
+    def connection_checked_out(self, event):
+        self._add(in_use=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._add(in_use=-1)
+
+    def connection_check_out_failed(self, event):
+        self._add(checkout_failures=1)
+
+    def pool_cleared(self, event):
+        self._add(clears=1)
+
+    # Events without counters
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open,
+                "in_use": self.in_use,
+                "connections_created": self.created,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.clears,
+            }
+
+
+class TenantConnections:
+    """The clients of one tenant and their bookkeeping."""
+
+    def __init__(self, tenant_key: str, mongo_client: AsyncMongoClient, mongo_db_name: str, listener: PoolStatsListener):
+        self.tenant_key = tenant_key
+        self.mongo_client = mongo_client
+        self.mongo_db_name = mongo_db_name
+        self.listener = listener
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.requests = 0
+        # Handouts not given back yet: the client may be in use without a checked-out connection
+        self.leases = 0
+
+    def evictable(self) -> bool:
+        return self.leases == 0 and self.listener.in_use == 0
+
+    async def close(self):
+        await self.mongo_client.close()
+
+
+class TenantConnectionRegistry:
+    """Caches one set of connections per tenant, created lazily and evicted when idle or
+    least recently used."""
+
+    def __init__(self, settings_for: Callable[[str], dict], idle_seconds: float = TENANT_IDLE_SECONDS,
+                 max_clients: int = TENANT_MAX_CLIENTS):
+        # settings_for(tenant_key) returns {"mongo_uri", "mongo_db"}
+        self.settings_for = settings_for
+        self.idle_seconds = idle_seconds
+        self.max_clients = max_clients
+        self._tenants: Dict[str, TenantConnections] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, tenant_key: str) -> TenantConnections:
+        with self._lock:
+            tenant = self._tenants.get(tenant_key)
+            if tenant is None:
+                settings = self.settings_for(tenant_key)
+                listener = PoolStatsListener()
+                client = AsyncMongoClient(
+                    settings["mongo_uri"],
+                    maxPoolSize=TENANT_MONGO_MAX_POOL_SIZE,
+                    event_listeners=[listener],
+                )
+                tenant = TenantConnections(tenant_key, client, settings["mongo_db"], listener)
+                self._tenants[tenant_key] = tenant
+                logger.info(f"Created MongoDB client for tenant {tenant_key}.")
+            tenant.last_used = time.monotonic()
+            tenant.requests += 1
+            tenant.leases += 1
+            return tenant
+
+    def _release(self, tenant: TenantConnections):
+        with self._lock:
+            tenant.leases -= 1
+            tenant.last_used = time.monotonic()
+
+    @asynccontextmanager
+    async def lease(self, tenant_key: str):
+        """Yields the tenant's MongoDB database, creating its client on first use. The
+        client is not evicted until the block exits."""
+        await self.evict_idle()
+        tenant = self._get(tenant_key)
+        try:
+            await self.evict_least_recently_used(keep=tenant_key)
+            yield tenant.mongo_client[tenant.mongo_db_name]
+        finally:
+            self._release(tenant)
+
+    async def _close(self, tenants: List[TenantConnections], reason: str):
+        for tenant in tenants:
+            await tenant.close()
+            logger.info(f"Closed {reason} connections of tenant {tenant.tenant_key}.")
+
+    async def evict_idle(self):
+        """Closes the clients of tenants idle for longer than idle_seconds with nothing checked out."""
+        if self.idle_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                key for key, tenant in self._tenants.items()
+                if now - tenant.last_used > self.idle_seconds and tenant.evictable()
+            ]
+            evicted = [self._tenants.pop(key) for key in idle]
+        await self._close(evicted, "idle")
+
+    async def evict_least_recently_used(self, keep: Optional[str] = None):
+        """Closes the least recently used clients beyond max_clients, skipping `keep` and the
+        clients in use (the registry may then stay above the limit)."""
+        if self.max_clients <= 0:
+            return
+        with self._lock:
+            excess = len(self._tenants) - self.max_clients
+            candidates = sorted(
+                (tenant for key, tenant in self._tenants.items() if key != keep and tenant.evictable()),
+                key=lambda tenant: tenant.last_used,
+            )
+            evicted = [self._tenants.pop(tenant.tenant_key) for tenant in candidates[:max(excess, 0)]]
+        await self._close(evicted, "least recently used")
+
+    async def close_all(self):
+        with self._lock:
+            tenants = list(self._tenants.values())
+            self._tenants.clear()
+        for tenant in tenants:
+            await tenant.close()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            tenants = list(self._tenants.values())
+        return {
+            tenant.tenant_key: {
+                "requests": tenant.requests,
+                "leases": tenant.leases,
+                "idle_seconds": round(now - tenant.last_used, 1),
+                "age_seconds": round(now - tenant.created_at, 1),
+                **tenant.listener.snapshot(),
+            }
+            for tenant in tenants
+        }
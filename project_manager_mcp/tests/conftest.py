@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The server modules import each other as top-level modules (the container runs
+# them from inside `project_manager_mcp/`), so make them importable the same way.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,72 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+import server
+
+TENANT_ID = str(ObjectId())
+
+
+class AsyncCursor:
+    """The async iteration of an AsyncCursor over fixed documents."""
+
+    def __init__(self, documents):
+        self._documents = iter(documents)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.fixture
+def mongo_db(mocker):
+    db = MagicMock()
+    db.leased, db.outstanding = [], []
+
+    @asynccontextmanager
+    async def lease(tenant_key):
+        db.leased.append(tenant_key)
+        db.outstanding.append(tenant_key)
+        try:
+            yield db
+        finally:
+            db.outstanding.remove(tenant_key)
+
+    mocker.patch.object(server.tenant_connections, "lease", lease)
+    return db
+
+
+def test_list_projects_reads_the_tenant_projects_asynchronously(mongo_db):
+    project_id = ObjectId()
+    mongo_db.projects.find.return_value = AsyncCursor([
+        {"_id": project_id, "name": "Demanda", "company_id": ObjectId(TENANT_ID)},
+    ])
+
+    response = TestClient(server.app).get("/tools/list_projects", params={"tenant_id": TENANT_ID})
+
+    assert response.status_code == 200
+    assert response.json()["projects"] == [{"_id": str(project_id), "name": "Demanda", "company_id": TENANT_ID}]
+    assert mongo_db.projects.find.call_args.args[0] == {"company_id": {"$in": [ObjectId(TENANT_ID), TENANT_ID]}}
+    # The tenant client was leased for the request and given back when it ended
+    assert mongo_db.leased == [server.tenant_key_for(TENANT_ID)] and mongo_db.outstanding == []
+
+
+def test_create_project_awaits_the_insert(mongo_db):
+    inserted_id = ObjectId()
+    mongo_db.projects.insert_one = AsyncMock(return_value=MagicMock(inserted_id=inserted_id))
+
+    response = TestClient(server.app).post("/tools/create_project", json={
+        "project_name": "Demanda", "tenant_id": TENANT_ID, "user_email": "ana@example.com",
+    })
+
+    assert response.json() == {"success": True, "project_id": str(inserted_id), "project_name": "Demanda"}
+    document = mongo_db.projects.insert_one.await_args.args[0]
+    assert document["company_id"] == ObjectId(TENANT_ID) and document["members"] == ["ana@example.com"]
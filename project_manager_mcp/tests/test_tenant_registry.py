@@ -0,0 +1,109 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from tenant_registry import TenantConnectionRegistry
+
+
+@pytest.fixture
+def clients(mocker):
+    """The mocked AsyncMongoClient of every tenant, by URI."""
+    created = {}
+
+    def make_client(uri, **kwargs):
+        client = created[uri] = MagicMock()
+        client.close = AsyncMock()
+        return client
+
+    mocker.patch("tenant_registry.AsyncMongoClient", side_effect=make_client)
+    return created
+
+
+def settings_for(tenant_key):
+    return {"mongo_uri": f"mongodb://{tenant_key}", "mongo_db": f"db_{tenant_key}"}
+
+
+async def use(registry, tenant_key):
+    async with registry.lease(tenant_key) as db:
+        return db
+
+
+def test_one_client_per_tenant_is_reused(clients):
+    registry = TenantConnectionRegistry(settings_for, idle_seconds=0, max_clients=0)
+
+    async def run():
+        first = await use(registry, "a")
+        second = await use(registry, "a")
+        await use(registry, "b")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert set(clients) == {"mongodb://a", "mongodb://b"}
+    assert first is second is clients["mongodb://a"]["db_a"]
+    assert registry.stats()["a"]["requests"] == 2
+
+
+def test_least_recently_used_clients_are_closed_beyond_the_limit(clients, mocker):
+    registry = TenantConnectionRegistry(settings_for, idle_seconds=0, max_clients=2)
+    now = iter(range(100))
+    mocker.patch("tenant_registry.time.monotonic", side_effect=lambda: next(now))
+
+    async def run():
+        for tenant_key in ["a", "b", "a", "c"]:
+            await use(registry, tenant_key)
+
+    asyncio.run(run())
+
+    # "b" was used less recently than "a" when "c" arrived
+    assert set(registry.stats()) == {"a", "c"}
+    clients["mongodb://b"].close.assert_awaited_once()
+    clients["mongodb://a"].close.assert_not_awaited()
+
+
+def test_clients_in_use_are_not_evicted(clients):
+    registry = TenantConnectionRegistry(settings_for, idle_seconds=0, max_clients=1)
+
+    async def run():
+        await use(registry, "a")
+        registry._tenants["a"].listener.in_use = 1
+        await use(registry, "b")
+
+    asyncio.run(run())
+
+    assert set(registry.stats()) == {"a", "b"}
+    clients["mongodb://a"].close.assert_not_awaited()
+
+
+def test_idle_clients_are_closed(clients, mocker):
+    registry = TenantConnectionRegistry(settings_for, idle_seconds=10, max_clients=0)
+    clock = mocker.patch("tenant_registry.time.monotonic", return_value=0)
+
+    async def run():
+        await use(registry, "a")
+        clock.return_value = 11
+        await use(registry, "b")
+
+    asyncio.run(run())
+
+    assert set(registry.stats()) == {"b"}
+    clients["mongodb://a"].close.assert_awaited_once()
+
+
+def test_clients_handed_out_are_not_evicted_until_given_back(clients):
+    registry = TenantConnectionRegistry(settings_for, idle_seconds=0, max_clients=1)
+
+    async def run():
+        async with registry.lease("a"):
+            # "a" has no connection checked out yet, but its request is still running
+            await use(registry, "b")
+            assert set(registry.stats()) == {"a", "b"}
+            clients["mongodb://a"].close.assert_not_awaited()
+        assert registry.stats()["a"]["leases"] == 0
+        await use(registry, "b")
+
+    asyncio.run(run())
+
+    assert set(registry.stats()) == {"b"}
+    clients["mongodb://a"].close.assert_awaited_once()